@@ -14,6 +14,26 @@ class Settings:
     DB_USERNAME: str = os.getenv('DB_USERNAME', 'root')
     DB_PASSWORD: str = os.getenv('DB_PASSWORD', '')
     DB_DATABASE: str = os.getenv('DB_DATABASE', 'homestay_booking')
+    # Connection pool của mỗi worker: tổng kết nối tối đa = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT: int = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE: int = int(os.getenv('DB_POOL_RECYCLE', '300'))
+    # Thời gian chờ mở kết nối mới (giây), giữ ngắn để request và /health/ready báo lỗi nhanh khi database mất
+    DB_CONNECT_TIMEOUT: int = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+    # Kiểm tra kết nối khi checkout: always, idle (chỉ kết nối rảnh lâu hơn DB_PRE_PING_IDLE_SECONDS) hoặc never
+    DB_PRE_PING: str = os.getenv('DB_PRE_PING', 'idle')
+    DB_PRE_PING_IDLE_SECONDS: int = int(os.getenv('DB_PRE_PING_IDLE_SECONDS', '30'))
+    # Read replica cho các endpoint chỉ đọc; để trống DB_REPLICA_HOST thì mọi truy vấn dùng primary
+    DB_REPLICA_HOST: str = os.getenv('DB_REPLICA_HOST', '')
+    DB_REPLICA_PORT: int = int(os.getenv('DB_REPLICA_PORT', os.getenv('DB_PORT', '3306')))
+    DB_REPLICA_USERNAME: str = os.getenv('DB_REPLICA_USERNAME', os.getenv('DB_USERNAME', 'root'))
+    DB_REPLICA_PASSWORD: str = os.getenv('DB_REPLICA_PASSWORD', os.getenv('DB_PASSWORD', ''))
+    # Replica chậm hơn mức này (giây) thì đọc từ primary; độ trễ đo lại sau mỗi DB_REPLICA_LAG_CHECK_SECONDS
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '5'))
+    DB_REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv('DB_REPLICA_LAG_CHECK_SECONDS', '2'))
+    # Sau một request ghi, client đọc từ primary trong khoảng này (giây)
+    DB_REPLICA_STICKY_SECONDS: int = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '10'))
     
     # MOMO Payment settings
     MOMO_PARTNER_CODE: str = os.getenv('MOMO_PARTNER_CODE', 'MOMO')
@@ -24,9 +44,48 @@ class Settings:
     MOMO_REDIRECT_URL: str = os.getenv('MOMO_REDIRECT_URL', 'http://localhost:3000/payment/success')
     MOMO_NOTIFY_URL: str = os.getenv('MOMO_NOTIFY_URL', 'http://localhost:8000/api/payments/momo/callback')
     
+    # Google Calendar sync settings
+    GOOGLE_CALENDAR_API_URL: str = os.getenv('GOOGLE_CALENDAR_API_URL', 'https://www.googleapis.com/calendar/v3')
+    CALENDAR_SYNC_PAGE_SIZE: int = int(os.getenv('CALENDAR_SYNC_PAGE_SIZE', '250'))
+    # Lần đồng bộ ở trạng thái "running" lâu hơn khoảng này (giây) được coi là đã chết (worker dừng giữa chừng)
+    CALENDAR_SYNC_STALE_SECONDS: int = int(os.getenv('CALENDAR_SYNC_STALE_SECONDS', '900'))
+    # Múi giờ của các cột DATETIME do MySQL ghi bằng NOW() (ví dụ Asia/Ho_Chi_Minh); để trống: múi giờ của máy chủ app
+    DB_TIMEZONE: str = os.getenv('DB_TIMEZONE', '')
+    
+    # Số thread chạy handler đồng bộ (truy vấn database) cùng lúc trên mỗi worker
+    THREADPOOL_SIZE: int = int(os.getenv('THREADPOOL_SIZE', '40'))
+    
+    # Cache settings: "memory" (trong tiến trình) hoặc "redis" (dùng chung giữa các worker)
+    CACHE_BACKEND: str = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_URL: str = os.getenv('CACHE_URL', 'redis://localhost:6379/0')
+    QUICK_AVAILABILITY_CACHE_TTL: int = int(os.getenv('QUICK_AVAILABILITY_CACHE_TTL', '300'))
+    QUICK_AVAILABILITY_CACHE_SIZE: int = int(os.getenv('QUICK_AVAILABILITY_CACHE_SIZE', '2048'))
+    # Tổng số dòng của các trang danh sách được cache trong khoảng này (giây)
+    LIST_COUNT_CACHE_TTL: int = int(os.getenv('LIST_COUNT_CACHE_TTL', '30'))
+    # Số đếm facet (bộ lọc) theo chữ ký bộ lọc được cache trong khoảng này (giây)
+    FACET_CACHE_TTL: int = int(os.getenv('FACET_CACHE_TTL', '120'))
+    # Từng phần của trang chi tiết homestay được cache trong khoảng này (giây), thay đổi qua ORM xóa cache ngay
+    HOMESTAY_PAGE_CACHE_TTL: int = int(os.getenv('HOMESTAY_PAGE_CACHE_TTL', '300'))
+    # Feed iCal đã dựng (theo homestay/phòng) được giữ tối đa chừng này feed, trong khoảng này (giây)
+    ICAL_FEED_CACHE_SIZE: int = int(os.getenv('ICAL_FEED_CACHE_SIZE', '1024'))
+    ICAL_FEED_CACHE_TTL: int = int(os.getenv('ICAL_FEED_CACHE_TTL', '3600'))
+    # Số bản ghi chứa mỗi từ tìm kiếm (để chọn từ hiếm nhất dẫn truy vấn) được cache trong khoảng này (giây)
+    SEARCH_TERM_FREQUENCY_TTL: int = int(os.getenv('SEARCH_TERM_FREQUENCY_TTL', '3600'))
+    
+    # Chỉ mục gợi ý tìm kiếm trong bộ nhớ được dựng lại sau khoảng này (giây)
+    AUTOCOMPLETE_REFRESH_SECONDS: int = int(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', '600'))
+    # Danh sách nổi bật của trang chủ dựng sẵn trong bộ nhớ, làm mới ở nền sau khoảng này (giây)
+    SNAPSHOT_REFRESH_SECONDS: int = int(os.getenv('SNAPSHOT_REFRESH_SECONDS', '300'))
+    
     @property
     def DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.DB_USERNAME}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_DATABASE}"
+    
+    @property
+    def REPLICA_DATABASE_URL(self) -> str:
+        if not self.DB_REPLICA_HOST:
+            return ""
+        return f"mysql+pymysql://{self.DB_REPLICA_USERNAME}:{self.DB_REPLICA_PASSWORD}@{self.DB_REPLICA_HOST}:{self.DB_REPLICA_PORT}/{self.DB_DATABASE}"
 
 settings = Settings()
 
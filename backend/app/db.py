@@ -1,17 +1,43 @@
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .pool_metrics import PoolMetrics, instrument, metered_pool
+from .replica import ReplicaRouter, wants_primary
+
+def _create_engine(url: str):
+    """Engine với pool cấu hình từ settings và bộ đếm riêng; trả về (engine, metrics)"""
+    metrics = PoolMetrics(max_overflow=settings.DB_MAX_OVERFLOW)
+    # create_engine không mở kết nối: kết nối đầu tiên được mở khi có request cần database
+    engine = create_engine(
+        url,
+        poolclass=metered_pool(metrics),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args={"connect_timeout": settings.DB_CONNECT_TIMEOUT},
+        echo=False
+    )
+    instrument(engine, metrics, settings.DB_PRE_PING, settings.DB_PRE_PING_IDLE_SECONDS)
+    return engine, metrics
 
 # MySQL connection with proper settings
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=False
-)
+engine, pool_metrics = _create_engine(settings.DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Read replica (tùy chọn), cùng cấu hình pool với primary, số liệu pool tính riêng
+replica_engine, replica_pool_metrics = (
+    _create_engine(settings.REPLICA_DATABASE_URL) if settings.REPLICA_DATABASE_URL else (None, None)
+)
+replica_router = ReplicaRouter(
+    SessionLocal,
+    replica_engine,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DB_REPLICA_LAG_CHECK_SECONDS
+)
 Base = declarative_base()
 
 def get_db():
@@ -19,4 +45,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db(request: Request):
+    """Session cho endpoint chỉ đọc: replica khi dùng được, primary khi client cần đọc lại dữ liệu vừa ghi"""
+    db = replica_router.session(prefer_primary=wants_primary(request))
+    try:
+        yield db
+    finally:
+        db.close()
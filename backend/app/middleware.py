@@ -4,6 +4,9 @@ import time
 from collections import defaultdict
 from typing import Dict
 import logging
+from app.config import settings
+from app.db import replica_router
+from app.replica import READ_PRIMARY_COOKIE
 
 # Simple in-memory rate limiter (in production, use Redis)
 class RateLimiter:
@@ -58,4 +61,19 @@ async def security_headers_middleware(request: Request, call_next):
     response.headers["X-XSS-Protection"] = "1; mode=block"
     response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
     
-    return response
\ No newline at end of file
+    return response
+
+async def read_your_writes_middleware(request: Request, call_next):
+    """Sau request ghi thành công, đánh dấu client đọc từ primary trong DB_REPLICA_STICKY_SECONDS giây"""
+    response = await call_next(request)
+    
+    if replica_router.replica is not None and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            str(time.time() + settings.DB_REPLICA_STICKY_SECONDS),
+            max_age=settings.DB_REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+    
+    return response
@@ -7,11 +7,12 @@ from .content import BlogPost, StaticPage, SiteSettings
 from .locations import Location
 from .amenities import Amenity, amenity_homestay
 from .images import HomestayImage
-from .additional import HomestayAvailability, ContactMessage, Notification, Wishlist, PasswordReset, Promotion, PromotionUsage, DiscountType
-from .room_categories import RoomCategory, Tag, HomestayRoom, RoomAvailability, RoomBooking
+from .additional import HomestayAvailability, CalendarSync, ContactMessage, Notification, Wishlist, PasswordReset, Promotion, PromotionUsage, DiscountType
+from .room_categories import RoomCategory, Tag, HomestayRoom, RoomAvailability, RoomBooking, RoomOccupancy
 
 from .seo import SEOMetadata, URLSlug, SitemapEntry
 from .banners import Banner, BannerPosition
+from .search import SearchTerm
 
 # Aliases for backward compatibility
 Availability = RoomAvailability
@@ -24,10 +25,11 @@ __all__ = [
     "Booking", "Payment", "BookingStatus", "PaymentStatus",
     "Review",
     "BlogPost", "StaticPage", "SiteSettings",
-    "HomestayAvailability", "ContactMessage", "Notification", "Wishlist", "PasswordReset", "Promotion", "PromotionUsage", "DiscountType",
-    "RoomCategory", "Tag", "HomestayRoom", "RoomAvailability", "RoomBooking",
+    "HomestayAvailability", "CalendarSync", "ContactMessage", "Notification", "Wishlist", "PasswordReset", "Promotion", "PromotionUsage", "DiscountType",
+    "RoomCategory", "Tag", "HomestayRoom", "RoomAvailability", "RoomBooking", "RoomOccupancy",
     "SEOMetadata", "URLSlug", "SitemapEntry",
     "Banner", "BannerPosition",
+    "SearchTerm",
     "amenity_homestay",
     "Availability", "Room"
 ]
\ No newline at end of file
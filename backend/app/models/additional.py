@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, Date, ForeignKey, DECIMAL, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, Date, ForeignKey, DECIMAL, Enum, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -19,6 +19,32 @@ class HomestayAvailability(Base):
     # Relationships
     homestay = relationship("Homestay")
 
+class CalendarSync(Base):
+    __tablename__ = "calendar_syncs"
+    __table_args__ = (
+        UniqueConstraint("homestay_id", "provider", "calendar_id", name="uq_calendar_sync_homestay_calendar"),
+    )
+    
+    id = Column(BigInteger, primary_key=True, index=True)
+    homestay_id = Column(BigInteger, ForeignKey("homestays.id"), nullable=False, index=True)
+    provider = Column(String(20), nullable=False, default="google")
+    calendar_id = Column(String(255), nullable=False)
+    sync_token = Column(String(512))  # nextSyncToken của lần đồng bộ trước
+    events = Column(JSON)  # event_id -> [ngày bắt đầu, ngày kết thúc) đã đồng bộ
+    blocked_dates = Column(JSON)  # Các ngày đang bị chặn do lịch ngoài
+    # Ngày -> các phòng do chính lần đồng bộ chặn (None: booking chặn của homestay không có phòng);
+    # chỉ các ô này được bỏ chặn, ô chủ nhà tự chặn được giữ nguyên
+    blocked_cells = Column(JSON)
+    status = Column(String(20), default="idle")  # idle, running, success, failed
+    started_at = Column(DateTime)  # Lúc chuyển sang "running"
+    last_error = Column(Text)
+    last_synced_at = Column(DateTime)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, onupdate=func.now())
+    
+    # Relationships
+    homestay = relationship("Homestay")
+
 class ContactMessage(Base):
     __tablename__ = "contact_messages"
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, DateTime, ForeignKey, Enum, DECIMAL, Date, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, DateTime, ForeignKey, Enum, DECIMAL, Date, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -18,6 +18,10 @@ class PaymentStatus(enum.Enum):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Kiểm tra trùng lịch: homestay_id + status, rồi giao khoảng check_in/check_out
+        Index("idx_bookings_homestay_status_dates", "homestay_id", "status", "check_in", "check_out"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True)
     booking_code = Column(String(255), unique=True, nullable=False)
@@ -46,6 +50,10 @@ class Booking(Base):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        # Doanh thu theo trạng thái và khoảng thời gian; amount để SUM không cần đọc bảng
+        Index("idx_payments_status_created_amount", "status", "created_at", "amount"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True)
     booking_id = Column(BigInteger, ForeignKey("bookings.id"))
@@ -17,6 +17,7 @@ class Destination(Base):
     city = Column(String(100))
     latitude = Column(Float)
     longitude = Column(Float)
+    geohash = Column(String(12), index=True)  # Tính từ tọa độ khi lưu (xem app/services/geo.py)
     
     # Destination type
     destination_type = Column(String(50), index=True)  # Biển, Núi, Văn hóa, Lịch sử, Sinh thái
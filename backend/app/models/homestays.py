@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, Boolean, DateTime, ForeignKey, JSON, DECIMAL
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, Boolean, DateTime, ForeignKey, JSON, DECIMAL, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -6,6 +6,10 @@ from app.models.amenities import amenity_homestay
 
 class Homestay(Base):
     __tablename__ = "homestays"
+    __table_args__ = (
+        # Danh sách homestay đang hoạt động/featured, mới nhất trước
+        Index("idx_homestays_active_status_featured_created", "is_active", "status", "featured", "created_at"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -20,6 +24,7 @@ class Homestay(Base):
     address = Column(String(255))
     latitude = Column(DECIMAL(10, 8))
     longitude = Column(DECIMAL(11, 8))
+    geohash = Column(String(12), index=True)  # Tính từ tọa độ khi lưu (xem app/services/geo.py)
     contact_info = Column(JSON)
     rules = Column(Text)
     check_in_out_times = Column(JSON)
@@ -27,6 +32,10 @@ class Homestay(Base):
     discount_percent = Column(Integer, default=0)
     featured = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
+    # Tóm tắt rating các review đã duyệt, cập nhật khi ghi review (xem app/services/ratings.py)
+    avg_rating = Column(Float, default=0)
+    review_count = Column(Integer, default=0)
+    rating_histogram = Column(JSON)  # {"1": số review 1 sao, ..., "5": số review 5 sao}
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
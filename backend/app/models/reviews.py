@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Review đã duyệt của một homestay; rating để tính tóm tắt rating chỉ từ index
+        Index("idx_reviews_homestay_approved_rating", "homestay_id", "is_approved", "rating"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True)
     user_id = Column(BigInteger, ForeignKey("users.id"))
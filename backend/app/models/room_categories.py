@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, Date, ForeignKey, JSON, DECIMAL, Table
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, Date, ForeignKey, JSON, DECIMAL, Table, LargeBinary, Index, UniqueConstraint, Computed
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -51,6 +51,9 @@ class Tag(Base):
 
 class HomestayRoom(Base):
     __tablename__ = "homestay_rooms"
+    __table_args__ = (
+        Index("idx_homestay_rooms_homestay_available", "homestay_id", "is_available"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True)
     homestay_id = Column(BigInteger, ForeignKey("homestays.id"))
@@ -70,19 +73,42 @@ class HomestayRoom(Base):
     bookings = relationship("RoomBooking", back_populates="room")
 
 class RoomAvailability(Base):
-    __tablename__ = "room_availability"
+    """Khoảng ngày [start_date, end_date) của một phòng có cùng trạng thái, giá và số đêm tối thiểu"""
+    __tablename__ = "room_availability_ranges"
+    __table_args__ = (
+        # Các khoảng của một phòng không chồng lên nhau; đọc bằng truy vấn giao khoảng
+        Index("idx_room_availability_range", "room_id", "start_date", "end_date"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True)
-    room_id = Column(BigInteger, ForeignKey("homestay_rooms.id"))
-    date = Column(Date, nullable=False)
+    room_id = Column(BigInteger, ForeignKey("homestay_rooms.id"), nullable=False)
+    start_date = Column(Date, nullable=False)  # Ngày đầu tiên
+    end_date = Column(Date, nullable=False)  # Ngày sau ngày cuối cùng
     is_available = Column(Boolean, default=True)
-    price_override = Column(DECIMAL(10, 2))  # Giá đặc biệt cho ngày cụ thể
+    price_override = Column(DECIMAL(10, 2))  # Giá đặc biệt mỗi đêm trong khoảng
     min_nights = Column(Integer, default=1)  # Số đêm tối thiểu
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
     room = relationship("HomestayRoom", back_populates="availability")
 
+class RoomOccupancy(Base):
+    __tablename__ = "room_occupancy"
+    __table_args__ = (
+        # Mỗi (homestay, phòng, loại) đúng một dòng; ghi bằng upsert
+        UniqueConstraint("homestay_id", "room_key", "kind", name="uq_room_occupancy_homestay_room_kind"),
+    )
+    
+    id = Column(BigInteger, primary_key=True, index=True)
+    homestay_id = Column(BigInteger, ForeignKey("homestays.id"), nullable=False, index=True)
+    room_id = Column(BigInteger, nullable=True)  # NULL: dòng cấp homestay (booking)
+    # UNIQUE không so sánh NULL, nên khóa duy nhất dùng 0 thay cho dòng cấp homestay
+    room_key = Column(BigInteger, Computed("COALESCE(room_id, 0)", persisted=True), nullable=False)
+    kind = Column(String(20), nullable=False)  # blocked, open | confirmed, pending, held
+    window_start = Column(Date, nullable=False)  # Bit 0 ứng với ngày này
+    bits = Column(LargeBinary, nullable=False)  # Mỗi bit là một ngày
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
 class RoomBooking(Base):
     __tablename__ = "room_bookings"
     
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Index
+from app.db import Base
+
+class SearchTerm(Base):
+    """Chỉ mục đảo cho tìm kiếm: mỗi dòng là một từ (đã bỏ dấu) xuất hiện trong một homestay/điểm đến"""
+    __tablename__ = "search_terms"
+    
+    entity_type = Column(String(20), primary_key=True)  # homestay, destination
+    term = Column(String(64), primary_key=True)
+    entity_id = Column(BigInteger, primary_key=True)
+    weight = Column(Integer, nullable=False, default=1)  # Tổng trọng số các trường chứa từ (tên > địa chỉ > mô tả)
+    
+    __table_args__ = (
+        # Tra các từ của một bản ghi (xóa khi sửa, khớp tiền tố theo entity_id); kèm weight để không cần đọc bảng
+        Index('idx_search_terms_entity', 'entity_type', 'entity_id', 'term', 'weight'),
+        # Trên SQLite lưu theo khóa chính như InnoDB, tra khóa chính lấy được weight ngay
+        {"sqlite_with_rowid": False},
+    )
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
 
 class SEOMetadata(Base):
     __tablename__ = "seo_metadata"
+    __table_args__ = (
+        Index("idx_seo_metadata_entity", "entity_type", "entity_id"),
+    )
     
     id = Column(BigInteger, primary_key=True, index=True)
     entity_type = Column(String(50), nullable=False)  # homestay, destination, category
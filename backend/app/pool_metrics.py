@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+class PoolMetrics:
+    """Số liệu một connection pool của tiến trình: thời gian chờ checkout, overflow và số kết nối mở/đóng"""
+
+    def __init__(self, max_overflow: int, samples: int = 2048):
+        # QueuePool không công khai max_overflow nên ghi lại từ cấu hình lúc tạo pool
+        self.max_overflow = max_overflow
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=samples)
+        self.started_at = time.time()
+        self.checkouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.ping_failures = 0
+        self.overflow_checkouts = 0
+        self.peak_checked_out = 0
+
+    def record_wait(self, elapsed_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+            self._waits.append(elapsed_ms)
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_checkout(self, pool: QueuePool):
+        with self._lock:
+            checked_out = pool.checkedout()
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            if checked_out > pool.size():
+                self.overflow_checkouts += 1
+
+    def snapshot(self, pool: QueuePool) -> Dict:
+        with self._lock:
+            waits = sorted(self._waits)
+
+            def percentile(fraction: float) -> float:
+                return round(waits[min(len(waits) - 1, int(fraction * len(waits)))], 2) if waits else 0.0
+
+            return {
+                "pid": os.getpid(),
+                "uptime_seconds": round(time.time() - self.started_at),
+                "pool": {
+                    "size": pool.size(),
+                    "max_overflow": self.max_overflow,
+                    "timeout": pool.timeout(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    # Âm khi pool chưa mở đủ size kết nối
+                    "overflow": pool.overflow(),
+                    "peak_checked_out": self.peak_checked_out
+                },
+                "checkout_wait_ms": {
+                    "count": self.checkouts,
+                    "avg": round(self.wait_total_ms / self.checkouts, 2) if self.checkouts else 0.0,
+                    "p50": percentile(0.5),
+                    "p99": percentile(0.99),
+                    "max": round(self.wait_max_ms, 2)
+                },
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "churn": {
+                    "connects": self.connects,
+                    "closes": self.closes,
+                    "invalidations": self.invalidations,
+                    "ping_failures": self.ping_failures
+                }
+            }
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool đo thời gian chờ lấy kết nối (gồm cả thời gian mở kết nối mới) và số lần hết thời gian chờ"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.increment("timeouts")
+            raise
+        self.metrics.record_wait((time.perf_counter() - start) * 1000)
+        return record
+
+def metered_pool(metrics: PoolMetrics):
+    """Lớp pool ghi vào metrics của một engine; recreate() tạo lại cùng lớp nên vẫn ghi tiếp"""
+    return type("MeteredQueuePool", (MeteredQueuePool,), {"metrics": metrics})
+
+def instrument(engine, metrics: PoolMetrics, pre_ping: str = "idle", pre_ping_idle_seconds: float = 30):
+    """
+    Gắn bộ đếm metrics vào pool của engine và kiểm tra kết nối khi checkout theo pre_ping:
+    "always" (mỗi lần, như pool_pre_ping), "idle" (chỉ kết nối đã rảnh quá pre_ping_idle_seconds) hoặc "never".
+    """
+    @event.listens_for(engine.pool, "connect")
+    def _connect(dbapi_connection, record):
+        metrics.increment("connects")
+
+    @event.listens_for(engine.pool, "close")
+    def _close(dbapi_connection, record):
+        metrics.increment("closes")
+
+    @event.listens_for(engine.pool, "invalidate")
+    def _invalidate(dbapi_connection, record, exception):
+        metrics.increment("invalidations")
+
+    @event.listens_for(engine.pool, "checkin")
+    def _checkin(dbapi_connection, record):
+        record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_connection, record, proxy):
+        metrics.record_checkout(engine.pool)
+        idle_since = record.info.get("idle_since")
+        if pre_ping == "never" or (
+            pre_ping == "idle" and (idle_since is None or time.monotonic() - idle_since < pre_ping_idle_seconds)
+        ):
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception:
+            metrics.increment("ping_failures")
+            # Pool bỏ kết nối này và thử lấy kết nối khác
+            raise exc.DisconnectionError()
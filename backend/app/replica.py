@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+def mysql_replica_lag(connection) -> Optional[float]:
+    """Số giây replica chậm hơn primary; None nếu replication đang dừng"""
+    if connection.dialect.name != "mysql":
+        return 0.0
+    try:
+        row = connection.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+    except exc.DBAPIError:
+        # MySQL < 8.0.22
+        row = connection.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+    if row is None:
+        # Không cấu hình replication (ví dụ replica trỏ về chính primary khi chạy local)
+        return 0.0
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+# Client đọc lại dữ liệu vừa ghi: header này, hoặc cookie do middleware đặt sau mỗi request ghi thành công
+READ_PRIMARY_HEADER = "X-Read-Primary"
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+def wants_primary(request) -> bool:
+    """Request cần đọc từ primary (read-your-writes)"""
+    if request.headers.get(READ_PRIMARY_HEADER):
+        return True
+    until = request.cookies.get(READ_PRIMARY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+def _reject_writes(session, flush_context, instances):
+    if session.new or session.dirty or session.deleted:
+        raise exc.InvalidRequestError("Session đọc từ replica là chỉ đọc, hãy dùng get_db cho thao tác ghi")
+
+class ReplicaRouter:
+    """
+    Chọn session đọc: replica nếu đã cấu hình và độ trễ không vượt max_lag, ngược lại primary.
+    Độ trễ được đo lại sau mỗi check_interval giây; lỗi kết nối hoặc replication dừng đều chuyển về primary.
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replica_engine=None,
+        max_lag: float = 5,
+        check_interval: float = 2,
+        lag_probe: Callable = mysql_replica_lag
+    ):
+        self.primary = primary
+        self.replica = None
+        if replica_engine is not None:
+            self.replica = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine, info={"replica": True})
+            event.listen(self.replica, "before_flush", _reject_writes)
+        self.replica_engine = replica_engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lag_probe = lag_probe
+        self._lock = threading.Lock()
+        self._checked_at: Optional[float] = None
+        self._lag: Optional[float] = None
+        self._error: Optional[str] = None
+        self.fallbacks = 0
+
+    def _check(self):
+        try:
+            with self.replica_engine.connect() as connection:
+                lag, error = self._lag_probe(connection), None
+        except Exception as e:
+            lag, error = None, str(e)
+        if error != self._error:
+            if error:
+                logger.warning(f"Read replica unavailable, reading from primary: {error}")
+            else:
+                logger.info("Read replica available again")
+        self._lag, self._error = lag, error
+
+    def replica_usable(self) -> bool:
+        if self.replica is None:
+            return False
+        with self._lock:
+            if self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval:
+                self._check()
+                self._checked_at = time.monotonic()
+            return self._lag is not None and self._lag <= self.max_lag
+
+    def session(self, prefer_primary: bool = False) -> Session:
+        if prefer_primary or self.replica is None:
+            return self.primary()
+        if not self.replica_usable():
+            self.fallbacks += 1
+            return self.primary()
+        return self.replica()
+
+    def status(self, include_error: bool = False) -> Dict:
+        """
+        Trạng thái replica theo lần đo gần nhất. Không mở kết nối và không chờ lock, gọi được từ event loop;
+        chuỗi lỗi có thể chứa host/user của replica nên chỉ kèm khi include_error.
+        """
+        lag, checked_at = self._lag, self._checked_at
+        status = {
+            "configured": self.replica is not None,
+            "usable": self.replica is not None and lag is not None and lag <= self.max_lag,
+            "lag_seconds": lag,
+            "max_lag_seconds": self.max_lag,
+            "checked_seconds_ago": None if checked_at is None else round(time.monotonic() - checked_at, 1),
+            "fallbacks": self.fallbacks
+        }
+        if include_error:
+            status["error"] = self._error
+        return status
@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, and_, or_, func
 from typing import Optional
 from datetime import datetime, timedelta
 
-from app.db import get_db
+from app.db import get_db, get_read_db
 from app.models import User, Homestay, Booking, Payment, Review
 from app.auth import require_admin
+from app.services.ratings import run_rating_reconciliation
+from app.services.search import run_search_reindex
+from app.services.pagination import paginate, page_info
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 @router.get("/homestays/pending")
-async def get_pending_homestays(
+def get_pending_homestays(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
@@ -21,19 +26,15 @@ async def get_pending_homestays(
     
     query = db.query(Homestay).filter(Homestay.status == 'pending')
     
-    total = query.count()
-    homestays = query.order_by(desc(Homestay.created_at)).offset((page - 1) * limit).limit(limit).all()
+    homestays, next_cursor = paginate(query, [(Homestay.created_at, True), (Homestay.id, True)], limit, page, cursor)
     
     return {
         "homestays": homestays,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.patch("/homestays/{homestay_id}/approve")
-async def approve_homestay(
+def approve_homestay(
     homestay_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -57,7 +58,7 @@ async def approve_homestay(
     }
 
 @router.patch("/homestays/{homestay_id}/reject")
-async def reject_homestay(
+def reject_homestay(
     homestay_id: int,
     reason: Optional[str] = None,
     current_user: User = Depends(require_admin),
@@ -85,9 +86,9 @@ async def reject_homestay(
     }
 
 @router.get("/stats")
-async def get_admin_stats(
+def get_admin_stats(
     current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Thống kê tổng quan cho admin"""
     
@@ -121,4 +122,26 @@ async def get_admin_stats(
         "homestays": homestay_stats,
         "users": user_stats,
         "bookings": booking_stats
-    }
\ No newline at end of file
+    }
+
+@router.post("/ratings/reconcile", status_code=202)
+def reconcile_homestay_ratings(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(require_admin)
+):
+    """Đối soát lại tóm tắt rating của homestay từ bảng reviews (chạy nền, chỉ admin)"""
+    
+    background_tasks.add_task(run_rating_reconciliation)
+    
+    return {"message": "Đã bắt đầu đối soát rating"}
+
+@router.post("/search/reindex", status_code=202)
+def reindex_search(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(require_admin)
+):
+    """Dựng lại chỉ mục tìm kiếm homestay và điểm đến (chạy nền, chỉ admin)"""
+    
+    background_tasks.add_task(run_search_reindex)
+    
+    return {"message": "Đã bắt đầu dựng lại chỉ mục tìm kiếm"}
@@ -14,7 +14,7 @@ router = APIRouter(prefix="/admin", tags=["admin-authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="admin/login")
 
 @router.post("/login", response_model=Token)
-async def admin_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def admin_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     try:
         email = form_data.username.lower().strip()
         logging.info(f"Admin login attempt for: {email}")
@@ -52,7 +52,7 @@ async def admin_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Sess
         )
 
 @router.get("/verify", response_model=UserResponse)
-async def verify_admin_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def verify_admin_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     try:
         user_id = verify_token(token)
         user = db.query(User).filter(User.id == user_id).first()
@@ -75,7 +75,7 @@ async def verify_admin_token(token: str = Depends(oauth2_scheme), db: Session =
         )
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     try:
         user_id = verify_token(token)
         user = db.query(User).filter(User.id == user_id).first()
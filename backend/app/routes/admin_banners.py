@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
-from typing import List
+from typing import List, Optional
 from app.db import get_db
 from app.models import Banner, User
 from app.schemas import BannerCreate, BannerUpdate, BannerResponse
 from app.auth import get_current_user
+from app.services.pagination import paginate, page_info
 
 router = APIRouter(prefix="/api/admin/banners", tags=["admin-banners"])
 
@@ -15,9 +16,11 @@ def require_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.get("")
-async def get_all_banners(
+def get_all_banners(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
     position: str = Query(None),
     is_active: bool = Query(None),
     db: Session = Depends(get_db),
@@ -32,19 +35,15 @@ async def get_all_banners(
     if is_active is not None:
         query = query.filter(Banner.is_active == is_active)
     
-    total = query.count()
-    banners = query.order_by(desc(Banner.priority), desc(Banner.created_at)).offset((page - 1) * limit).limit(limit).all()
+    banners, next_cursor = paginate(query, [(Banner.priority, True), (Banner.created_at, True), (Banner.id, True)], limit, page, cursor)
     
     return {
         "banners": [BannerResponse.model_validate(banner) for banner in banners],
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.get("/{banner_id}")
-async def get_banner(
+def get_banner(
     banner_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
@@ -58,7 +57,7 @@ async def get_banner(
     return {"banner": BannerResponse.model_validate(banner)}
 
 @router.post("")
-async def create_banner(
+def create_banner(
     banner_data: BannerCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
@@ -73,7 +72,7 @@ async def create_banner(
     return {"message": "Tạo banner thành công", "banner": BannerResponse.model_validate(banner)}
 
 @router.put("/{banner_id}")
-async def update_banner(
+def update_banner(
     banner_id: int,
     banner_data: BannerUpdate,
     db: Session = Depends(get_db),
@@ -94,7 +93,7 @@ async def update_banner(
     return {"message": "Cập nhật banner thành công", "banner": BannerResponse.model_validate(banner)}
 
 @router.delete("/{banner_id}")
-async def delete_banner(
+def delete_banner(
     banner_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
@@ -111,7 +110,7 @@ async def delete_banner(
     return {"message": "Xóa banner thành công"}
 
 @router.patch("/{banner_id}/toggle")
-async def toggle_banner_status(
+def toggle_banner_status(
     banner_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
@@ -5,10 +5,12 @@ from app.db import get_db
 from app.models.room_categories import RoomCategory, Tag, room_category_tags
 from app.schemas import RoomCategoryResponse, TagResponse
 from app.auth import require_admin
+from app.services.room_categories import category_payload
 from pydantic import BaseModel
 from decimal import Decimal
 import os
 import uuid
+import shutil
 from pathlib import Path
 
 router = APIRouter(prefix="/api/admin/room-categories", tags=["Admin Room Categories"])
@@ -78,29 +80,7 @@ def create_room_category(
     db.commit()
     db.refresh(category)
     
-    return RoomCategoryResponse(
-        id=category.id,
-        name=category.name,
-        slug=category.slug,
-        description=category.description,
-        base_price=float(category.base_price) if category.base_price else None,
-        max_guests=category.max_guests,
-        room_size=float(category.room_size) if category.room_size else None,
-        bed_type=category.bed_type,
-        view_type=category.view_type,
-        has_balcony=category.has_balcony,
-        has_kitchen=category.has_kitchen,
-        is_pet_friendly=category.is_pet_friendly,
-        amenities=category.amenities or [],
-        images=category.images or [],
-        tags=[TagResponse(
-            id=tag.id,
-            name=tag.name,
-            slug=tag.slug,
-            color=tag.color,
-            icon=tag.icon
-        ) for tag in category.tags]
-    )
+    return RoomCategoryResponse(**category_payload(category))
 
 @router.put("/{category_id}", response_model=RoomCategoryResponse)
 def update_room_category(
@@ -150,29 +130,7 @@ def update_room_category(
     db.commit()
     db.refresh(category)
     
-    return RoomCategoryResponse(
-        id=category.id,
-        name=category.name,
-        slug=category.slug,
-        description=category.description,
-        base_price=float(category.base_price) if category.base_price else None,
-        max_guests=category.max_guests,
-        room_size=float(category.room_size) if category.room_size else None,
-        bed_type=category.bed_type,
-        view_type=category.view_type,
-        has_balcony=category.has_balcony,
-        has_kitchen=category.has_kitchen,
-        is_pet_friendly=category.is_pet_friendly,
-        amenities=category.amenities or [],
-        images=category.images or [],
-        tags=[TagResponse(
-            id=tag.id,
-            name=tag.name,
-            slug=tag.slug,
-            color=tag.color,
-            icon=tag.icon
-        ) for tag in category.tags]
-    )
+    return RoomCategoryResponse(**category_payload(category))
 
 @router.delete("/{category_id}")
 def delete_room_category(
@@ -344,7 +302,7 @@ def delete_tag(
 
 # Image Management APIs
 @router.post("/{category_id}/images")
-async def upload_category_images(
+def upload_category_images(
     category_id: int,
     images: List[UploadFile] = File(...),
     db: Session = Depends(get_db),
@@ -375,8 +333,7 @@ async def upload_category_images(
         
         # Lưu file
         with open(file_path, "wb") as buffer:
-            content = await image.read()
-            buffer.write(content)
+            shutil.copyfileobj(image.file, buffer)
         
         # Tạo URL cho file
         image_url = f"/uploads/room_categories/{unique_filename}"
@@ -67,7 +67,7 @@ def validate_name(name: str):
         )
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user account
     
@@ -138,7 +138,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """
     Authenticate user and return access token
     
@@ -190,7 +190,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def refresh_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     Refresh access token
     
@@ -229,7 +229,7 @@ async def refresh_token(token: str = Depends(oauth2_scheme), db: Session = Depen
         )
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     Get current authenticated user information
     
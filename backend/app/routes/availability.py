@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
-from app.db import get_db
+from app.db import get_db, get_read_db
+from app.auth import require_admin_or_host
 from app.models.room_categories import RoomAvailability, HomestayRoom
 from app.models.bookings import Booking
 from app.models.homestays import Homestay
+from app.models.additional import CalendarSync
+from app.models.users import User
+from app.services.availability_engine import build_month_calendar, check_stay, search_available_homestays
+from app.services.occupancy import quick_availability
+from app.services.bulk_availability import parse_dates, block_room_days, unblock_room_days, block_homestay_days
+from app.services.calendar_sync import is_running, run_calendar_sync
+from app.services.ical import UnsafeFeedURL, export_feed, run_ical_import, validate_feed_url
 from pydantic import BaseModel
 from datetime import datetime, date, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import List
 import calendar
 
@@ -19,6 +28,14 @@ class CalendarDay(BaseModel):
     status: str  # available, booked, blocked
     booking_info: Optional[Dict] = None
 
+class CalendarSyncConfig(BaseModel):
+    provider: str = "google"
+    calendar_id: str
+    access_token: str
+
+class ICalImportConfig(BaseModel):
+    url: str
+
 class MonthlyCalendar(BaseModel):
     year: int
     month: int
@@ -32,7 +49,7 @@ def get_availability_calendar(
     year: int = Query(...),
     month: int = Query(...),
     room_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Lấy lịch trống/đã đặt theo tháng cho homestay"""
     
@@ -41,130 +58,46 @@ def get_availability_calendar(
     if not homestay:
         raise HTTPException(status_code=404, detail="Homestay không tồn tại")
     
-    # Tạo range ngày trong tháng
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    calendar_data = build_month_calendar(db, homestay_id, year, month, room_id)
     
-    calendar_days = []
-    total_available = 0
-    total_booked = 0
+    return MonthlyCalendar(
+        year=calendar_data["year"],
+        month=calendar_data["month"],
+        days=[CalendarDay(**day) for day in calendar_data["days"]],
+        total_available=calendar_data["total_available"],
+        total_booked=calendar_data["total_booked"]
+    )
+
+@router.get("/search")
+def search_availability(
+    check_in: date = Query(...),
+    check_out: date = Query(...),
+    guests: int = Query(1, ge=1),
+    destination_id: Optional[int] = Query(None),
+    destination: Optional[str] = Query(None),
+    category_id: Optional[int] = Query(None),
+    room_category_id: Optional[int] = Query(None),
+    min_price: Optional[float] = Query(None),
+    max_price: Optional[float] = Query(None),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Tìm các homestay còn trống trong khoảng thời gian kèm giá phòng rẻ nhất"""
     
-    current_date = start_date
-    while current_date <= end_date:
-        day_status = "available"
-        booking_info = None
-        price = None
-        
-        if room_id:
-            # Kiểm tra phòng cụ thể
-            room = db.query(HomestayRoom).filter(
-                HomestayRoom.id == room_id,
-                HomestayRoom.homestay_id == homestay_id
-            ).first()
-            
-            if room:
-                # Kiểm tra availability
-                availability = db.query(RoomAvailability).filter(
-                    RoomAvailability.room_id == room_id,
-                    RoomAvailability.date == current_date
-                ).first()
-                
-                if availability:
-                    if not availability.is_available:
-                        day_status = "blocked"
-                    price = float(availability.price_override) if availability.price_override else float(room.price_per_night or room.room_category.base_price)
-                else:
-                    price = float(room.price_per_night or room.room_category.base_price)
-                
-                # Kiểm tra booking
-                booking = db.query(Booking).filter(
-                    Booking.homestay_id == homestay_id,
-                    Booking.check_in <= current_date,
-                    Booking.check_out > current_date,
-                    Booking.status.in_(["confirmed", "pending"])
-                ).first()
-                
-                if booking:
-                    day_status = "booked"
-                    booking_info = {
-                        "booking_code": booking.booking_code,
-                        "guest_name": booking.guest_details.get("name") if booking.guest_details else "Khách hàng",
-                        "guests": booking.guests
-                    }
-        else:
-            # Kiểm tra tất cả phòng trong homestay
-            rooms = db.query(HomestayRoom).filter(
-                HomestayRoom.homestay_id == homestay_id,
-                HomestayRoom.is_available == True
-            ).all()
-            
-            available_rooms = 0
-            min_price = None
-            
-            for room in rooms:
-                # Kiểm tra availability
-                availability = db.query(RoomAvailability).filter(
-                    RoomAvailability.room_id == room.id,
-                    RoomAvailability.date == current_date
-                ).first()
-                
-                room_available = True
-                if availability and not availability.is_available:
-                    room_available = False
-                
-                # Kiểm tra booking
-                booking = db.query(Booking).filter(
-                    Booking.homestay_id == homestay_id,
-                    Booking.check_in <= current_date,
-                    Booking.check_out > current_date,
-                    Booking.status.in_(["confirmed", "pending"])
-                ).first()
-                
-                if booking:
-                    room_available = False
-                    if not booking_info:  # Chỉ lấy thông tin booking đầu tiên
-                        booking_info = {
-                            "booking_code": booking.booking_code,
-                            "guest_name": booking.guest_details.get("name") if booking.guest_details else "Khách hàng",
-                            "guests": booking.guests
-                        }
-                
-                if room_available:
-                    available_rooms += 1
-                    room_price = availability.price_override if availability and availability.price_override else (room.price_per_night or room.room_category.base_price)
-                    if min_price is None or room_price < min_price:
-                        min_price = float(room_price)
-            
-            if available_rooms == 0:
-                day_status = "booked" if booking_info else "blocked"
-            else:
-                price = min_price
-        
-        is_available = day_status == "available"
-        if is_available:
-            total_available += 1
-        else:
-            total_booked += 1
-        
-        calendar_days.append(CalendarDay(
-            date=current_date.isoformat(),
-            is_available=is_available,
-            price=price,
-            status=day_status,
-            booking_info=booking_info
-        ))
-        
-        current_date += timedelta(days=1)
+    if check_in >= check_out:
+        raise HTTPException(status_code=400, detail="Ngày check-out phải sau ngày check-in")
     
-    return MonthlyCalendar(
-        year=year,
-        month=month,
-        days=calendar_days,
-        total_available=total_available,
-        total_booked=total_booked
+    return search_available_homestays(
+        db, check_in, check_out, guests,
+        destination_id=destination_id,
+        destination=destination,
+        category_id=category_id,
+        room_category_id=room_category_id,
+        min_price=min_price,
+        max_price=max_price,
+        page=page,
+        limit=limit
     )
 
 @router.get("/check/{homestay_id}")
@@ -186,123 +119,14 @@ def check_availability(
     if not homestay:
         raise HTTPException(status_code=404, detail="Không tìm thấy homestay")
     
-    # Lấy các phòng phù hợp
-    query = db.query(HomestayRoom).filter(
-        HomestayRoom.homestay_id == homestay_id,
-        HomestayRoom.is_available == True
-    )
-    
-    if room_category_id:
-        query = query.filter(HomestayRoom.room_category_id == room_category_id)
-    
-    # Lọc theo số khách
-    query = query.join(HomestayRoom.room_category).filter(
-        HomestayRoom.room_category.has(max_guests__gte=guests)
-    )
-    
-    rooms = query.all()
-    
-    # Nếu homestay không có phòng, kiểm tra booking trực tiếp
-    if not rooms:
-        current_date = check_in
-        while current_date < check_out:
-            existing_booking = db.query(Booking).filter(
-                Booking.homestay_id == homestay_id,
-                Booking.check_in <= current_date,
-                Booking.check_out > current_date,
-                Booking.status.in_(["confirmed", "pending", "blocked"])
-            ).first()
-            
-            if existing_booking:
-                return {
-                    "available": False,
-                    "message": f"Ngày {current_date.strftime('%d/%m/%Y')} đã {'bị chặn' if existing_booking.status == 'blocked' else 'được đặt'}. Vui lòng chọn ngày khác.",
-                    "blocked_date": current_date.isoformat()
-                }
-            current_date += timedelta(days=1)
-        
-        # Tính giá cho homestay không có phòng
-        nights = (check_out - check_in).days
-        total_price = float(homestay.price_per_night) * nights
-        
-        return {
-            "available": True,
-            "message": "Homestay khả dụng",
-            "total_price": total_price,
-            "avg_price_per_night": float(homestay.price_per_night),
-            "nights": nights
-        }
-    
-    # Homestay có phòng - kiểm tra từng phòng
-    available_rooms = []
-    
-    for room in rooms:
-        # Kiểm tra từng ngày trong khoảng thời gian
-        is_room_available = True
-        total_price = 0
-        current_date = check_in
-        blocked_reason = None
-        
-        while current_date < check_out and is_room_available:
-            # Kiểm tra availability - Nếu có record và is_available = False thì bị chặn
-            availability = db.query(RoomAvailability).filter(
-                RoomAvailability.room_id == room.id,
-                RoomAvailability.date == current_date
-            ).first()
-            
-            if availability and not availability.is_available:
-                is_room_available = False
-                blocked_reason = f"Ngày {current_date.strftime('%d/%m/%Y')} bị chặn"
-                break
-            
-            # Kiểm tra booking trùng lịch (bao gồm cả blocked)
-            existing_booking = db.query(Booking).filter(
-                Booking.homestay_id == homestay_id,
-                Booking.check_in <= current_date,
-                Booking.check_out > current_date,
-                Booking.status.in_(["confirmed", "pending", "blocked"])
-            ).first()
-            
-            if existing_booking:
-                is_room_available = False
-                blocked_reason = f"Ngày {current_date.strftime('%d/%m/%Y')} đã {'bị chặn' if existing_booking.status == 'blocked' else 'được đặt'}"
-                break
-            
-            # Tính giá
-            day_price = availability.price_override if availability and availability.price_override else (room.price_per_night or room.room_category.base_price)
-            total_price += float(day_price)
-            
-            current_date += timedelta(days=1)
-        
-        if is_room_available:
-            available_rooms.append({
-                "room_id": room.id,
-                "room_number": room.room_number,
-                "room_name": room.custom_name or room.room_category.name,
-                "category": room.room_category.name,
-                "max_guests": room.room_category.max_guests,
-                "total_price": total_price,
-                "avg_price_per_night": total_price / (check_out - check_in).days
-            })
-    
-    if len(available_rooms) == 0:
-        return {
-            "available": False,
-            "message": "Không có phòng trống trong khoảng thời gian này. Vui lòng chọn ngày khác."
-        }
-    
-    return {
-        "available": len(available_rooms) > 0,
-        "available_rooms": available_rooms,
-        "total_rooms": len(available_rooms)
-    }
+    return check_stay(db, homestay, check_in, check_out, guests, room_category_id)
 
 @router.get("/blocked-dates/{homestay_id}")
 def get_blocked_dates(
     homestay_id: int,
     start_date: date = Query(...),
     end_date: date = Query(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Lấy danh sách ngày bị chặn/không available"""
     
@@ -323,20 +147,23 @@ def get_blocked_dates(
         # Homestay có phòng - kiểm tra availability
         blocked_availability = db.query(RoomAvailability).join(HomestayRoom).filter(
             HomestayRoom.homestay_id == homestay_id,
-            RoomAvailability.date >= start_date,
-            RoomAvailability.date <= end_date,
+            RoomAvailability.start_date <= end_date,
+            RoomAvailability.end_date > start_date,
             RoomAvailability.is_available == False
-        ).all()
+        ).order_by(RoomAvailability.room_id).all()
         
         for availability in blocked_availability:
-            date_key = availability.date.isoformat()
-            if date_key not in blocked_dates_dict:
-                blocked_dates_dict[date_key] = {
-                    "date": date_key,
-                    "reason": "Bị chặn bởi chủ nhà",
-                    "type": "blocked",
-                    "room_id": availability.room_id
-                }
+            current_date = max(availability.start_date, start_date)
+            while current_date < availability.end_date and current_date <= end_date:
+                date_key = current_date.isoformat()
+                if date_key not in blocked_dates_dict:
+                    blocked_dates_dict[date_key] = {
+                        "date": date_key,
+                        "reason": "Bị chặn bởi chủ nhà",
+                        "type": "blocked",
+                        "room_id": availability.room_id
+                    }
+                current_date += timedelta(days=1)
     
     # Lấy ngày đã được đặt (bao gồm cả blocked bookings)
     bookings = db.query(Booking).filter(
@@ -389,115 +216,7 @@ def get_quick_availability(
 ):
     """API nhanh để frontend hiển thị availability"""
     
-    # Tạo range ngày trong tháng
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = date(year, month + 1, 1) - timedelta(days=1)
-    
-    # Lấy tất cả phòng
-    rooms = db.query(HomestayRoom).filter(
-        HomestayRoom.homestay_id == homestay_id,
-        HomestayRoom.is_available == True
-    ).all()
-    
-    # Lấy tất cả bookings trong tháng (bao gồm cả blocked)
-    bookings = db.query(Booking).filter(
-        Booking.homestay_id == homestay_id,
-        Booking.status.in_(["confirmed", "pending", "blocked"]),
-        Booking.check_in <= end_date,
-        Booking.check_out >= start_date
-    ).all()
-    
-    availability_data = {}
-    current_date = start_date
-    
-    while current_date <= end_date:
-        available_count = 0
-        booked_count = 0
-        pending_count = 0
-        min_price = None
-        
-        for room in rooms:
-            # Kiểm tra availability
-            availability = db.query(RoomAvailability).filter(
-                RoomAvailability.room_id == room.id,
-                RoomAvailability.date == current_date
-            ).first()
-            
-            # Chỉ coi là available nếu có record availability và is_available = True
-            # Hoặc nếu không có record availability nào thì coi như chưa được thiết lập
-            is_available = False
-            if availability:
-                is_available = availability.is_available
-            
-            # Kiểm tra booking
-            booking = next((
-                b for b in bookings 
-                if b.check_in <= current_date < b.check_out
-            ), None)
-            
-            if booking:
-                if booking.status == "confirmed":
-                    booked_count += 1
-                elif booking.status == "pending":
-                    pending_count += 1
-                # Nếu status là "blocked" thì không tăng counter nào, sẽ xử lý ở logic sau
-            elif is_available:
-                available_count += 1
-                room_price = availability.price_override if availability and availability.price_override else (room.price_per_night or room.room_category.base_price)
-                if min_price is None or room_price < min_price:
-                    min_price = float(room_price)
-        
-        # Xác định màu sắc và trạng thái
-        # Kiểm tra xem có bất kỳ availability record nào cho ngày này không
-        has_availability_data = db.query(RoomAvailability).join(HomestayRoom).filter(
-            HomestayRoom.homestay_id == homestay_id,
-            RoomAvailability.date == current_date
-        ).first() is not None
-        
-        # Kiểm tra có booking blocked không
-        blocked_booking = next((
-            b for b in bookings 
-            if b.check_in <= current_date < b.check_out and b.status == "blocked"
-        ), None)
-        
-        if available_count > 0:
-            color = "#4caf50"  # Xanh lá - trống
-            status = "available"
-        elif blocked_booking or (has_availability_data and available_count == 0 and booked_count == 0 and pending_count == 0):
-            color = "#9e9e9e"  # Xám - bị chặn
-            status = "blocked"
-        elif pending_count > 0:
-            color = "#ff9800"  # Vàng - chờ xác nhận  
-            status = "pending"
-        elif booked_count > 0:
-            color = "#f44336"  # Đỏ - đã đặt
-            status = "booked"
-        else:
-            # Chưa có dữ liệu availability được thiết lập
-            color = "#e0e0e0"  # Xám nhạt - chưa thiết lập
-            status = "not_set"
-        
-        availability_data[current_date.isoformat()] = {
-            "status": status,
-            "color": color,
-            "available_rooms": available_count,
-            "booked_rooms": booked_count,
-            "pending_rooms": pending_count,
-            "min_price": min_price,
-            "tooltip": f"Trống: {available_count}, Đặt: {booked_count}, Chờ: {pending_count}" if has_availability_data else "Chưa thiết lập lịch trống"
-        }
-        
-        current_date += timedelta(days=1)
-    
-    return {
-        "month": month,
-        "year": year,
-        "availability": availability_data,
-        "total_rooms": len(rooms)
-    }
+    return quick_availability(db, homestay_id, year, month)
 
 @router.post("/block-dates/{homestay_id}")
 def block_dates(
@@ -513,94 +232,30 @@ def block_dates(
     if not homestay:
         raise HTTPException(status_code=404, detail="Homestay không tồn tại")
     
-    # Lấy danh sách phòng cần block
-    if room_ids:
-        rooms = db.query(HomestayRoom).filter(
-            HomestayRoom.homestay_id == homestay_id,
-            HomestayRoom.id.in_(room_ids)
-        ).all()
-    else:
-        rooms = db.query(HomestayRoom).filter(
-            HomestayRoom.homestay_id == homestay_id,
-            HomestayRoom.is_available == True
-        ).all()
+    days = parse_dates(dates)
+    rooms = _target_room_ids(db, homestay_id, room_ids)
     
     if not rooms:
         # Homestay không có phòng - tạo booking giả để chặn ngày
-        blocked_count = 0
-        for date_str in dates:
-            try:
-                block_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                block_date = datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
-            
-            # Kiểm tra xem đã có booking chặn chưa
-            existing = db.query(Booking).filter(
-                Booking.homestay_id == homestay_id,
-                Booking.check_in == block_date,
-                Booking.status == "blocked"
-            ).first()
-            
-            if not existing:
-                # Tạo booking với status "blocked"
-                blocked_booking = Booking(
-                    booking_code=f"BLOCKED_{homestay_id}_{block_date.strftime('%Y%m%d')}",
-                    homestay_id=homestay_id,
-                    check_in=block_date,
-                    check_out=block_date + timedelta(days=1),
-                    guests=0,
-                    total_price=0,
-                    status="blocked",
-                    guest_details={"reason": "Blocked by host"},
-                    payment_method="none"
-                )
-                db.add(blocked_booking)
-                blocked_count += 1
-        
+        summary = block_homestay_days(db, homestay_id, days)
         db.commit()
+        summary.pop("inserted_dates")
         return {
-            "message": f"Đã chặn {blocked_count} ngày cho homestay",
+            "message": f"Đã chặn {summary['inserted_cells']} ngày cho homestay",
             "blocked_dates": dates,
-            "affected_rooms": 0
+            "affected_rooms": 0,
+            **summary
         }
     
-    blocked_count = 0
-    
-    for date_str in dates:
-        # Parse date and ensure it's a date object
-        try:
-            block_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        except ValueError:
-            # Try parsing as datetime if it includes time
-            block_date = datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
-        
-        print(f"Processing block date: {date_str} -> {block_date}")
-        
-        for room in rooms:
-            # Kiểm tra xem đã có availability record chưa
-            existing = db.query(RoomAvailability).filter(
-                RoomAvailability.room_id == room.id,
-                RoomAvailability.date == block_date
-            ).first()
-            
-            if existing:
-                existing.is_available = False
-            else:
-                availability = RoomAvailability(
-                    room_id=room.id,
-                    date=block_date,
-                    is_available=False
-                )
-                db.add(availability)
-            
-            blocked_count += 1
-    
+    summary = block_room_days(db, homestay_id, rooms, days)
     db.commit()
+    summary.pop("blocked_cells")
     
     return {
-        "message": f"Đã chặn {blocked_count} ngày cho {len(rooms)} phòng",
+        "message": f"Đã chặn {summary['affected_cells']} ngày cho {len(rooms)} phòng",
         "blocked_dates": dates,
-        "affected_rooms": len(rooms)
+        "affected_rooms": len(rooms),
+        **summary
     }
 
 @router.post("/unblock-dates/{homestay_id}")
@@ -612,44 +267,196 @@ def unblock_dates(
 ):
     """Bỏ chặn ngày cụ thể cho phòng"""
     
-    # Lấy danh sách phòng cần unblock
+    days = parse_dates(dates)
+    rooms = _target_room_ids(db, homestay_id, room_ids)
+    
+    summary = unblock_room_days(db, homestay_id, rooms, days)
+    db.commit()
+    
+    return {
+        "message": f"Đã bỏ chặn {summary['affected_cells']} ngày",
+        "unblocked_dates": dates,
+        "affected_rooms": len(rooms),
+        **summary
+    }
+
+def _target_room_ids(db: Session, homestay_id: int, room_ids: Optional[List[int]]) -> List[int]:
+    """Phòng cần chặn/bỏ chặn: các phòng được chọn, mặc định là mọi phòng đang hoạt động"""
+    query = db.query(HomestayRoom.id).filter(HomestayRoom.homestay_id == homestay_id)
     if room_ids:
-        rooms = db.query(HomestayRoom).filter(
-            HomestayRoom.homestay_id == homestay_id,
-            HomestayRoom.id.in_(room_ids)
-        ).all()
+        query = query.filter(HomestayRoom.id.in_(room_ids))
     else:
-        rooms = db.query(HomestayRoom).filter(
-            HomestayRoom.homestay_id == homestay_id,
-            HomestayRoom.is_available == True
-        ).all()
+        query = query.filter(HomestayRoom.is_available == True)
+    return [room_id for (room_id,) in query.order_by(HomestayRoom.id).all()]
+
+def _sync_status(state: CalendarSync) -> Dict:
+    return {
+        "sync_id": state.id,
+        "provider": state.provider,
+        "calendar_id": state.calendar_id,
+        "status": state.status,
+        "last_error": state.last_error,
+        "last_synced_at": state.last_synced_at.isoformat() if state.last_synced_at else None,
+        "blocked_dates": len(state.blocked_dates or [])
+    }
+
+@router.post("/sync-calendar/{homestay_id}", status_code=202)
+def sync_with_calendar(
+    homestay_id: int,
+    config: CalendarSyncConfig,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin_or_host)
+):
+    """Đưa việc đồng bộ lịch ngoài (Google Calendar) vào hàng đợi chạy nền"""
     
-    unblocked_count = 0
+    homestay = db.query(Homestay).filter(Homestay.id == homestay_id).first()
+    if not homestay:
+        raise HTTPException(status_code=404, detail="Homestay không tồn tại")
+    if current_user.role == 'host' and homestay.host_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Không có quyền truy cập")
+    if config.provider != 'google':
+        raise HTTPException(status_code=400, detail="Nhà cung cấp lịch không được hỗ trợ")
+    
+    state = db.query(CalendarSync).filter(
+        CalendarSync.homestay_id == homestay_id,
+        CalendarSync.provider == config.provider,
+        CalendarSync.calendar_id == config.calendar_id
+    ).first()
+    if state and is_running(state):
+        raise HTTPException(status_code=409, detail="Lịch đang được đồng bộ")
+    if not state:
+        state = CalendarSync(
+            homestay_id=homestay_id,
+            provider=config.provider,
+            calendar_id=config.calendar_id,
+            status="idle"
+        )
+        db.add(state)
+        db.commit()
+        db.refresh(state)
     
-    for date_str in dates:
-        # Parse date and ensure it's a date object
+    background_tasks.add_task(run_calendar_sync, state.id, config.access_token)
+    
+    return {
+        "success": True,
+        "message": "Đã đưa yêu cầu đồng bộ lịch vào hàng đợi",
+        **_sync_status(state)
+    }
+
+@router.get("/sync-calendar/{homestay_id}")
+def get_calendar_sync_status(
+    homestay_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin_or_host)
+):
+    """Trạng thái đồng bộ lịch ngoài của homestay"""
+    
+    homestay = db.query(Homestay).filter(Homestay.id == homestay_id).first()
+    if not homestay:
+        raise HTTPException(status_code=404, detail="Homestay không tồn tại")
+    if current_user.role == 'host' and homestay.host_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Không có quyền truy cập")
+    
+    states = db.query(CalendarSync).filter(CalendarSync.homestay_id == homestay_id).order_by(CalendarSync.id).all()
+    return {"syncs": [_sync_status(state) for state in states]}
+
+def _ical_response(request: Request, feed) -> Response:
+    """Trả feed ICS, hoặc 304 nếu ETag/Last-Modified của client vẫn còn đúng"""
+    headers = {"ETag": feed.etag, "Cache-Control": "no-cache"}
+    # Không có Last-Modified (bitmap dựng tạm) thì chỉ so ETag
+    last_modified = feed.last_modified.replace(microsecond=0) if feed.last_modified else None
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match:
+        if if_none_match.strip() == "*" or feed.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since and last_modified:
         try:
-            unblock_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        except ValueError:
-            # Try parsing as datetime if it includes time
-            unblock_date = datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
-        
-        print(f"Processing unblock date: {date_str} -> {unblock_date}")
-        
-        for room in rooms:
-            availability = db.query(RoomAvailability).filter(
-                RoomAvailability.room_id == room.id,
-                RoomAvailability.date == unblock_date
-            ).first()
-            
-            if availability:
-                availability.is_available = True
-                unblocked_count += 1
+            if parsedate_to_datetime(if_modified_since) >= last_modified:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
     
-    db.commit()
+    return Response(content=feed.body, media_type="text/calendar; charset=utf-8", headers=headers)
+
+@router.get("/ical/{homestay_id}.ics")
+def export_homestay_ical(
+    homestay_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Feed iCal các ngày homestay không nhận khách (đã đặt hoặc bị chặn)"""
+    
+    homestay = db.query(Homestay.id).filter(Homestay.id == homestay_id).first()
+    if not homestay:
+        raise HTTPException(status_code=404, detail="Homestay không tồn tại")
+    
+    return _ical_response(request, export_feed(db, homestay_id))
+
+@router.get("/ical/{homestay_id}/rooms/{room_id}.ics")
+def export_room_ical(
+    homestay_id: int,
+    room_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Feed iCal các ngày một phòng không nhận khách"""
+    
+    room = db.query(HomestayRoom.id).filter(
+        HomestayRoom.id == room_id,
+        HomestayRoom.homestay_id == homestay_id
+    ).first()
+    if not room:
+        raise HTTPException(status_code=404, detail="Không tìm thấy phòng")
+    
+    return _ical_response(request, export_feed(db, homestay_id, room_id))
+
+@router.post("/ical-import/{homestay_id}", status_code=202)
+def import_ical_feed(
+    homestay_id: int,
+    config: ICalImportConfig,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin_or_host)
+):
+    """Đưa việc nhập feed iCal từ kênh khác vào hàng đợi chạy nền"""
+    
+    homestay = db.query(Homestay).filter(Homestay.id == homestay_id).first()
+    if not homestay:
+        raise HTTPException(status_code=404, detail="Homestay không tồn tại")
+    if current_user.role == 'host' and homestay.host_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Không có quyền truy cập")
+    try:
+        validate_feed_url(config.url)
+    except UnsafeFeedURL as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    state = db.query(CalendarSync).filter(
+        CalendarSync.homestay_id == homestay_id,
+        CalendarSync.provider == "ical",
+        CalendarSync.calendar_id == config.url
+    ).first()
+    if state and is_running(state):
+        raise HTTPException(status_code=409, detail="Feed đang được đồng bộ")
+    if not state:
+        state = CalendarSync(
+            homestay_id=homestay_id,
+            provider="ical",
+            calendar_id=config.url,
+            status="idle"
+        )
+        db.add(state)
+        db.commit()
+        db.refresh(state)
+    
+    background_tasks.add_task(run_ical_import, state.id)
     
     return {
-        "message": f"Đã bỏ chặn {unblocked_count} ngày",
-        "unblocked_dates": dates,
-        "affected_rooms": len(rooms)
-    }
\ No newline at end of file
+        "success": True,
+        "message": "Đã đưa yêu cầu nhập feed iCal vào hàng đợi",
+        **_sync_status(state)
+    }
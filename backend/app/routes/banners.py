@@ -40,7 +40,7 @@ def get_banners_by_position(
         return {"banners": []}
 
 @router.get("/active")
-async def get_all_active_banners(db: Session = Depends(get_db)):
+def get_all_active_banners(db: Session = Depends(get_db)):
     """Lấy tất cả banner đang active (cho khách hàng)"""
     
     now = datetime.now()
@@ -6,6 +6,7 @@ from datetime import datetime
 from app.db import get_db
 from app.auth import get_current_user
 from app.models import Booking, Homestay, User
+from app.services.occupancy import refresh_bookings
 from sqlalchemy import text
 
 router = APIRouter(tags=["bookings"])
@@ -24,7 +25,7 @@ class BookingCreate(BaseModel):
     special_requests: Optional[str] = None
 
 @router.post("")
-async def create_booking(
+def create_booking(
     booking_data: BookingCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -85,6 +86,8 @@ async def create_booking(
         )
         
         db.add(booking)
+        db.flush()
+        refresh_bookings(db, booking.homestay_id)
         db.commit()
         db.refresh(booking)
         
@@ -105,7 +108,7 @@ async def create_booking(
         raise HTTPException(status_code=400, detail=f"Lỗi tạo booking: {str(e)}")
 
 @router.get("/user")
-async def get_user_bookings(
+def get_user_bookings(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
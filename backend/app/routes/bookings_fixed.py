@@ -24,7 +24,7 @@ class BookingCreate(BaseModel):
     special_requests: Optional[str] = None
 
 @router.post("")
-async def create_booking(
+def create_booking(
     booking_data: BookingCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -105,7 +105,7 @@ async def create_booking(
         raise HTTPException(status_code=400, detail=f"Lỗi tạo booking: {str(e)}")
 
 @router.get("/user")
-async def get_user_bookings(
+def get_user_bookings(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
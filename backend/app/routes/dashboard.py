@@ -7,9 +7,14 @@ from pydantic import BaseModel
 import os
 import uuid
 import shutil
-from app.db import get_db
+from app.db import get_db, get_read_db
 from app.models import User, Homestay, Booking, Payment, Review, Category, BlogPost, SiteSettings, HomestayImage
 from app.auth import get_current_user, require_admin_or_host
+from app.services.ratings import review_approval_changed, review_removed
+from app.services.autocomplete import forget_after_commit
+from app.services.homestay_page import invalidate_sections
+from app.services.snapshots import mark_stale_after_commit
+from app.services.pagination import paginate, page_info
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
@@ -49,9 +54,9 @@ class HomestayUpdate(BaseModel):
     featured: Optional[bool] = None
 
 @router.get("/stats")
-async def get_dashboard_stats(
+def get_dashboard_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Lấy thống kê tổng quan dashboard"""
     
@@ -94,9 +99,11 @@ async def get_dashboard_stats(
     }
 
 @router.get("/users")
-async def get_users(
+def get_users(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
     role: Optional[str] = None,
     search: Optional[str] = None,
     current_user: User = Depends(require_admin_or_host),
@@ -118,21 +125,19 @@ async def get_users(
             )
         )
     
-    total = query.count()
-    users = query.offset((page - 1) * limit).limit(limit).all()
+    users, next_cursor = paginate(query, [(User.id, False)], limit, page, cursor)
     
     return {
         "users": users,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.get("/homestays")
-async def get_homestays(
+def get_homestays(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
     category_id: Optional[int] = None,
     search: Optional[str] = None,
     current_user: User = Depends(require_admin_or_host),
@@ -157,21 +162,19 @@ async def get_homestays(
             )
         )
     
-    total = query.count()
-    homestays = query.order_by(desc(Homestay.created_at)).offset((page - 1) * limit).limit(limit).all()
+    homestays, next_cursor = paginate(query, [(Homestay.created_at, True), (Homestay.id, True)], limit, page, cursor)
     
     return {
         "homestays": homestays,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.get("/bookings")
-async def get_bookings(
+def get_bookings(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
     status: Optional[str] = None,
     search: Optional[str] = None,
     current_user: User = Depends(require_admin_or_host),
@@ -196,21 +199,19 @@ async def get_bookings(
             )
         )
     
-    total = query.count()
-    bookings = query.order_by(desc(Booking.created_at)).offset((page - 1) * limit).limit(limit).all()
+    bookings, next_cursor = paginate(query, [(Booking.created_at, True), (Booking.id, True)], limit, page, cursor)
     
     return {
         "bookings": bookings,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.get("/payments")
-async def get_payments(
+def get_payments(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
     status: Optional[str] = None,
     current_user: User = Depends(require_admin_or_host),
     db: Session = Depends(get_db)
@@ -225,21 +226,19 @@ async def get_payments(
     if status:
         query = query.filter(Payment.status == status)
     
-    total = query.count()
-    payments = query.order_by(desc(Payment.created_at)).offset((page - 1) * limit).limit(limit).all()
+    payments, next_cursor = paginate(query, [(Payment.created_at, True), (Payment.id, True)], limit, page, cursor)
     
     return {
         "payments": payments,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.get("/reviews")
-async def get_reviews(
+def get_reviews(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
     is_approved: Optional[bool] = None,
     current_user: User = Depends(require_admin_or_host),
     db: Session = Depends(get_db)
@@ -254,22 +253,65 @@ async def get_reviews(
     if is_approved is not None:
         query = query.filter(Review.is_approved == is_approved)
     
-    total = query.count()
-    reviews = query.order_by(desc(Review.created_at)).offset((page - 1) * limit).limit(limit).all()
+    reviews, next_cursor = paginate(query, [(Review.created_at, True), (Review.id, True)], limit, page, cursor)
     
     return {
         "reviews": reviews,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
+    }
+
+def _get_managed_review(db: Session, review_id: int, current_user: User) -> Review:
+    review = db.query(Review).filter(Review.id == review_id).first()
+    
+    if not review:
+        raise HTTPException(status_code=404, detail="Không tìm thấy đánh giá")
+    
+    # Kiểm tra quyền truy cập nếu là host
+    if current_user.role == 'host' and review.homestay.host_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Không có quyền quản lý đánh giá này")
+    
+    return review
+
+@router.patch("/reviews/{review_id}/approve")
+def approve_review(
+    review_id: int,
+    is_approved: bool = True,
+    current_user: User = Depends(require_admin_or_host),
+    db: Session = Depends(get_db)
+):
+    """Duyệt hoặc ẩn đánh giá"""
+    
+    review = _get_managed_review(db, review_id, current_user)
+    was_approved = review.is_approved
+    review.is_approved = is_approved
+    review_approval_changed(db, review, was_approved)
+    db.commit()
+    
+    return {
+        "message": "Đánh giá đã được duyệt" if is_approved else "Đánh giá đã bị ẩn",
+        "review": review
     }
 
+@router.delete("/reviews/{review_id}")
+def delete_review(
+    review_id: int,
+    current_user: User = Depends(require_admin_or_host),
+    db: Session = Depends(get_db)
+):
+    """Xóa đánh giá"""
+    
+    review = _get_managed_review(db, review_id, current_user)
+    review_removed(db, review)
+    db.delete(review)
+    db.commit()
+    
+    return {"message": "Đánh giá đã được xóa"}
+
 @router.get("/revenue-chart")
-async def get_revenue_chart(
+def get_revenue_chart(
     period: str = Query("month", regex="^(week|month|year)$"),
     current_user: User = Depends(require_admin_or_host),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Lấy dữ liệu biểu đồ doanh thu"""
     
@@ -302,9 +344,11 @@ async def get_revenue_chart(
     return {"data": []}
 
 @router.get("/homestays/pending")
-async def get_pending_homestays(
+def get_pending_homestays(
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
     current_user: User = Depends(require_admin_or_host),
     db: Session = Depends(get_db)
 ):
@@ -316,19 +360,15 @@ async def get_pending_homestays(
     if current_user.role == 'host':
         query = query.filter(Homestay.host_id == current_user.id)
     
-    total = query.count()
-    homestays = query.order_by(desc(Homestay.created_at)).offset((page - 1) * limit).limit(limit).all()
+    homestays, next_cursor = paginate(query, [(Homestay.created_at, True), (Homestay.id, True)], limit, page, cursor)
     
     return {
         "homestays": homestays,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.patch("/homestays/{homestay_id}/approve")
-async def approve_homestay(
+def approve_homestay(
     homestay_id: int,
     current_user: User = Depends(require_admin_or_host),
     db: Session = Depends(get_db)
@@ -353,7 +393,7 @@ async def approve_homestay(
     }
 
 @router.patch("/homestays/{homestay_id}/reject")
-async def reject_homestay(
+def reject_homestay(
     homestay_id: int,
     reason: str = None,
     current_user: User = Depends(require_admin_or_host),
@@ -381,7 +421,7 @@ async def reject_homestay(
     }
 
 @router.patch("/homestays/{homestay_id}/status")
-async def update_homestay_status(
+def update_homestay_status(
     homestay_id: int,
     status: str,
     current_user: User = Depends(require_admin_or_host),
@@ -410,7 +450,7 @@ async def update_homestay_status(
     }
 
 @router.get("/categories")
-async def get_categories(
+def get_categories(
     current_user: User = Depends(require_admin_or_host),
     db: Session = Depends(get_db)
 ):
@@ -420,7 +460,7 @@ async def get_categories(
 
 # HOMESTAY CRUD OPERATIONS
 @router.post("/homestays")
-async def create_homestay(
+def create_homestay(
     homestay_data: HomestayCreate,
     current_user: User = Depends(require_admin_or_host),
     db: Session = Depends(get_db)
@@ -458,7 +498,7 @@ async def create_homestay(
     }
 
 @router.post("/homestays/{homestay_id}/upload-images")
-async def upload_homestay_images(
+def upload_homestay_images(
     homestay_id: int,
     files: List[UploadFile] = File(...),
     current_user: User = Depends(require_admin_or_host),
@@ -522,7 +562,7 @@ async def upload_homestay_images(
     }
 
 @router.get("/homestays/{homestay_id}")
-async def get_homestay(
+def get_homestay(
     homestay_id: int,
     current_user: User = Depends(require_admin_or_host),
     db: Session = Depends(get_db)
@@ -541,7 +581,7 @@ async def get_homestay(
     return {"homestay": homestay}
 
 @router.put("/homestays/{homestay_id}")
-async def update_homestay(
+def update_homestay(
     homestay_id: int,
     homestay_data: HomestayUpdate,
     current_user: User = Depends(require_admin_or_host),
@@ -572,7 +612,7 @@ async def update_homestay(
     }
 
 @router.options("/homestays/{homestay_id}")
-async def options_homestay(homestay_id: int):
+def options_homestay(homestay_id: int):
     """Handle OPTIONS request for homestay operations"""
     response = Response()
     response.headers["Access-Control-Allow-Origin"] = "http://localhost:3000"
@@ -582,7 +622,7 @@ async def options_homestay(homestay_id: int):
     return response
 
 @router.delete("/homestays/{homestay_id}")
-async def delete_homestay(
+def delete_homestay(
     homestay_id: int,
     current_user: User = Depends(require_admin_or_host),
     db: Session = Depends(get_db)
@@ -616,7 +656,25 @@ async def delete_homestay(
             {"homestay_id": homestay_id}
         )
         
-        # 5. Cuối cùng xóa homestay
+        # 5. Xóa bitmap occupancy
+        db.execute(
+            text("DELETE FROM room_occupancy WHERE homestay_id = :homestay_id"),
+            {"homestay_id": homestay_id}
+        )
+        
+        # 6. Xóa trạng thái đồng bộ lịch
+        db.execute(
+            text("DELETE FROM calendar_syncs WHERE homestay_id = :homestay_id"),
+            {"homestay_id": homestay_id}
+        )
+        
+        # 7. Xóa chỉ mục tìm kiếm
+        db.execute(
+            text("DELETE FROM search_terms WHERE entity_type = 'homestay' AND entity_id = :homestay_id"),
+            {"homestay_id": homestay_id}
+        )
+        
+        # 8. Cuối cùng xóa homestay
         result = db.execute(
             text("DELETE FROM homestays WHERE id = :homestay_id"),
             {"homestay_id": homestay_id}
@@ -625,6 +683,9 @@ async def delete_homestay(
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Không tìm thấy homestay")
         
+        forget_after_commit(db, "homestay", homestay_id)
+        invalidate_sections(db, homestay_id)
+        mark_stale_after_commit(db)
         db.commit()
         
         return {"message": "Homestay đã được xóa thành công"}
@@ -638,7 +699,7 @@ async def delete_homestay(
         )
 
 @router.delete("/homestays/{homestay_id}/images/{image_id}")
-async def delete_homestay_image(
+def delete_homestay_image(
     homestay_id: int,
     image_id: int,
     current_user: User = Depends(require_admin_or_host),
@@ -684,7 +745,7 @@ async def delete_homestay_image(
     return {"message": "Đã xóa ảnh thành công"}
 
 @router.patch("/homestays/{homestay_id}/images/{image_id}/primary")
-async def set_primary_image(
+def set_primary_image(
     homestay_id: int,
     image_id: int,
     current_user: User = Depends(require_admin_or_host),
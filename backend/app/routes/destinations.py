@@ -3,13 +3,17 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, and_, or_
 from typing import List, Optional
 import json
-from app.db import get_db
+from app.db import get_db, get_read_db
 from app.models import Destination, DestinationReview, DestinationWishlist, Homestay, User
+from app.services.listing import listing_options
+from app.services.pagination import paginate, page_info
+from app.services.search import match_scores
+from app.services.snapshots import featured_destinations
 
 router = APIRouter(prefix="/destinations", tags=["destinations"])
 
 @router.get("/")
-async def get_destinations(
+def get_destinations(
     page: int = Query(1, ge=1),
     limit: int = Query(12, ge=1, le=50),
     province: Optional[str] = None,
@@ -17,7 +21,9 @@ async def get_destinations(
     season: Optional[str] = None,
     search: Optional[str] = None,
     sort_by: Optional[str] = Query("featured", description="featured, popular, newest, rating"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
+    db: Session = Depends(get_read_db)
 ):
     """Lấy danh sách điểm đến với bộ lọc và tìm kiếm"""
     
@@ -38,28 +44,26 @@ async def get_destinations(
             )
         )
     
-    if search:
-        query = query.filter(
-            or_(
-                Destination.name.ilike(f"%{search}%"),
-                Destination.description.ilike(f"%{search}%"),
-                Destination.province.ilike(f"%{search}%"),
-                Destination.city.ilike(f"%{search}%")
-            )
-        )
+    # Tìm kiếm qua chỉ mục từ đã bỏ dấu
+    matches = match_scores(db, "destination", search) if search else None
+    if matches is not None:
+        query = query.join(matches, matches.c.entity_id == Destination.id)
     
-    # Apply sorting
+    # Apply sorting (id ở cuối để thứ tự xác định, dùng được cho cursor)
+    sort_keys = [(Destination.id, True)]
     if sort_by == "featured":
-        query = query.order_by(desc(Destination.is_featured), desc(Destination.view_count))
+        sort_keys = [(Destination.is_featured, True), (Destination.view_count, True)] + sort_keys
+        # Khi tìm kiếm, sắp xếp mặc định ưu tiên độ liên quan
+        if matches is not None:
+            sort_keys = [(matches.c.score, True)] + sort_keys
     elif sort_by == "popular":
-        query = query.order_by(desc(Destination.view_count))
+        sort_keys = [(Destination.view_count, True)] + sort_keys
     elif sort_by == "newest":
-        query = query.order_by(desc(Destination.created_at))
+        sort_keys = [(Destination.created_at, True)] + sort_keys
     elif sort_by == "rating":
-        query = query.order_by(desc(Destination.avg_rating))
+        sort_keys = [(Destination.avg_rating, True)] + sort_keys
     
-    total = query.count()
-    destinations = query.offset((page - 1) * limit).limit(limit).all()
+    destinations, next_cursor = paginate(query, sort_keys, limit, page, cursor)
     
     # Enrich destinations with homestay count
     enriched_destinations = []
@@ -93,70 +97,21 @@ async def get_destinations(
     
     return {
         "destinations": enriched_destinations,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.get("/featured")
-async def get_featured_destinations(
+def get_featured_destinations(
     limit: int = Query(6, ge=1, le=20),
     db: Session = Depends(get_db)
 ):
     """Lấy danh sách điểm đến nổi bật cho trang chủ"""
     
-    # Lấy destinations featured trước
-    featured_destinations = db.query(Destination).filter(
-        and_(
-            Destination.is_active == True,
-            Destination.is_featured == True
-        )
-    ).order_by(desc(Destination.view_count)).limit(limit).all()
-    
-    # Nếu không đủ featured, lấy thêm destinations phổ biến khác
-    if len(featured_destinations) < limit:
-        featured_ids = [d.id for d in featured_destinations]
-        additional_destinations = db.query(Destination).filter(
-            and_(
-                Destination.is_active == True,
-                ~Destination.id.in_(featured_ids)
-            )
-        ).order_by(desc(Destination.view_count)).limit(limit - len(featured_destinations)).all()
-        
-        destinations = featured_destinations + additional_destinations
-    else:
-        destinations = featured_destinations
-    
-    # Enrich with homestay count
-    enriched_destinations = []
-    for destination in destinations:
-        homestay_count = db.query(Homestay).filter(
-            and_(
-                Homestay.destination_id == destination.id,
-                Homestay.status == 'active',
-                Homestay.is_active == True
-            )
-        ).count()
-        
-        destination_data = {
-            "id": destination.id,
-            "name": destination.name,
-            "slug": destination.slug,
-            "short_description": destination.short_description,
-            "province": destination.province,
-            "banner_image": destination.banner_image,
-            "is_featured": destination.is_featured,
-            "view_count": destination.view_count,
-            "avg_rating": destination.avg_rating,
-            "homestay_count": homestay_count
-        }
-        enriched_destinations.append(destination_data)
-    
-    return {"destinations": enriched_destinations}
+    # Danh sách dựng sẵn: destinations featured trước, thiếu thì bổ sung destinations phổ biến khác
+    return {"destinations": featured_destinations.get(db)[:limit]}
 
 @router.get("/{destination_slug}")
-async def get_destination_detail(
+def get_destination_detail(
     destination_slug: str,
     db: Session = Depends(get_db)
 ):
@@ -277,14 +232,16 @@ async def get_destination_detail(
     }
 
 @router.get("/{destination_id}/homestays")
-async def get_destination_homestays(
+def get_destination_homestays(
     destination_id: int,
     page: int = Query(1, ge=1),
     limit: int = Query(12, ge=1, le=50),
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     category_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
+    db: Session = Depends(get_read_db)
 ):
     """Lấy danh sách homestay trong điểm đến"""
     
@@ -317,8 +274,8 @@ async def get_destination_homestays(
     if category_id:
         query = query.filter(Homestay.category_id == category_id)
     
-    total = query.count()
-    homestays = query.order_by(desc(Homestay.featured), desc(Homestay.created_at)).offset((page - 1) * limit).limit(limit).all()
+    sort_keys = [(Homestay.featured, True), (Homestay.created_at, True), (Homestay.id, True)]
+    homestays, next_cursor = paginate(query.options(*listing_options()), sort_keys, limit, page, cursor)
     
     # Format homestays (reuse logic from homestays.py)
     enriched_homestays = []
@@ -354,14 +311,11 @@ async def get_destination_homestays(
             "slug": destination.slug
         },
         "homestays": enriched_homestays,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
 
 @router.get("/types/list")
-async def get_destination_types(db: Session = Depends(get_db)):
+def get_destination_types(db: Session = Depends(get_read_db)):
     """Lấy danh sách loại điểm đến"""
     
     types = db.query(Destination.destination_type).filter(
@@ -376,7 +330,7 @@ async def get_destination_types(db: Session = Depends(get_db)):
     }
 
 @router.get("/provinces/list")
-async def get_destination_provinces(db: Session = Depends(get_db)):
+def get_destination_provinces(db: Session = Depends(get_read_db)):
     """Lấy danh sách tỉnh/thành phố có điểm đến"""
     
     provinces = db.query(Destination.province).filter(
@@ -391,7 +345,7 @@ async def get_destination_provinces(db: Session = Depends(get_db)):
     }
 
 @router.post("/{destination_id}/reviews")
-async def create_destination_review(
+def create_destination_review(
     destination_id: int,
     rating: int = Query(..., ge=1, le=5),
     title: Optional[str] = None,
@@ -468,7 +422,7 @@ async def create_destination_review(
     }
 
 @router.post("/{destination_id}/wishlist")
-async def toggle_destination_wishlist(
+def toggle_destination_wishlist(
     destination_id: int,
     user_id: int = Query(...),  # In real app, get from JWT token
     db: Session = Depends(get_db)
@@ -54,7 +54,7 @@ class BulkAvailabilityUpdate(BaseModel):
 
 # Amenities endpoints
 @router.get("/amenities")
-async def get_amenities(
+def get_amenities(
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
@@ -63,7 +63,7 @@ async def get_amenities(
     return {"amenities": amenities}
 
 @router.post("/amenities")
-async def create_amenity(
+def create_amenity(
     amenity_data: AmenityCreate,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -82,7 +82,7 @@ async def create_amenity(
     return {"message": "Tạo tiện ích thành công", "amenity": amenity}
 
 @router.put("/amenities/{amenity_id}")
-async def update_amenity(
+def update_amenity(
     amenity_id: int,
     amenity_data: AmenityUpdate,
     current_user: User = Depends(require_admin),
@@ -102,7 +102,7 @@ async def update_amenity(
     return {"message": "Cập nhật tiện ích thành công", "amenity": amenity}
 
 @router.delete("/amenities/{amenity_id}")
-async def delete_amenity(
+def delete_amenity(
     amenity_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -119,7 +119,7 @@ async def delete_amenity(
 
 # Homestay amenities endpoints
 @router.get("/homestays/{homestay_id}/amenities")
-async def get_homestay_amenities(
+def get_homestay_amenities(
     homestay_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -132,7 +132,7 @@ async def get_homestay_amenities(
     return {"amenities": homestay.amenities}
 
 @router.post("/homestays/{homestay_id}/amenities/{amenity_id}")
-async def add_homestay_amenity(
+def add_homestay_amenity(
     homestay_id: int,
     amenity_id: int,
     current_user: User = Depends(require_admin),
@@ -154,7 +154,7 @@ async def add_homestay_amenity(
     return {"message": "Thêm tiện ích thành công"}
 
 @router.delete("/homestays/{homestay_id}/amenities/{amenity_id}")
-async def remove_homestay_amenity(
+def remove_homestay_amenity(
     homestay_id: int,
     amenity_id: int,
     current_user: User = Depends(require_admin),
@@ -177,7 +177,7 @@ async def remove_homestay_amenity(
 
 # Categories endpoints
 @router.post("/categories")
-async def create_category(
+def create_category(
     category_data: CategoryCreate,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -196,7 +196,7 @@ async def create_category(
     return {"message": "Tạo danh mục thành công", "category": category}
 
 @router.put("/categories/{category_id}")
-async def update_category(
+def update_category(
     category_id: int,
     category_data: CategoryUpdate,
     current_user: User = Depends(require_admin),
@@ -216,7 +216,7 @@ async def update_category(
     return {"message": "Cập nhật danh mục thành công", "category": category}
 
 @router.delete("/categories/{category_id}")
-async def delete_category(
+def delete_category(
     category_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -238,7 +238,7 @@ async def delete_category(
 
 # Images endpoints
 @router.get("/homestays/{homestay_id}/images")
-async def get_homestay_images(
+def get_homestay_images(
     homestay_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -252,7 +252,7 @@ async def get_homestay_images(
     return {"images": images}
 
 @router.patch("/homestays/{homestay_id}/images/{image_id}/primary")
-async def set_primary_image(
+def set_primary_image(
     homestay_id: int,
     image_id: int,
     current_user: User = Depends(require_admin),
@@ -282,7 +282,7 @@ async def set_primary_image(
     return {"message": "Đã đặt làm ảnh chính"}
 
 @router.put("/images/{image_id}")
-async def update_image_info(
+def update_image_info(
     image_id: int,
     image_data: ImageUpdate,
     current_user: User = Depends(require_admin),
@@ -302,7 +302,7 @@ async def update_image_info(
     return {"message": "Cập nhật thông tin ảnh thành công", "image": image}
 
 @router.delete("/images/{image_id}")
-async def delete_image(
+def delete_image(
     image_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -327,7 +327,7 @@ async def delete_image(
 
 # Availability endpoints
 @router.get("/homestays/{homestay_id}/availability")
-async def get_homestay_availability(
+def get_homestay_availability(
     homestay_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -344,7 +344,7 @@ async def get_homestay_availability(
     return {"availability": availability}
 
 @router.post("/availability")
-async def create_availability(
+def create_availability(
     availability_data: AvailabilityCreate,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -377,7 +377,7 @@ async def create_availability(
         return {"message": "Tạo lịch trống thành công", "availability": availability}
 
 @router.put("/availability/{availability_id}")
-async def update_availability(
+def update_availability(
     availability_id: int,
     availability_data: AvailabilityUpdate,
     current_user: User = Depends(require_admin),
@@ -397,7 +397,7 @@ async def update_availability(
     return {"message": "Cập nhật lịch trống thành công", "availability": availability}
 
 @router.delete("/availability/{availability_id}")
-async def delete_availability(
+def delete_availability(
     availability_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -413,7 +413,7 @@ async def delete_availability(
     return {"message": "Xóa lịch trống thành công"}
 
 @router.post("/availability/bulk")
-async def bulk_update_availability(
+def bulk_update_availability(
     bulk_data: BulkAvailabilityUpdate,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -2,13 +2,24 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, and_, or_
 from typing import List, Optional
-from app.db import get_db
+from datetime import date, datetime
+from app.db import get_db, get_read_db
 from app.models import Homestay, Category, Review, User, Destination
+from app.auth import get_current_user
+from app.services.listing import listing_options, host_names
+from app.services.pagination import paginate, page_info
+from app.services.facets import homestay_facets
+from app.services.homestay_page import SECTIONS, homestay_page
+from app.services.availability_engine import month_bounds
+from app.services.occupancy import blocked_days
+from app.services.snapshots import featured_homestays
+from app.services.ratings import empty_histogram, review_added
+from app.services.search import match_scores
 
 router = APIRouter(prefix="/homestays", tags=["homestays"])
 
 @router.get("/{homestay_id}/directions")
-async def get_directions(
+def get_directions(
     homestay_id: int,
     db: Session = Depends(get_db)
 ):
@@ -35,7 +46,7 @@ async def get_directions(
     }
 
 @router.get("/")
-async def get_homestays(
+def get_homestays(
     page: int = Query(1, ge=1),
     limit: int = Query(12, ge=1, le=50),
     category_id: Optional[int] = None,
@@ -44,7 +55,12 @@ async def get_homestays(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    sort_by: Optional[str] = Query(None, description="rating, reviews"),
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước; bỏ qua page"),
+    include_total: bool = False,
+    include_facets: bool = Query(False, description="Kèm số homestay theo danh mục, tiện ích, khoảng giá, sức chứa"),
+    db: Session = Depends(get_read_db)
 ):
     """Lấy danh sách homestay cho frontend"""
     
@@ -75,40 +91,31 @@ async def get_homestays(
     if max_price:
         query = query.filter(Homestay.price_per_night <= max_price)
     
-    if search:
-        query = query.filter(
-            or_(
-                Homestay.name.ilike(f"%{search}%"),
-                Homestay.description.ilike(f"%{search}%"),
-                Homestay.address.ilike(f"%{search}%")
-            )
-        )
+    # Tìm kiếm qua chỉ mục từ đã bỏ dấu, xếp hạng theo độ liên quan
+    matches = match_scores(db, "homestay", search) if search else None
+    if matches is not None:
+        query = query.join(matches, matches.c.entity_id == Homestay.id)
+    
+    if min_rating:
+        query = query.filter(Homestay.avg_rating >= min_rating)
     
-    total = query.count()
-    homestays = query.order_by(desc(Homestay.featured), desc(Homestay.created_at)).offset((page - 1) * limit).limit(limit).all()
+    # Sắp xếp theo cột rating đã tính sẵn, không quét bảng reviews
+    sort_keys = [(Homestay.featured, True), (Homestay.created_at, True), (Homestay.id, True)]
+    if sort_by == "rating":
+        sort_keys = [(Homestay.avg_rating, True), (Homestay.review_count, True)] + sort_keys
+    elif sort_by == "reviews":
+        sort_keys = [(Homestay.review_count, True)] + sort_keys
+    elif matches is not None:
+        sort_keys = [(matches.c.score, True)] + sort_keys
+    
+    homestays, next_cursor = paginate(query.options(*listing_options()), sort_keys, limit, page, cursor)
+    
+    # Chủ nhà của cả trang lấy theo lô
+    hosts = host_names(db, [homestay.host_id for homestay in homestays])
     
     # Enrich homestays with additional data
     enriched_homestays = []
     for homestay in homestays:
-        # Calculate average rating
-        avg_rating = db.query(func.avg(Review.rating)).filter(
-            and_(
-                Review.homestay_id == homestay.id,
-                Review.is_approved == True
-            )
-        ).scalar() or 0
-        
-        # Count reviews
-        review_count = db.query(Review).filter(
-            and_(
-                Review.homestay_id == homestay.id,
-                Review.is_approved == True
-            )
-        ).count()
-        
-        # Get host info
-        host = db.query(User).filter(User.id == homestay.host_id).first()
-        
         homestay_data = {
             "id": homestay.id,
             "name": homestay.name,
@@ -120,9 +127,9 @@ async def get_homestays(
             "longitude": float(homestay.longitude) if homestay.longitude else None,
             "featured": homestay.featured,
             "discount_percent": homestay.discount_percent,
-            "avg_rating": round(float(avg_rating), 1),
-            "review_count": review_count,
-            "host_name": host.name if host else "Unknown",
+            "avg_rating": round(float(homestay.avg_rating or 0), 1),
+            "review_count": homestay.review_count or 0,
+            "host_name": hosts.get(homestay.host_id, "Unknown"),
             "category": homestay.category.name if homestay.category else None,
             "images": [img.image_path for img in homestay.images] if homestay.images else [],
             "amenities": [
@@ -136,21 +143,77 @@ async def get_homestays(
         }
         enriched_homestays.append(homestay_data)
     
-    return {
+    result = {
         "homestays": enriched_homestays,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "total_pages": (total + limit - 1) // limit
+        **page_info(query, limit, page, cursor, next_cursor, include_total)
     }
+    if include_facets:
+        result["facets"] = homestay_facets(db, query)
+    return result
 
 @router.get("/{homestay_id}")
-async def get_homestay_detail(
+def get_homestay_detail(
     homestay_id: int,
     db: Session = Depends(get_db)
 ):
     """Lấy chi tiết homestay"""
     
+    page = homestay_page(db, homestay_id, ("homestay", "host", "images", "amenities", "reviews"))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy homestay")
+    
+    return {
+        "homestay": {
+            **page["homestay"],
+            "host": page["host"],
+            "images": page["images"],
+            "amenities": page["amenities"],
+            "reviews": page["reviews"]
+        }
+    }
+
+@router.get("/{homestay_id}/page")
+def get_homestay_page(
+    homestay_id: int,
+    fields: Optional[str] = Query(None, description="Các phần cần lấy, phân cách bằng dấu phẩy: " + ", ".join(SECTIONS)),
+    month: Optional[int] = Query(None, ge=1, le=12, description="Tháng của lịch nhanh (mặc định tháng hiện tại)"),
+    year: Optional[int] = Query(None, description="Năm của lịch nhanh"),
+    start_date: Optional[date] = Query(None, description="Ngày đầu khoảng ngày bị chặn (mặc định đầu tháng)"),
+    end_date: Optional[date] = Query(None, description="Ngày cuối khoảng ngày bị chặn (mặc định cuối tháng)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Toàn bộ dữ liệu trang chi tiết homestay trong một request: thông tin, chủ nhà, ảnh, tiện ích, review,
+    lịch nhanh, ngày bị chặn và SEO. Dùng fields để chỉ lấy một số phần.
+    """
+    sections = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(SECTIONS)
+    unknown = [section for section in sections if section not in SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Phần không hợp lệ: {', '.join(unknown)}")
+    
+    today = date.today()
+    year, month = year or today.year, month or today.month
+    month_start, month_end = month_bounds(year, month)
+    start_date, end_date = start_date or month_start, end_date or month_end
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Ngày bắt đầu phải trước ngày kết thúc")
+    
+    page = homestay_page(db, homestay_id, sections, year, month, start_date, end_date)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy homestay")
+    return page
+
+@router.post("/{homestay_id}/reviews")
+def create_homestay_review(
+    homestay_id: int,
+    rating: int = Query(..., ge=1, le=5),
+    comment: Optional[str] = None,
+    booking_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Tạo đánh giá cho homestay"""
+    
     homestay = db.query(Homestay).filter(
         and_(
             Homestay.id == homestay_id,
@@ -162,165 +225,56 @@ async def get_homestay_detail(
     if not homestay:
         raise HTTPException(status_code=404, detail="Không tìm thấy homestay")
     
-    # Calculate average rating
-    avg_rating = db.query(func.avg(Review.rating)).filter(
+    # Check if user already reviewed this homestay
+    existing_review = db.query(Review).filter(
         and_(
-            Review.homestay_id == homestay.id,
-            Review.is_approved == True
+            Review.homestay_id == homestay_id,
+            Review.user_id == current_user.id
         )
-    ).scalar() or 0
+    ).first()
     
-    # Count reviews
-    review_count = db.query(Review).filter(
-        and_(
-            Review.homestay_id == homestay.id,
-            Review.is_approved == True
-        )
-    ).count()
+    if existing_review:
+        raise HTTPException(status_code=400, detail="Bạn đã đánh giá homestay này rồi")
     
-    # Get reviews
-    reviews = db.query(Review).filter(
-        and_(
-            Review.homestay_id == homestay.id,
-            Review.is_approved == True
-        )
-    ).order_by(desc(Review.created_at)).limit(10).all()
+    review = Review(
+        homestay_id=homestay_id,
+        user_id=current_user.id,
+        booking_id=booking_id,
+        rating=rating,
+        comment=comment,
+        is_approved=True  # Auto approve for now
+    )
+    
+    db.add(review)
+    db.flush()
     
-    # Get host info
-    host = db.query(User).filter(User.id == homestay.host_id).first()
+    # Cập nhật tóm tắt rating của homestay trong cùng transaction
+    review_added(db, review)
+    db.commit()
+    db.refresh(review)
     
     return {
-        "homestay": {
-            "id": homestay.id,
-            "name": homestay.name,
-            "description": homestay.description,
-            "price_per_night": float(homestay.price_per_night),
-            "max_guests": homestay.max_guests,
-            "address": homestay.address,
-            "latitude": float(homestay.latitude) if homestay.latitude else None,
-            "longitude": float(homestay.longitude) if homestay.longitude else None,
-            "contact_info": homestay.contact_info,
-            "rules": homestay.rules,
-            "check_in_out_times": homestay.check_in_out_times,
-            "featured": homestay.featured,
-            "discount_percent": homestay.discount_percent,
-            "avg_rating": round(float(avg_rating), 1),
-            "review_count": review_count,
-            "host": {
-                "id": host.id if host else None,
-                "name": host.name if host else "Unknown",
-                "email": host.email if host else None,
-                "phone": host.phone if host else None
-            },
-            "category": {
-                "id": homestay.category.id if homestay.category else None,
-                "name": homestay.category.name if homestay.category else None
-            },
-            "images": [
-                {
-                    "id": img.id,
-                    "image_path": img.image_path,
-                    "is_primary": img.is_primary
-                } for img in homestay.images
-            ] if homestay.images else [],
-            "amenities": [
-                {
-                    "id": amenity.id,
-                    "name": amenity.name,
-                    "icon": amenity.icon
-                } for amenity in homestay.amenities
-            ] if homestay.amenities else [],
-            "reviews": [
-                {
-                    "id": review.id,
-                    "rating": review.rating,
-                    "comment": review.comment,
-                    "user_name": review.user.name if review.user else "Anonymous",
-                    "created_at": review.created_at.isoformat() if review.created_at else None
-                } for review in reviews
-            ],
-            "created_at": homestay.created_at.isoformat() if homestay.created_at else None
+        "message": "Đánh giá đã được tạo thành công",
+        "review": {
+            "id": review.id,
+            "rating": review.rating,
+            "comment": review.comment,
+            "created_at": review.created_at.isoformat() if review.created_at else None
         }
     }
 
 @router.get("/featured/list")
-async def get_featured_homestays(
+def get_featured_homestays(
     limit: int = Query(6, ge=1, le=20),
     db: Session = Depends(get_db)
 ):
     """Lấy danh sách homestay nổi bật"""
     
-    # Lấy homestay featured trước
-    featured_homestays = db.query(Homestay).filter(
-        and_(
-            Homestay.status == 'active',
-            Homestay.is_active == True,
-            Homestay.featured == True
-        )
-    ).order_by(desc(Homestay.created_at)).limit(limit).all()
-    
-    # Nếu không đủ featured, lấy thêm homestay active khác
-    if len(featured_homestays) < limit:
-        featured_ids = [h.id for h in featured_homestays]
-        additional_homestays = db.query(Homestay).filter(
-            and_(
-                Homestay.status == 'active',
-                Homestay.is_active == True,
-                ~Homestay.id.in_(featured_ids)
-            )
-        ).order_by(desc(Homestay.created_at)).limit(limit - len(featured_homestays)).all()
-        
-        homestays = featured_homestays + additional_homestays
-    else:
-        homestays = featured_homestays
-    
-    # Enrich homestays with additional data
-    enriched_homestays = []
-    for homestay in homestays:
-        # Calculate average rating
-        avg_rating = db.query(func.avg(Review.rating)).filter(
-            and_(
-                Review.homestay_id == homestay.id,
-                Review.is_approved == True
-            )
-        ).scalar() or 0
-        
-        # Count reviews
-        review_count = db.query(Review).filter(
-            and_(
-                Review.homestay_id == homestay.id,
-                Review.is_approved == True
-            )
-        ).count()
-        
-        homestay_data = {
-            "id": homestay.id,
-            "name": homestay.name,
-            "description": homestay.description,
-            "price_per_night": float(homestay.price_per_night),
-            "max_guests": homestay.max_guests,
-            "address": homestay.address,
-            "featured": homestay.featured,
-            "discount_percent": homestay.discount_percent,
-            "avg_rating": round(float(avg_rating), 1),
-            "review_count": review_count,
-            "category": homestay.category.name if homestay.category else None,
-            "images": [img.image_path for img in homestay.images] if homestay.images else [],
-            "amenities": [
-                {
-                    "id": amenity.id,
-                    "name": amenity.name,
-                    "icon": amenity.icon
-                } for amenity in homestay.amenities
-            ] if homestay.amenities else [],
-            "created_at": homestay.created_at.isoformat() if homestay.created_at else None
-        }
-        enriched_homestays.append(homestay_data)
-    
-    return {"homestays": enriched_homestays}
+    # Danh sách dựng sẵn: homestay featured trước, thiếu thì bổ sung homestay active khác
+    return {"homestays": featured_homestays.get(db)[:limit]}
 
 @router.get("/categories/list")
-async def get_categories(db: Session = Depends(get_db)):
+def get_categories(db: Session = Depends(get_db)):
     """Lấy danh sách categories"""
     
     categories = db.query(Category).all()
@@ -336,17 +290,13 @@ async def get_categories(db: Session = Depends(get_db)):
     }
 
 @router.get("/{homestay_id}/blocked-dates")
-async def get_homestay_blocked_dates(
+def get_homestay_blocked_dates(
     homestay_id: int,
     start_date: str = Query(...),
     end_date: str = Query(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Lấy danh sách ngày bị chặn/không available cho homestay"""
-    from app.models.room_categories import HomestayRoom, RoomAvailability
-    from app.models.bookings import Booking
-    from datetime import datetime, timedelta
-    
     homestay = db.query(Homestay).filter(Homestay.id == homestay_id).first()
     if not homestay:
         raise HTTPException(status_code=404, detail="Không tìm thấy homestay")
@@ -355,67 +305,9 @@ async def get_homestay_blocked_dates(
     start = datetime.fromisoformat(start_date.replace('Z', '')).date()
     end = datetime.fromisoformat(end_date.replace('Z', '')).date()
     
-    blocked_dates = set()
-    
-    # Lấy tất cả phòng của homestay
-    rooms = db.query(HomestayRoom).filter(
-        HomestayRoom.homestay_id == homestay_id,
-        HomestayRoom.is_available == True
-    ).all()
-    
-    if not rooms:
-        # Homestay không có phòng - kiểm tra booking trực tiếp
-        bookings = db.query(Booking).filter(
-            Booking.homestay_id == homestay_id,
-            Booking.check_in <= end,
-            Booking.check_out >= start,
-            Booking.status.in_(["confirmed", "pending", "blocked"])
-        ).all()
-        
-        for booking in bookings:
-            current = max(booking.check_in, start)
-            end_booking = min(booking.check_out, end)
-            while current < end_booking:
-                blocked_dates.add(current.isoformat())
-                current += timedelta(days=1)
-    else:
-        # Homestay có phòng - kiểm tra availability và booking
-        current_date = start
-        while current_date <= end:
-            all_rooms_blocked = True
-            
-            for room in rooms:
-                # Kiểm tra availability
-                availability = db.query(RoomAvailability).filter(
-                    RoomAvailability.room_id == room.id,
-                    RoomAvailability.date == current_date
-                ).first()
-                
-                # Nếu có availability và is_available = True thì phòng này available
-                if availability and availability.is_available:
-                    all_rooms_blocked = False
-                    break
-                
-                # Nếu không có availability record, kiểm tra booking
-                if not availability:
-                    booking = db.query(Booking).filter(
-                        Booking.homestay_id == homestay_id,
-                        Booking.check_in <= current_date,
-                        Booking.check_out > current_date,
-                        Booking.status.in_(["confirmed", "pending", "blocked"])
-                    ).first()
-                    
-                    if not booking:
-                        all_rooms_blocked = False
-                        break
-            
-            if all_rooms_blocked:
-                blocked_dates.add(current_date.isoformat())
-            
-            current_date += timedelta(days=1)
+    blocked_dates = blocked_days(db, homestay_id, start, end)
     
     return {
-        "blocked_dates": sorted(list(blocked_dates)),
+        "blocked_dates": blocked_dates,
         "total": len(blocked_dates)
     }
-
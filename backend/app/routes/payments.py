@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from app.db import get_db
 from app.auth import get_current_user
 from app.models import Booking, Payment, User
+from app.services.occupancy import refresh_bookings
 from app.services.momo_payment import MoMoPaymentService
 from app.services.vnpay_payment import VNPayPaymentService
 
@@ -32,7 +34,7 @@ class MoMoCallbackData(BaseModel):
     signature: str
 
 @router.post("/momo/create")
-async def create_momo_payment(
+def create_momo_payment(
     payment_request: MoMoPaymentRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -99,6 +101,53 @@ async def create_momo_payment(
             detail=result["error"]
         )
 
+def _apply_momo_callback(db: Session, data: dict):
+    """Xác thực callback MOMO rồi cập nhật payment và booking"""
+    # Verify payment với MOMO
+    momo_service = MoMoPaymentService()
+    verification_result = momo_service.verify_payment(data)
+    
+    if not verification_result["success"]:
+        return {"RspCode": "97", "Message": "Invalid signature"}
+    
+    # Tìm payment record
+    order_id = verification_result["order_id"]
+    booking_id = int(order_id.split("_")[1])
+    
+    payment = db.query(Payment).filter(
+        Payment.booking_id == booking_id,
+        Payment.payment_method == 'momo'
+    ).first()
+    
+    if not payment:
+        return {"RspCode": "01", "Message": "Payment not found"}
+    
+    # Cập nhật trạng thái payment
+    if verification_result["success"]:
+        payment.status = 'paid'
+        payment.transaction_id = verification_result["transaction_id"]
+        payment.paid_at = __import__('datetime').datetime.now()
+        
+        # Cập nhật trạng thái booking
+        booking = db.query(Booking).filter(Booking.id == booking_id).first()
+        if booking:
+            booking.status = 'confirmed'
+            db.flush()
+            refresh_bookings(db, booking.homestay_id)
+    else:
+        payment.status = 'failed'
+    
+    current_details = payment.payment_details or {}
+    payment.payment_details = {
+        **current_details,
+        "callback_data": data,
+        "verification_result": verification_result
+    }
+    
+    db.commit()
+    
+    return {"RspCode": "00", "Message": "Success"}
+
 @router.post("/momo/callback")
 async def momo_payment_callback(
     request: Request,
@@ -110,54 +159,14 @@ async def momo_payment_callback(
         # Lấy dữ liệu từ request
         data = await request.json()
         
-        # Verify payment với MOMO
-        momo_service = MoMoPaymentService()
-        verification_result = momo_service.verify_payment(data)
-        
-        if not verification_result["success"]:
-            return {"RspCode": "97", "Message": "Invalid signature"}
-        
-        # Tìm payment record
-        order_id = verification_result["order_id"]
-        booking_id = int(order_id.split("_")[1])
-        
-        payment = db.query(Payment).filter(
-            Payment.booking_id == booking_id,
-            Payment.payment_method == 'momo'
-        ).first()
-        
-        if not payment:
-            return {"RspCode": "01", "Message": "Payment not found"}
-        
-        # Cập nhật trạng thái payment
-        if verification_result["success"]:
-            payment.status = 'paid'
-            payment.transaction_id = verification_result["transaction_id"]
-            payment.paid_at = __import__('datetime').datetime.now()
-            
-            # Cập nhật trạng thái booking
-            booking = db.query(Booking).filter(Booking.id == booking_id).first()
-            if booking:
-                booking.status = 'confirmed'
-        else:
-            payment.status = 'failed'
-        
-        current_details = payment.payment_details or {}
-        payment.payment_details = {
-            **current_details,
-            "callback_data": data,
-            "verification_result": verification_result
-        }
-        
-        db.commit()
-        
-        return {"RspCode": "00", "Message": "Success"}
+        # Truy vấn database chạy trong threadpool để không chặn event loop
+        return await run_in_threadpool(_apply_momo_callback, db, data)
         
     except Exception as e:
         return {"RspCode": "99", "Message": f"System error: {str(e)}"}
 
 @router.get("/momo/status/{payment_id}")
-async def check_momo_payment_status(
+def check_momo_payment_status(
     payment_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -183,7 +192,7 @@ async def check_momo_payment_status(
     }
 
 @router.post("/vnpay/create")
-async def create_vnpay_payment(
+def create_vnpay_payment(
     payment_request: VNPayPaymentRequest,
     request: Request,
     db: Session = Depends(get_db),
@@ -255,7 +264,7 @@ async def create_vnpay_payment(
         )
 
 @router.post("/vnpay/callback")
-async def vnpay_payment_callback(
+def vnpay_payment_callback(
     request: Request,
     db: Session = Depends(get_db)
 ):
@@ -294,6 +303,8 @@ async def vnpay_payment_callback(
             booking = db.query(Booking).filter(Booking.id == booking_id).first()
             if booking:
                 booking.status = 'confirmed'
+                db.flush()
+                refresh_bookings(db, booking.homestay_id)
         else:
             payment.status = 'failed'
         
@@ -312,7 +323,7 @@ async def vnpay_payment_callback(
         return {"RspCode": "99", "Message": f"System error: {str(e)}"}
 
 @router.get("/vnpay/status/{payment_id}")
-async def check_vnpay_payment_status(
+def check_vnpay_payment_status(
     payment_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -338,7 +349,7 @@ async def check_vnpay_payment_status(
     }
 
 @router.get("/methods")
-async def get_payment_methods():
+def get_payment_methods():
     """Lấy danh sách phương thức thanh toán"""
     
     return {
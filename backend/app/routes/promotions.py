@@ -16,7 +16,7 @@ class ValidateCouponRequest(BaseModel):
     user_id: Optional[int] = None
 
 @router.post("/validate")
-async def validate_coupon(request: ValidateCouponRequest, db: Session = Depends(get_db)):
+def validate_coupon(request: ValidateCouponRequest, db: Session = Depends(get_db)):
     """Validate mã khuyến mãi"""
     
     result = db.execute(
@@ -60,7 +60,7 @@ async def validate_coupon(request: ValidateCouponRequest, db: Session = Depends(
     }
 
 @router.get("/active")
-async def get_active_promotions(db: Session = Depends(get_db)):
+def get_active_promotions(db: Session = Depends(get_db)):
     """Lấy danh sách mã khuyến mãi đang hoạt động"""
     
     now = datetime.now()
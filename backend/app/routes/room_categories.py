@@ -2,34 +2,33 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
 from typing import List, Optional
-from app.db import get_db
+from app.db import get_db, get_read_db
 from app.models.room_categories import RoomCategory, Tag, HomestayRoom, RoomAvailability, room_category_tags
 from app.models.homestays import Homestay
 from app.schemas import RoomCategoryResponse, TagResponse, RoomAvailabilityResponse, FilterOptionsResponse
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from app.services.availability_engine import load_rooms, load_overrides, room_base_price
+from app.services.occupancy import load_occupancy
+from app.services.facets import ROOM_AMENITY_FLAGS, facet_cache, room_category_facets
+from app.services.room_categories import available_room_counts, category_options, category_payload, tag_payload
 
 router = APIRouter(prefix="/api/room-categories", tags=["Room Categories"])
 
 
 
-@router.get("/", response_model=List[RoomCategoryResponse])
-def get_room_categories(
-    view_type: Optional[str] = Query(None, description="Lọc theo loại view: Biển, Núi, Thành phố"),
-    has_balcony: Optional[bool] = Query(None, description="Có ban công"),
-    has_kitchen: Optional[bool] = Query(None, description="Có bếp riêng"),
-    is_pet_friendly: Optional[bool] = Query(None, description="Thân thiện với thú cưng"),
-    max_guests: Optional[int] = Query(None, description="Số khách tối đa"),
-    min_price: Optional[float] = Query(None, description="Giá tối thiểu"),
-    max_price: Optional[float] = Query(None, description="Giá tối đa"),
-    tags: Optional[str] = Query(None, description="Tags cách nhau bởi dấu phẩy"),
-    sort_by: Optional[str] = Query("name", description="Sắp xếp: name, price_asc, price_desc, size_asc, size_desc, guests_asc, guests_desc"),
-    search: Optional[str] = Query(None, description="Tìm kiếm theo tên hoặc mô tả"),
-    homestay_id: Optional[int] = Query(None, description="Lọc theo homestay cụ thể"),
-    db: Session = Depends(get_db)
+def _filter_categories(
+    query,
+    view_type: Optional[str] = None,
+    has_balcony: Optional[bool] = None,
+    has_kitchen: Optional[bool] = None,
+    is_pet_friendly: Optional[bool] = None,
+    max_guests: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    tags: Optional[str] = None,
+    search: Optional[str] = None
 ):
-    """Lấy danh sách loại phòng với bộ lọc nâng cao"""
-    query = db.query(RoomCategory).filter(RoomCategory.is_active == True)
-    
+    """Áp các bộ lọc loại phòng, dùng chung cho danh sách và số đếm facet"""
     # Bộ lọc cơ bản
     if view_type:
         query = query.filter(RoomCategory.view_type.ilike(f"%{view_type}%"))
@@ -62,6 +61,29 @@ def get_room_categories(
             )
         )
     
+    return query
+
+@router.get("/", response_model=List[RoomCategoryResponse])
+def get_room_categories(
+    view_type: Optional[str] = Query(None, description="Lọc theo loại view: Biển, Núi, Thành phố"),
+    has_balcony: Optional[bool] = Query(None, description="Có ban công"),
+    has_kitchen: Optional[bool] = Query(None, description="Có bếp riêng"),
+    is_pet_friendly: Optional[bool] = Query(None, description="Thân thiện với thú cưng"),
+    max_guests: Optional[int] = Query(None, description="Số khách tối đa"),
+    min_price: Optional[float] = Query(None, description="Giá tối thiểu"),
+    max_price: Optional[float] = Query(None, description="Giá tối đa"),
+    tags: Optional[str] = Query(None, description="Tags cách nhau bởi dấu phẩy"),
+    sort_by: Optional[str] = Query("name", description="Sắp xếp: name, price_asc, price_desc, size_asc, size_desc, guests_asc, guests_desc"),
+    search: Optional[str] = Query(None, description="Tìm kiếm theo tên hoặc mô tả"),
+    homestay_id: Optional[int] = Query(None, description="Lọc theo homestay cụ thể"),
+    db: Session = Depends(get_read_db)
+):
+    """Lấy danh sách loại phòng với bộ lọc nâng cao"""
+    query = _filter_categories(
+        db.query(RoomCategory).filter(RoomCategory.is_active == True),
+        view_type, has_balcony, has_kitchen, is_pet_friendly, max_guests, min_price, max_price, tags, search
+    )
+    
     # Sắp xếp
     if sort_by == "price_asc":
         query = query.order_by(RoomCategory.base_price.asc())
@@ -78,50 +100,15 @@ def get_room_categories(
     else:  # name
         query = query.order_by(RoomCategory.name.asc())
     
-    categories = query.all()
+    categories = query.options(*category_options()).all()
     
-    result = []
-    for category in categories:
-        # Đếm số phòng có sẵn nếu có homestay_id
-        available_rooms_count = 0
-        if homestay_id:
-            available_rooms_count = db.query(HomestayRoom).filter(
-                HomestayRoom.room_category_id == category.id,
-                HomestayRoom.homestay_id == homestay_id,
-                HomestayRoom.is_available == True
-            ).count()
-        
-        # Chuyển đổi tags
-        tag_responses = []
-        for tag in category.tags:
-            tag_responses.append(TagResponse(
-                id=tag.id,
-                name=tag.name,
-                slug=tag.slug,
-                color=tag.color,
-                icon=tag.icon
-            ))
-        
-        result.append(RoomCategoryResponse(
-            id=category.id,
-            name=category.name,
-            slug=category.slug,
-            description=category.description,
-            base_price=float(category.base_price) if category.base_price else None,
-            max_guests=category.max_guests,
-            room_size=float(category.room_size) if category.room_size else None,
-            bed_type=category.bed_type,
-            view_type=category.view_type,
-            has_balcony=category.has_balcony,
-            has_kitchen=category.has_kitchen,
-            is_pet_friendly=category.is_pet_friendly,
-            amenities=category.amenities or [],
-            images=category.images or [],
-            tags=tag_responses,
-            available_rooms_count=available_rooms_count
-        ))
+    # Số phòng có sẵn của homestay (nếu có homestay_id), một truy vấn cho mọi loại phòng
+    room_counts = available_room_counts(db, [category.id for category in categories], homestay_id)
     
-    return result
+    return [
+        RoomCategoryResponse(**category_payload(category, room_counts.get(category.id, 0)))
+        for category in categories
+    ]
 
 @router.get("/{category_id}/availability")
 def get_room_availability(
@@ -134,15 +121,15 @@ def get_room_availability(
     """Kiểm tra tình trạng phòng trống theo loại phòng và homestay"""
     
     # Lấy các phòng thuộc loại này trong homestay
-    rooms = db.query(HomestayRoom).filter(
-        HomestayRoom.room_category_id == category_id,
-        HomestayRoom.homestay_id == homestay_id,
-        HomestayRoom.is_available == True
-    ).all()
+    rooms = load_rooms(db, homestay_id, room_category_id=category_id)
     
     if not rooms:
         raise HTTPException(status_code=404, detail="Không tìm thấy phòng phù hợp")
     
+    window_end = end_date + timedelta(days=1)
+    occupancy = load_occupancy(db, homestay_id, start_date, window_end)
+    prices = load_overrides(db, [room.id for room in rooms], start_date, window_end, priced_only=True)
+    
     # Kiểm tra availability cho từng ngày
     availability_data = []
     current_date = start_date
@@ -152,22 +139,16 @@ def get_room_availability(
         min_price = None
         
         for room in rooms:
-            # Kiểm tra availability
-            availability = db.query(RoomAvailability).filter(
-                RoomAvailability.room_id == room.id,
-                RoomAvailability.date == current_date
-            ).first()
+            # Phòng bị chặn thì bỏ qua; chưa có record thì mặc định available
+            state = occupancy.room_state(room.id, current_date)
+            if state is False:
+                continue
             
-            if availability and availability.is_available:
-                available_rooms += 1
-                price = availability.price_override or room.price_per_night or room.room_category.base_price
-                if min_price is None or price < min_price:
-                    min_price = float(price)
-            elif not availability:  # Nếu không có record thì mặc định available
-                available_rooms += 1
-                price = room.price_per_night or room.room_category.base_price
-                if min_price is None or price < min_price:
-                    min_price = float(price)
+            available_rooms += 1
+            override = prices.get(room.id, current_date) if state else None
+            price = override.price_override if override else room_base_price(room)
+            if min_price is None or price < min_price:
+                min_price = float(price)
         
         availability_data.append({
             "date": current_date.isoformat(),
@@ -176,7 +157,7 @@ def get_room_availability(
             "min_price": min_price
         })
         
-        current_date = current_date.replace(day=current_date.day + 1)
+        current_date += timedelta(days=1)
     
     return availability_data
 
@@ -262,7 +243,7 @@ def get_room_suggestions(
                 )
             ).order_by(RoomCategory.base_price.desc())
     
-    categories = query.limit(5).all()
+    categories = query.options(*category_options()).limit(5).all()
     
     suggestions = []
     for cat in categories:
@@ -309,75 +290,79 @@ def get_room_suggestions(
 def get_tags(db: Session = Depends(get_db)):
     """Lấy danh sách tags cho phòng"""
     tags = db.query(Tag).all()
-    return [TagResponse(
-        id=tag.id,
-        name=tag.name,
-        slug=tag.slug,
-        color=tag.color,
-        icon=tag.icon
-    ) for tag in tags]
+    return [TagResponse(**tag_payload(tag)) for tag in tags]
 
-@router.get("/filters", response_model=FilterOptionsResponse)
-def get_filter_options(db: Session = Depends(get_db)):
-    """Lấy các tùy chọn filter"""
+def _filter_ranges(db: Session) -> dict:
+    """Khoảng giá, diện tích, số khách của các loại phòng đang hoạt động và danh sách tag (cache cùng số đếm facet)"""
+    cached = facet_cache.get("room_category_ranges")
+    if cached is not None:
+        return cached
     
-    # Lấy các view types có sẵn
-    view_types = db.query(RoomCategory.view_type).filter(
-        RoomCategory.view_type.isnot(None),
-        RoomCategory.is_active == True
-    ).distinct().all()
-    
-    # Lấy range giá
-    price_range = db.query(
+    # Một truy vấn cho cả ba khoảng
+    ranges = db.query(
         func.min(RoomCategory.base_price),
-        func.max(RoomCategory.base_price)
-    ).filter(RoomCategory.is_active == True).first()
-    
-    # Lấy range diện tích
-    size_range = db.query(
+        func.max(RoomCategory.base_price),
         func.min(RoomCategory.room_size),
-        func.max(RoomCategory.room_size)
-    ).filter(
-        RoomCategory.room_size.isnot(None),
-        RoomCategory.is_active == True
-    ).first()
-    
-    # Lấy range số khách
-    guest_range = db.query(
+        func.max(RoomCategory.room_size),
         func.min(RoomCategory.max_guests),
         func.max(RoomCategory.max_guests)
     ).filter(RoomCategory.is_active == True).first()
     
-    # Lấy tất cả tags
-    tags = db.query(Tag).all()
-    tag_responses = [TagResponse(
-        id=tag.id,
-        name=tag.name,
-        slug=tag.slug,
-        color=tag.color,
-        icon=tag.icon
-    ) for tag in tags]
-    
-    return FilterOptionsResponse(
-        view_types=[vt[0] for vt in view_types if vt[0]],
-        price_range={
-            "min": float(price_range[0]) if price_range[0] else 0,
-            "max": float(price_range[1]) if price_range[1] else 1000000
+    result = {
+        "price_range": {
+            "min": float(ranges[0]) if ranges[0] else 0,
+            "max": float(ranges[1]) if ranges[1] else 1000000
         },
-        size_range={
-            "min": float(size_range[0]) if size_range[0] else 0,
-            "max": float(size_range[1]) if size_range[1] else 100
+        "size_range": {
+            "min": float(ranges[2]) if ranges[2] else 0,
+            "max": float(ranges[3]) if ranges[3] else 100
         },
-        guest_range={
-            "min": int(guest_range[0]) if guest_range[0] else 1,
-            "max": int(guest_range[1]) if guest_range[1] else 10
+        "guest_range": {
+            "min": int(ranges[4]) if ranges[4] else 1,
+            "max": int(ranges[5]) if ranges[5] else 10
         },
+        "tags": [
+            tag_payload(tag) for tag in db.query(Tag).all()
+        ]
+    }
+    facet_cache.set("room_category_ranges", result)
+    return result
+
+@router.get("/filters", response_model=FilterOptionsResponse)
+def get_filter_options(
+    view_type: Optional[str] = Query(None, description="Lọc theo loại view: Biển, Núi, Thành phố"),
+    has_balcony: Optional[bool] = Query(None, description="Có ban công"),
+    has_kitchen: Optional[bool] = Query(None, description="Có bếp riêng"),
+    is_pet_friendly: Optional[bool] = Query(None, description="Thân thiện với thú cưng"),
+    max_guests: Optional[int] = Query(None, description="Số khách tối đa"),
+    min_price: Optional[float] = Query(None, description="Giá tối thiểu"),
+    max_price: Optional[float] = Query(None, description="Giá tối đa"),
+    tags: Optional[str] = Query(None, description="Tags cách nhau bởi dấu phẩy"),
+    search: Optional[str] = Query(None, description="Tìm kiếm theo tên hoặc mô tả"),
+    db: Session = Depends(get_db)
+):
+    """Lấy các tùy chọn filter kèm số loại phòng theo từng giá trị cho bộ lọc hiện tại"""
+    
+    active = db.query(RoomCategory).filter(RoomCategory.is_active == True)
+    # View types có sẵn lấy từ số đếm trên toàn bộ loại phòng (dùng chung cache)
+    all_facets = room_category_facets(db, active)
+    facets = room_category_facets(db, _filter_categories(
+        active, view_type, has_balcony, has_kitchen, is_pet_friendly, max_guests, min_price, max_price, tags, search
+    ))
+    ranges = _filter_ranges(db)
+    
+    return FilterOptionsResponse(
+        view_types=[item["value"] for item in all_facets["view_types"]],
+        price_range=ranges["price_range"],
+        size_range=ranges["size_range"],
+        guest_range=ranges["guest_range"],
         amenities=[
-            {"key": "has_balcony", "label": "Có ban công", "icon": "home"},
-            {"key": "has_kitchen", "label": "Có bếp riêng", "icon": "utensils"},
-            {"key": "is_pet_friendly", "label": "Thân thiện với thú cưng", "icon": "paw"}
+            {"key": "has_balcony", "label": ROOM_AMENITY_FLAGS["has_balcony"], "icon": "home"},
+            {"key": "has_kitchen", "label": ROOM_AMENITY_FLAGS["has_kitchen"], "icon": "utensils"},
+            {"key": "is_pet_friendly", "label": ROOM_AMENITY_FLAGS["is_pet_friendly"], "icon": "paw"}
         ],
-        tags=tag_responses
+        tags=[TagResponse(**tag) for tag in ranges["tags"]],
+        facets=facets
     )
 
 @router.get("/{category_id}", response_model=RoomCategoryResponse)
@@ -387,7 +372,7 @@ def get_room_category_detail(
     db: Session = Depends(get_db)
 ):
     """Lấy thông tin chi tiết loại phòng"""
-    category = db.query(RoomCategory).filter(
+    category = db.query(RoomCategory).options(*category_options()).filter(
         RoomCategory.id == category_id,
         RoomCategory.is_active == True
     ).first()
@@ -396,40 +381,6 @@ def get_room_category_detail(
         raise HTTPException(status_code=404, detail="Không tìm thấy loại phòng")
     
     # Đếm số phòng có sẵn
-    available_rooms_count = 0
-    if homestay_id:
-        available_rooms_count = db.query(HomestayRoom).filter(
-            HomestayRoom.room_category_id == category_id,
-            HomestayRoom.homestay_id == homestay_id,
-            HomestayRoom.is_available == True
-        ).count()
-    
-    # Chuyển đổi tags
-    tag_responses = []
-    for tag in category.tags:
-        tag_responses.append(TagResponse(
-            id=tag.id,
-            name=tag.name,
-            slug=tag.slug,
-            color=tag.color,
-            icon=tag.icon
-        ))
+    room_counts = available_room_counts(db, [category_id], homestay_id)
     
-    return RoomCategoryResponse(
-        id=category.id,
-        name=category.name,
-        slug=category.slug,
-        description=category.description,
-        base_price=float(category.base_price) if category.base_price else None,
-        max_guests=category.max_guests,
-        room_size=float(category.room_size) if category.room_size else None,
-        bed_type=category.bed_type,
-        view_type=category.view_type,
-        has_balcony=category.has_balcony,
-        has_kitchen=category.has_kitchen,
-        is_pet_friendly=category.is_pet_friendly,
-        amenities=category.amenities or [],
-        images=category.images or [],
-        tags=tag_responses,
-        available_rooms_count=available_rooms_count
-    )
\ No newline at end of file
+    return RoomCategoryResponse(**category_payload(category, room_counts.get(category_id, 0)))
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date
+from app.db import get_db, get_read_db
+from app.services.autocomplete import autocomplete_index, KIND_PRIORITY
+from app.services.geo import find_nearby_destinations, find_nearby_homestays, radius_box
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+@router.get("/autocomplete")
+def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    types: Optional[str] = Query(None, description="homestay, destination, province, city (phân cách bằng dấu phẩy)"),
+    db: Session = Depends(get_db)
+):
+    """Gợi ý tìm kiếm theo tiền tố (không phân biệt dấu) cho ô tìm kiếm"""
+    
+    # Chỉ mục chưa dựng xong lúc khởi động thì dựng ngay trong request này
+    if autocomplete_index.built_at is None:
+        autocomplete_index.rebuild(db)
+    
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip() in KIND_PRIORITY] if types else None
+    
+    return {
+        "query": q,
+        "suggestions": autocomplete_index.suggest(q, limit, kinds)
+    }
+
+@router.get("/nearby")
+def search_nearby(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=100),
+    south: Optional[float] = Query(None, ge=-90, le=90),
+    west: Optional[float] = Query(None, ge=-180, le=180),
+    north: Optional[float] = Query(None, ge=-90, le=90),
+    east: Optional[float] = Query(None, ge=-180, le=180),
+    types: str = Query("homestay,destination", description="homestay, destination (phân cách bằng dấu phẩy)"),
+    check_in: Optional[date] = Query(None),
+    check_out: Optional[date] = Query(None),
+    guests: int = Query(1, ge=1),
+    category_id: Optional[int] = Query(None),
+    min_price: Optional[float] = Query(None),
+    max_price: Optional[float] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Homestay và điểm đến gần một điểm (lat, lng trong bán kính radius_km) hoặc trong khung bản đồ
+    (south, west, north, east), sắp xếp theo khoảng cách. Lọc giá/ngày trống chỉ áp dụng cho homestay.
+    """
+    bounds = (south, west, north, east)
+    if all(value is not None for value in bounds):
+        if south > north or west > east:
+            raise HTTPException(status_code=400, detail="Khung bản đồ không hợp lệ")
+        box, radius = bounds, None
+        # Khoảng cách tính từ điểm đã chọn, không có thì từ tâm khung
+        if lat is None or lng is None:
+            lat, lng = (south + north) / 2, (west + east) / 2
+    elif lat is not None and lng is not None:
+        box, radius = radius_box(lat, lng, radius_km), radius_km
+    else:
+        raise HTTPException(status_code=400, detail="Cần lat, lng hoặc đủ south, west, north, east")
+    
+    if (check_in is None) != (check_out is None):
+        raise HTTPException(status_code=400, detail="Cần cả ngày check-in và check-out")
+    if check_in and check_in >= check_out:
+        raise HTTPException(status_code=400, detail="Ngày check-out phải sau ngày check-in")
+    
+    kinds = {kind.strip() for kind in types.split(",")}
+    result = {
+        "center": {"latitude": lat, "longitude": lng},
+        "radius_km": radius,
+        "bounds": {"south": box[0], "west": box[1], "north": box[2], "east": box[3]}
+    }
+    if "homestay" in kinds:
+        total, homestays = find_nearby_homestays(
+            db, lat, lng, box, radius,
+            check_in=check_in,
+            check_out=check_out,
+            guests=guests,
+            category_id=category_id,
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit
+        )
+        result["homestays"] = homestays
+        result["total_homestays"] = total
+    if "destination" in kinds:
+        total, destinations = find_nearby_destinations(db, lat, lng, box, radius, limit=limit)
+        result["destinations"] = destinations
+        result["total_destinations"] = total
+    
+    return result
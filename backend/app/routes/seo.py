@@ -1,13 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.db import get_db
-from app.models.seo import SEOMetadata, URLSlug, SitemapEntry
+from app.db import get_db, get_read_db
+from app.models.seo import URLSlug, SitemapEntry
 from app.models.homestays import Homestay
 from app.models.destinations import Destination
+from app.services.seo import generate_slug, seo_metadata
 from pydantic import BaseModel
 from datetime import datetime
-import re
 
 router = APIRouter(prefix="/api/seo", tags=["SEO"])
 
@@ -26,35 +26,6 @@ class SitemapEntryResponse(BaseModel):
     changefreq: str
     lastmod: datetime
 
-def generate_slug(text: str) -> str:
-    """Tạo URL slug thân thiện"""
-    # Chuyển về lowercase và loại bỏ dấu tiếng Việt
-    slug = text.lower()
-    
-    # Bảng chuyển đổi dấu tiếng Việt
-    vietnamese_map = {
-        'à': 'a', 'á': 'a', 'ạ': 'a', 'ả': 'a', 'ã': 'a', 'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ậ': 'a', 'ẩ': 'a', 'ẫ': 'a',
-        'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ặ': 'a', 'ẳ': 'a', 'ẵ': 'a',
-        'è': 'e', 'é': 'e', 'ẹ': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ê': 'e', 'ề': 'e', 'ế': 'e', 'ệ': 'e', 'ể': 'e', 'ễ': 'e',
-        'ì': 'i', 'í': 'i', 'ị': 'i', 'ỉ': 'i', 'ĩ': 'i',
-        'ò': 'o', 'ó': 'o', 'ọ': 'o', 'ỏ': 'o', 'õ': 'o', 'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ộ': 'o', 'ổ': 'o', 'ỗ': 'o',
-        'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ợ': 'o', 'ở': 'o', 'ỡ': 'o',
-        'ù': 'u', 'ú': 'u', 'ụ': 'u', 'ủ': 'u', 'ũ': 'u', 'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ự': 'u', 'ử': 'u', 'ữ': 'u',
-        'ỳ': 'y', 'ý': 'y', 'ỵ': 'y', 'ỷ': 'y', 'ỹ': 'y',
-        'đ': 'd'
-    }
-    
-    for vietnamese, english in vietnamese_map.items():
-        slug = slug.replace(vietnamese, english)
-    
-    # Loại bỏ ký tự đặc biệt và thay thế bằng dấu gạch ngang
-    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-    slug = re.sub(r'\s+', '-', slug)
-    slug = re.sub(r'-+', '-', slug)
-    slug = slug.strip('-')
-    
-    return slug
-
 @router.get("/metadata/{entity_type}/{entity_id}")
 def get_seo_metadata(
     entity_type: str,
@@ -74,45 +45,10 @@ def get_seo_metadata(
     if not entity:
         raise HTTPException(status_code=404, detail="Entity không tồn tại")
     
-    # Lấy SEO metadata
-    seo_data = db.query(SEOMetadata).filter(
-        SEOMetadata.entity_type == entity_type,
-        SEOMetadata.entity_id == entity_id
-    ).first()
-    
-    if seo_data:
-        return SEOMetadataResponse(
-            meta_title=seo_data.meta_title,
-            meta_description=seo_data.meta_description,
-            meta_keywords=seo_data.meta_keywords,
-            og_title=seo_data.og_title,
-            og_description=seo_data.og_description,
-            og_image=seo_data.og_image,
-            canonical_url=seo_data.canonical_url
-        )
-    else:
-        # Tạo SEO metadata mặc định
-        if entity_type == "homestay":
-            return SEOMetadataResponse(
-                meta_title=f"{entity.name} - Homestay tại {entity.location.name if entity.location else 'Việt Nam'}",
-                meta_description=f"Đặt phòng {entity.name} với giá {entity.price_per_night:,.0f}đ/đêm. {entity.description[:150] if entity.description else ''}",
-                meta_keywords=f"homestay, {entity.name}, {entity.location.name if entity.location else ''}, đặt phòng",
-                og_title=f"{entity.name} - Homestay",
-                og_description=f"Homestay tuyệt vời tại {entity.location.name if entity.location else 'Việt Nam'}",
-                canonical_url=f"/homestay/{generate_slug(entity.name)}-{entity.id}"
-            )
-        elif entity_type == "destination":
-            return SEOMetadataResponse(
-                meta_title=f"Du lịch {entity.name} - Homestay & Khách sạn tốt nhất",
-                meta_description=f"Khám phá {entity.name} với những homestay và khách sạn tuyệt vời. Đặt ngay để có giá tốt nhất!",
-                meta_keywords=f"du lịch, {entity.name}, homestay, khách sạn, đặt phòng",
-                og_title=f"Du lịch {entity.name}",
-                og_description=f"Điểm đến tuyệt vời cho kỳ nghỉ của bạn",
-                canonical_url=f"/destination/{generate_slug(entity.name)}"
-            )
+    return SEOMetadataResponse(**seo_metadata(db, entity_type, entity))
 
 @router.get("/sitemap")
-def generate_sitemap(db: Session = Depends(get_db)):
+def generate_sitemap(db: Session = Depends(get_read_db)):
     """Tạo sitemap cho website"""
     
     sitemap_entries = []
@@ -90,6 +90,7 @@ class FilterOptionsResponse(BaseModel):
     guest_range: dict
     amenities: List[dict]
     tags: List[TagResponse]
+    facets: Optional[dict] = None  # Số loại phòng theo từng giá trị lọc của tập kết quả hiện tại
 
 # Banner Schemas
 class BannerCreate(BaseModel):
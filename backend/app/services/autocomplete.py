@@ -0,0 +1,320 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Homestay, Destination
+from app.services.cache import MemoryCache
+from app.services.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Địa danh gợi ý trước điểm đến, điểm đến trước homestay
+KIND_PRIORITY = {"province": 3, "city": 3, "destination": 2, "homestay": 1}
+PLACE_KINDS = ("province", "city")
+MAX_KEY_LENGTH = 40
+# Khoảng khóa lớn hơn ngưỡng này thì duyệt theo thứ hạng thay vì duyệt cả khoảng
+SCAN_LIMIT = 2000
+
+class _Doc:
+    __slots__ = ("label", "folded", "popularity", "extra")
+
+    def __init__(self, label: str, folded: str, popularity, extra: Optional[Dict] = None):
+        self.label = label
+        self.folded = folded
+        self.popularity = popularity
+        self.extra = extra or {}
+
+def _rank(kind: str, doc: _Doc, position: int):
+    """Khớp từ đầu tên trước, rồi theo loại, độ phổ biến, tên ngắn hơn"""
+    return (position == 0, KIND_PRIORITY[kind], doc.popularity, -len(doc.label))
+
+def _keys(folded: str) -> List[Tuple[str, int]]:
+    """Các khóa (đoạn từ vị trí từng từ đến hết, vị trí từ) để gõ giữa tên vẫn khớp, ví dụ "lat" khớp "da lat\""""
+    tokens = folded.split(" ")
+    return [(" ".join(tokens[position:])[:MAX_KEY_LENGTH], position) for position in range(len(tokens))]
+
+class _Bucket:
+    """Khóa của một loại, cùng khớp từ đầu tên hoặc không: một mảng theo khóa và một mảng theo thứ hạng"""
+    __slots__ = ("keys", "ranked")
+
+    def __init__(self):
+        self.keys: List[Tuple] = []  # (khóa, id, vị trí từ)
+        self.ranked: List[Tuple] = []  # ((độ phổ biến, -độ dài tên), khóa, id, vị trí từ) tăng dần
+
+    def add(self, item: Tuple, order: Tuple, index: bool = True):
+        if index:
+            insort(self.keys, item)
+            insort(self.ranked, (order,) + item)
+        else:
+            self.keys.append(item)
+            self.ranked.append((order,) + item)
+
+    def remove(self, item: Tuple, order: Tuple):
+        for items, value in ((self.keys, item), (self.ranked, (order,) + item)):
+            i = bisect_left(items, value)
+            if i < len(items) and items[i] == value:
+                del items[i]
+
+    def sort(self):
+        self.keys.sort()
+        self.ranked.sort()
+
+    def top(self, probe: str, limit: int, accept) -> List[Tuple]:
+        """(id, vị trí từ) của tối đa limit bản ghi khác nhau có khóa bắt đầu bằng probe, thứ hạng giảm dần"""
+        lo = bisect_left(self.keys, (probe,))
+        hi = bisect_left(self.keys, (probe + "{",))  # "{" đứng sau mọi ký tự của khóa (a-z, 0-9, khoảng trắng)
+        if hi - lo <= SCAN_LIMIT:
+            return [(doc_id, position) for _, doc_id, position in self.keys[lo:hi] if accept(doc_id, position)]
+        # Khoảng lớn: duyệt theo thứ hạng giảm dần, đủ limit bản ghi thì dừng
+        found, seen = [], set()
+        for _, key, doc_id, position in reversed(self.ranked):
+            if key.startswith(probe) and doc_id not in seen and accept(doc_id, position):
+                seen.add(doc_id)
+                found.append((doc_id, position))
+                if len(found) >= limit:
+                    break
+        return found
+
+class AutocompleteIndex:
+    """
+    Chỉ mục tiền tố trong bộ nhớ: mảng khóa đã sắp xếp, tra bằng bisect.
+    Khóa chia nhóm theo (loại, khớp từ đầu tên); mỗi nhóm có thêm mảng xếp theo thứ hạng
+    để tiền tố ngắn (khoảng khóa rất lớn) chỉ cần duyệt đến khi đủ top-k.
+    Dựng lúc khởi động, cập nhật tăng dần sau mỗi commit ghi Homestay/Destination
+    và dựng lại định kỳ để nhận thay đổi từ các worker khác.
+    """
+
+    def __init__(self, refresh_seconds: int = 600):
+        self.refresh_seconds = refresh_seconds
+        self._buckets: Dict[Tuple[str, bool], _Bucket] = {
+            (kind, at_start): _Bucket() for kind in KIND_PRIORITY for at_start in (True, False)
+        }
+        self._docs: Dict[Tuple[str, object], _Doc] = {}
+        self._place_counts: Dict[Tuple[str, str], int] = {}
+        self._destination_places: Dict[int, List[Tuple[str, str, str]]] = {}
+        self._results = MemoryCache(max_entries=2048, ttl=refresh_seconds)
+        self._lock = threading.RLock()
+        self._rebuilding = False
+        self.built_at: Optional[float] = None
+
+    # Dựng chỉ mục
+
+    def rebuild(self, db: Session):
+        """Dựng lại toàn bộ từ database rồi thay thế chỉ mục hiện tại"""
+        fresh = AutocompleteIndex(self.refresh_seconds)
+        homestays = db.query(
+            Homestay.id, Homestay.name, Homestay.featured, Homestay.review_count
+        ).filter(Homestay.status == 'active', Homestay.is_active == True).all()
+        for row in homestays:
+            fresh._add_doc("homestay", row.id, row.name, (bool(row.featured), row.review_count or 0), index=False)
+
+        destinations = db.query(
+            Destination.id, Destination.name, Destination.slug, Destination.province, Destination.city, Destination.view_count
+        ).filter(Destination.is_active == True).all()
+        for row in destinations:
+            fresh._add_destination(row.id, row.name, row.slug, row.province, row.city, row.view_count, index=False)
+        for bucket in fresh._buckets.values():
+            bucket.sort()
+
+        with self._lock:
+            self._buckets = fresh._buckets
+            self._docs = fresh._docs
+            self._place_counts = fresh._place_counts
+            self._destination_places = fresh._destination_places
+            self._results.clear()
+            self.built_at = time.monotonic()
+
+    def rebuild_in_background(self):
+        """Dựng lại trong thread riêng với session riêng; bỏ qua nếu đang dựng"""
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            db = SessionLocal()
+            try:
+                self.rebuild(db)
+                logger.info(f"Autocomplete index built: {len(self._docs)} entries")
+            except Exception as e:
+                logger.error(f"Autocomplete index build failed: {e}")
+            finally:
+                db.close()
+                self._rebuilding = False
+
+        threading.Thread(target=run, name="autocomplete-rebuild", daemon=True).start()
+
+    # Cập nhật tăng dần
+
+    def _add_doc(self, kind: str, doc_id, label: Optional[str], popularity, extra: Optional[Dict] = None, index: bool = True):
+        folded = " ".join(tokenize(label))
+        if not folded:
+            return
+        doc = _Doc(label, folded, popularity, extra)
+        self._docs[(kind, doc_id)] = doc
+        order = (popularity, -len(label))
+        for key, position in _keys(folded):
+            self._buckets[(kind, position == 0)].add((key, doc_id, position), order, index=index)
+
+    def _remove_doc(self, kind: str, doc_id):
+        doc = self._docs.pop((kind, doc_id), None)
+        if not doc:
+            return
+        order = (doc.popularity, -len(doc.label))
+        for key, position in _keys(doc.folded):
+            self._buckets[(kind, position == 0)].remove((key, doc_id, position), order)
+
+    def _change_place(self, kind: str, name: Optional[str], delta: int, index: bool = True):
+        """Tỉnh/thành phố là một gợi ý, độ phổ biến là số điểm đến thuộc về nó"""
+        folded = " ".join(tokenize(name))
+        if not folded:
+            return
+        count = self._place_counts.get((kind, folded), 0) + delta
+        if count <= 0:
+            self._place_counts.pop((kind, folded), None)
+            self._remove_doc(kind, folded)
+        else:
+            self._place_counts[(kind, folded)] = count
+            current = self._docs.get((kind, folded))
+            label = current.label if current else name
+            if index:
+                self._remove_doc(kind, folded)
+            self._add_doc(kind, folded, label, count, index=index)
+
+    def _add_destination(self, destination_id: int, name, slug, province, city, view_count, index: bool = True):
+        self._add_doc("destination", destination_id, name, view_count or 0, {"slug": slug}, index=index)
+        places = [("province", province), ("city", city)]
+        self._destination_places[destination_id] = places
+        for kind, place in places:
+            self._change_place(kind, place, 1, index=index)
+
+    def _remove_destination(self, destination_id: int):
+        self._remove_doc("destination", destination_id)
+        for kind, place in self._destination_places.pop(destination_id, []):
+            self._change_place(kind, place, -1)
+
+    def apply(self, changes: List[Tuple]):
+        """Áp các thay đổi đã commit: ("homestay"|"destination", id, snapshot hoặc None nếu bị xóa/ẩn)"""
+        with self._lock:
+            labels_changed = False
+            for kind, doc_id, snapshot in changes:
+                current = self._docs.get((kind, doc_id))
+                # Chỉ đổi độ phổ biến (lượt xem, số review) thì không cần xóa kết quả đã cache
+                labels_changed = labels_changed or not (
+                    current and snapshot and current.label == snapshot["name"] and (
+                        kind == "homestay" or self._destination_places.get(doc_id) == [("province", snapshot["province"]), ("city", snapshot["city"])]
+                    )
+                )
+                if kind == "homestay":
+                    self._remove_doc(kind, doc_id)
+                    if snapshot:
+                        self._add_doc(kind, doc_id, snapshot["name"], snapshot["popularity"])
+                else:
+                    self._remove_destination(doc_id)
+                    if snapshot:
+                        self._add_destination(doc_id, snapshot["name"], snapshot["slug"], snapshot["province"], snapshot["city"], snapshot["popularity"])
+            if labels_changed:
+                self._results.clear()
+
+    # Tra cứu
+
+    def suggest(self, text: str, limit: int = 8, kinds: Optional[List[str]] = None) -> List[Dict]:
+        """Top-k gợi ý có một từ bắt đầu bằng chuỗi đã gõ (đã bỏ dấu); ưu tiên khớp từ đầu tên, loại và độ phổ biến"""
+        if self.built_at and time.monotonic() - self.built_at > self.refresh_seconds:
+            self.rebuild_in_background()
+
+        query = " ".join(tokenize(text))
+        if not query:
+            return []
+        cache_key = f"{query}|{limit}|{','.join(sorted(kinds)) if kinds else '*'}"
+        cached = self._results.get(cache_key)
+        if cached is not None:
+            return cached
+
+        buckets = self._buckets
+        docs = self._docs
+        probe = query[:MAX_KEY_LENGTH]
+
+        # Thứ hạng tốt nhất của mỗi bản ghi khớp; top-k chung nằm trong hợp top-k của từng nhóm
+        best: Dict[Tuple[str, object], Tuple] = {}
+        for kind in kinds or KIND_PRIORITY:
+            def accept(doc_id, position) -> bool:
+                # Khóa bị cắt ngắn: kiểm tra lại trên tên đầy đủ
+                doc = docs.get((kind, doc_id))
+                return doc is not None and (
+                    len(query) <= MAX_KEY_LENGTH or " ".join(doc.folded.split(" ")[position:]).startswith(query)
+                )
+
+            for at_start in (True, False):
+                for doc_id, position in buckets[(kind, at_start)].top(probe, limit, accept):
+                    rank = _rank(kind, docs[(kind, doc_id)], position)
+                    if rank > best.get((kind, doc_id), ()):
+                        best[(kind, doc_id)] = rank
+
+        results = []
+        for (kind, doc_id), _ in heapq.nlargest(limit, best.items(), key=lambda item: item[1]):
+            doc = docs[(kind, doc_id)]
+            results.append({
+                "type": kind,
+                "id": None if kind in PLACE_KINDS else doc_id,
+                "label": doc.label,
+                **doc.extra
+            })
+        self._results.set(cache_key, results)
+        return results
+
+autocomplete_index = AutocompleteIndex(settings.AUTOCOMPLETE_REFRESH_SECONDS)
+
+# Ghi nhận thay đổi trong flush, chỉ áp vào chỉ mục sau khi commit
+
+def _record(target, change: Tuple):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("autocomplete_changes", []).append(change)
+
+def _homestay_changed(mapper, connection, target):
+    visible = target.status == 'active' and target.is_active
+    _record(target, ("homestay", target.id, {
+        "name": target.name,
+        "popularity": (bool(target.featured), target.review_count or 0)
+    } if visible else None))
+
+def _destination_changed(mapper, connection, target):
+    _record(target, ("destination", target.id, {
+        "name": target.name,
+        "slug": target.slug,
+        "province": target.province,
+        "city": target.city,
+        "popularity": target.view_count or 0
+    } if target.is_active else None))
+
+def _removed(kind: str):
+    def listener(mapper, connection, target):
+        _record(target, (kind, target.id, None))
+    return listener
+
+for _event in ("after_insert", "after_update"):
+    event.listen(Homestay, _event, _homestay_changed)
+    event.listen(Destination, _event, _destination_changed)
+event.listen(Homestay, "after_delete", _removed("homestay"))
+event.listen(Destination, "after_delete", _removed("destination"))
+
+def forget_after_commit(db: Session, kind: str, doc_id: int):
+    """Bỏ một bản ghi khỏi chỉ mục sau khi commit, dùng khi xóa bằng SQL thuần (không qua ORM)"""
+    db.info.setdefault("autocomplete_changes", []).append((kind, doc_id, None))
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    changes = session.info.pop("autocomplete_changes", None)
+    if changes and autocomplete_index.built_at is not None:
+        autocomplete_index.apply(changes)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changes(session):
+    session.info.pop("autocomplete_changes", None)
@@ -0,0 +1,492 @@
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, case, func, literal, or_, select
+from sqlalchemy.orm import Session, joinedload
+from app.models.room_categories import HomestayRoom, RoomAvailability, RoomCategory
+from app.models.bookings import Booking
+from app.models.homestays import Homestay
+from app.models.destinations import Destination
+from app.config import settings
+from app.services.cache import create_cache, invalidate_after_commit
+
+# Trạng thái booking chiếm lịch
+ACTIVE_BOOKING_STATUSES = ["confirmed", "pending"]
+BLOCKING_BOOKING_STATUSES = ["confirmed", "pending", "blocked"]
+
+def month_bounds(year: int, month: int) -> Tuple[date, date]:
+    """Ngày đầu và ngày cuối của tháng"""
+    start_date = date(year, month, 1)
+    if month == 12:
+        end_date = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    return start_date, end_date
+
+# Cache lịch nhanh theo (homestay, tháng)
+quick_availability_cache = create_cache(
+    "quick_availability",
+    max_entries=settings.QUICK_AVAILABILITY_CACHE_SIZE,
+    ttl=settings.QUICK_AVAILABILITY_CACHE_TTL
+)
+
+def quick_cache_key(homestay_id: int, year: int, month: int) -> str:
+    return f"{homestay_id}:{year}-{month:02d}"
+
+def invalidate_quick_months(db: Session, homestay_id: int, days: Iterable[date]):
+    """Xóa cache lịch nhanh của các tháng chứa các ngày đã thay đổi, sau khi commit"""
+    months = {(day.year, day.month) for day in days}
+    invalidate_after_commit(
+        db, quick_availability_cache,
+        [quick_cache_key(homestay_id, year, month) for year, month in sorted(months)]
+    )
+
+def room_base_price(room: HomestayRoom):
+    """Giá mặc định của phòng: giá riêng, nếu không có thì giá loại phòng"""
+    return room.price_per_night or room.room_category.base_price
+
+def booking_info(booking: Booking) -> Dict:
+    return {
+        "booking_code": booking.booking_code,
+        "guest_name": booking.guest_details.get("name") if booking.guest_details else "Khách hàng",
+        "guests": booking.guests
+    }
+
+class OverrideIndex:
+    """Các khoảng RoomAvailability đã tải, tra theo phòng và ngày"""
+
+    def __init__(self, records: List[RoomAvailability]):
+        self._by_room: Dict[int, List[RoomAvailability]] = {}
+        for record in sorted(records, key=lambda r: r.start_date):
+            self._by_room.setdefault(record.room_id, []).append(record)
+        self._starts = {
+            room_id: [record.start_date for record in ranges]
+            for room_id, ranges in self._by_room.items()
+        }
+
+    def get(self, room_id: int, day: date) -> Optional[RoomAvailability]:
+        """Khoảng chứa ngày đã cho, None nếu ngày chưa được thiết lập"""
+        starts = self._starts.get(room_id)
+        if not starts:
+            return None
+        index = bisect_right(starts, day) - 1
+        if index >= 0:
+            record = self._by_room[room_id][index]
+            if day < record.end_date:
+                return record
+        return None
+
+    def for_room(self, room_id: int) -> List[RoomAvailability]:
+        return self._by_room.get(room_id, [])
+
+class BookingIndex:
+    """Chỉ mục khoảng [check_in, check_out) của các booking trong một cửa sổ ngày"""
+
+    def __init__(self, bookings: List[Booking]):
+        # Sắp theo id để "booking đầu tiên" ổn định như thứ tự của bảng
+        self._bookings = sorted(bookings, key=lambda b: b.id)
+
+    def day_map(self, start: date, end: date) -> Dict[date, Booking]:
+        """Ánh xạ ngày -> booking đầu tiên chiếm ngày đó trong [start, end)"""
+        by_day: Dict[date, Booking] = {}
+        for booking in self._bookings:
+            day = max(booking.check_in, start)
+            stop = min(booking.check_out, end)
+            while day < stop:
+                by_day.setdefault(day, booking)
+                day += timedelta(days=1)
+        return by_day
+
+def load_rooms(
+    db: Session,
+    homestay_id: int,
+    room_ids: Optional[List[int]] = None,
+    available_only: bool = True,
+    room_category_id: Optional[int] = None,
+    min_guests: Optional[int] = None
+) -> List[HomestayRoom]:
+    """Tải phòng của homestay kèm loại phòng trong một truy vấn"""
+    query = db.query(HomestayRoom).options(joinedload(HomestayRoom.room_category)).filter(
+        HomestayRoom.homestay_id == homestay_id
+    )
+    if room_ids:
+        query = query.filter(HomestayRoom.id.in_(room_ids))
+    if available_only:
+        query = query.filter(HomestayRoom.is_available == True)
+    if room_category_id:
+        query = query.filter(HomestayRoom.room_category_id == room_category_id)
+    if min_guests is not None:
+        query = query.filter(HomestayRoom.room_category.has(RoomCategory.max_guests >= min_guests))
+    return query.order_by(HomestayRoom.id).all()
+
+def load_overrides(db: Session, room_ids: List[int], start: date, end: date, priced_only: bool = False) -> OverrideIndex:
+    """Tải các khoảng RoomAvailability giao với [start, end); priced_only: chỉ các khoảng có giá đặc biệt"""
+    if not room_ids:
+        return OverrideIndex([])
+    query = db.query(RoomAvailability).filter(
+        RoomAvailability.room_id.in_(room_ids),
+        RoomAvailability.start_date < end,
+        RoomAvailability.end_date > start
+    )
+    if priced_only:
+        query = query.filter(RoomAvailability.price_override.isnot(None))
+    return OverrideIndex(query.all())
+
+def load_bookings(
+    db: Session,
+    homestay_id: int,
+    start: date,
+    end: date,
+    statuses: List[str] = BLOCKING_BOOKING_STATUSES
+) -> BookingIndex:
+    """Tải các booking giao với [start, end)"""
+    bookings = db.query(Booking).filter(
+        Booking.homestay_id == homestay_id,
+        Booking.status.in_(statuses),
+        Booking.check_in < end,
+        Booking.check_out > start
+    ).all()
+    return BookingIndex(bookings)
+
+def build_month_calendar(db: Session, homestay_id: int, year: int, month: int, room_id: Optional[int] = None) -> Dict:
+    """
+    Dựng lịch tháng từ dữ liệu khoảng đã tải sẵn.
+    Số truy vấn không phụ thuộc số ngày hay số phòng.
+    """
+    start_date, end_date = month_bounds(year, month)
+    window_end = end_date + timedelta(days=1)
+
+    if room_id:
+        rooms = load_rooms(db, homestay_id, room_ids=[room_id], available_only=False)
+    else:
+        rooms = load_rooms(db, homestay_id)
+
+    overrides = load_overrides(db, [room.id for room in rooms], start_date, window_end)
+    bookings_by_day = load_bookings(
+        db, homestay_id, start_date, window_end, ACTIVE_BOOKING_STATUSES
+    ).day_map(start_date, window_end)
+
+    days = []
+    total_available = 0
+    total_booked = 0
+
+    current_date = start_date
+    while current_date <= end_date:
+        day_status = "available"
+        info = None
+        price = None
+        booking = bookings_by_day.get(current_date)
+
+        if room_id:
+            # Phòng không thuộc homestay thì giữ trạng thái mặc định
+            if rooms:
+                room = rooms[0]
+                availability = overrides.get(room.id, current_date)
+                if availability:
+                    if not availability.is_available:
+                        day_status = "blocked"
+                    price = float(availability.price_override) if availability.price_override else float(room_base_price(room))
+                else:
+                    price = float(room_base_price(room))
+
+                if booking:
+                    day_status = "booked"
+                    info = booking_info(booking)
+        else:
+            available_rooms = 0
+            min_price = None
+
+            for room in rooms:
+                availability = overrides.get(room.id, current_date)
+                room_available = not (availability and not availability.is_available)
+
+                if booking:
+                    room_available = False
+                    if not info:
+                        info = booking_info(booking)
+
+                if room_available:
+                    available_rooms += 1
+                    room_price = availability.price_override if availability and availability.price_override else room_base_price(room)
+                    if min_price is None or room_price < min_price:
+                        min_price = float(room_price)
+
+            if available_rooms == 0:
+                day_status = "booked" if info else "blocked"
+            else:
+                price = min_price
+
+        is_available = day_status == "available"
+        if is_available:
+            total_available += 1
+        else:
+            total_booked += 1
+
+        days.append({
+            "date": current_date.isoformat(),
+            "is_available": is_available,
+            "price": price,
+            "status": day_status,
+            "booking_info": info
+        })
+
+        current_date += timedelta(days=1)
+
+    return {
+        "year": year,
+        "month": month,
+        "days": days,
+        "total_available": total_available,
+        "total_booked": total_booked
+    }
+
+def room_blocked_reason(
+    room: HomestayRoom,
+    occupancy,
+    conflict: Optional[Tuple[date, str]],
+    check_in: date,
+    check_out: date
+) -> Optional[str]:
+    """Lý do phòng không trống, theo đêm bị chiếm sớm nhất; ngày bị chặn ưu tiên hơn booking cùng đêm"""
+    blocked_date = occupancy.first_blocked(room.id, check_in, check_out)
+    if blocked_date and (not conflict or blocked_date <= conflict[0]):
+        return f"Ngày {blocked_date.strftime('%d/%m/%Y')} bị chặn"
+    if conflict:
+        conflict_date, status = conflict
+        return f"Ngày {conflict_date.strftime('%d/%m/%Y')} đã {'bị chặn' if status == 'blocked' else 'được đặt'}"
+    return None
+
+def check_stay(
+    db: Session,
+    homestay,
+    check_in: date,
+    check_out: date,
+    guests: int = 1,
+    room_category_id: Optional[int] = None
+) -> Dict:
+    """
+    Kiểm tra phòng trống cho cả kỳ lưu trú.
+    Tình trạng chiếm chỗ lấy từ bitmap occupancy, giá từng đêm tính theo lô từ các khoảng giá đặc biệt.
+    """
+    from app.services.occupancy import load_occupancy
+    from app.services.pricing import price_stays
+
+    nights = (check_out - check_in).days
+    rooms = load_rooms(db, homestay.id, room_category_id=room_category_id, min_guests=guests)
+    occupancy = load_occupancy(db, homestay.id, check_in, check_out)
+    conflict = occupancy.first_booked(check_in, check_out)
+
+    # Nếu homestay không có phòng, kiểm tra booking trực tiếp
+    if not rooms:
+        if conflict:
+            conflict_date, status = conflict
+            return {
+                "available": False,
+                "message": f"Ngày {conflict_date.strftime('%d/%m/%Y')} đã {'bị chặn' if status == 'blocked' else 'được đặt'}. Vui lòng chọn ngày khác.",
+                "blocked_date": conflict_date.isoformat()
+            }
+
+        total_price = float(homestay.price_per_night) * nights
+        return {
+            "available": True,
+            "message": "Homestay khả dụng",
+            "total_price": total_price,
+            "avg_price_per_night": float(homestay.price_per_night),
+            "nights": nights
+        }
+
+    available = [
+        room for room in rooms
+        if not room_blocked_reason(room, occupancy, conflict, check_in, check_out)
+    ]
+    quotes = price_stays(db, available, check_in, check_out)
+    available_rooms = []
+
+    for room in available:
+        quote = quotes[room.id]
+        available_rooms.append({
+            "room_id": room.id,
+            "room_number": room.room_number,
+            "room_name": room.custom_name or room.room_category.name,
+            "category": room.room_category.name,
+            "max_guests": room.room_category.max_guests,
+            "total_price": quote.total,
+            "avg_price_per_night": quote.average,
+            "nightly_prices": quote.breakdown()
+        })
+
+    if len(available_rooms) == 0:
+        return {
+            "available": False,
+            "message": "Không có phòng trống trong khoảng thời gian này. Vui lòng chọn ngày khác."
+        }
+
+    return {
+        "available": len(available_rooms) > 0,
+        "available_rooms": available_rooms,
+        "total_rooms": len(available_rooms)
+    }
+
+def _days_between(db: Session, start, end):
+    """Biểu thức SQL số ngày từ start đến end theo dialect đang dùng"""
+    if db.get_bind().dialect.name == "mysql":
+        return func.datediff(end, start)
+    return func.julianday(end) - func.julianday(start)
+
+def available_stays(
+    db: Session,
+    check_in: date,
+    check_out: date,
+    guests: int = 1,
+    room_category_id: Optional[int] = None
+):
+    """
+    Query (Homestay, stay_total, available_rooms) các homestay còn trống cho kỳ lưu trú, kèm hai biểu thức stay_total
+    (giá phòng rẻ nhất cả kỳ) và available_rooms. Toàn bộ điều kiện trống/giá được tính bằng SQL theo tập hợp.
+    """
+    nights = (check_out - check_in).days
+
+    # Homestay có booking (kể cả ngày chặn) giao với kỳ lưu trú
+    booked_homestays = select(Booking.homestay_id).where(
+        Booking.status.in_(BLOCKING_BOOKING_STATUSES),
+        Booking.check_in < check_out,
+        Booking.check_out > check_in
+    )
+
+    # Phòng bị chặn ít nhất một đêm
+    blocked_rooms = select(RoomAvailability.room_id).where(
+        RoomAvailability.start_date < check_out,
+        RoomAvailability.end_date > check_in,
+        RoomAvailability.is_available == False
+    )
+
+    # Tổng giá đặc biệt và số đêm có giá đặc biệt của từng phòng (phần giao của khoảng với kỳ lưu trú)
+    overlap_nights = _days_between(
+        db,
+        case((RoomAvailability.start_date > check_in, RoomAvailability.start_date), else_=literal(check_in)),
+        case((RoomAvailability.end_date < check_out, RoomAvailability.end_date), else_=literal(check_out))
+    )
+    overrides = select(
+        RoomAvailability.room_id.label("room_id"),
+        func.sum(RoomAvailability.price_override * overlap_nights).label("override_total"),
+        func.sum(overlap_nights).label("override_nights")
+    ).where(
+        RoomAvailability.start_date < check_out,
+        RoomAvailability.end_date > check_in,
+        RoomAvailability.price_override.isnot(None)
+    ).group_by(RoomAvailability.room_id).subquery()
+
+    room_total = (
+        func.coalesce(HomestayRoom.price_per_night, RoomCategory.base_price)
+        * (nights - func.coalesce(overrides.c.override_nights, 0))
+        + func.coalesce(overrides.c.override_total, 0)
+    )
+    room_conditions = [
+        HomestayRoom.is_available == True,
+        RoomCategory.max_guests >= guests,
+        HomestayRoom.id.notin_(blocked_rooms)
+    ]
+    if room_category_id:
+        room_conditions.append(HomestayRoom.room_category_id == room_category_id)
+
+    # Giá rẻ nhất và số phòng trống theo homestay
+    cheapest = select(
+        HomestayRoom.homestay_id.label("homestay_id"),
+        func.min(room_total).label("min_total"),
+        func.count(HomestayRoom.id).label("available_rooms")
+    ).join(
+        RoomCategory, RoomCategory.id == HomestayRoom.room_category_id
+    ).outerjoin(
+        overrides, overrides.c.room_id == HomestayRoom.id
+    ).where(*room_conditions).group_by(HomestayRoom.homestay_id).subquery()
+
+    # Homestay có phòng thì cần ít nhất một phòng phù hợp; homestay không có phòng thì xét theo giá và sức chứa chung
+    homestays_with_rooms = select(HomestayRoom.homestay_id).where(HomestayRoom.is_available == True)
+    if room_category_id:
+        availability_condition = cheapest.c.homestay_id.isnot(None)
+    else:
+        availability_condition = or_(
+            cheapest.c.homestay_id.isnot(None),
+            and_(
+                Homestay.id.notin_(homestays_with_rooms),
+                or_(Homestay.max_guests == None, Homestay.max_guests >= guests)
+            )
+        )
+
+    stay_total = func.coalesce(cheapest.c.min_total, Homestay.price_per_night * nights)
+    available_rooms = func.coalesce(cheapest.c.available_rooms, 0)
+    query = db.query(
+        Homestay,
+        stay_total.label("stay_total"),
+        available_rooms.label("available_rooms")
+    ).outerjoin(
+        cheapest, cheapest.c.homestay_id == Homestay.id
+    ).filter(
+        Homestay.status == 'active',
+        Homestay.is_active == True,
+        Homestay.id.notin_(booked_homestays),
+        availability_condition
+    )
+    return query, stay_total, available_rooms
+
+def search_available_homestays(
+    db: Session,
+    check_in: date,
+    check_out: date,
+    guests: int = 1,
+    destination_id: Optional[int] = None,
+    destination: Optional[str] = None,
+    category_id: Optional[int] = None,
+    room_category_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    page: int = 1,
+    limit: int = 20
+) -> Dict:
+    """Tìm các homestay còn trống cho kỳ lưu trú kèm giá phòng rẻ nhất"""
+    nights = (check_out - check_in).days
+    query, stay_total, _ = available_stays(db, check_in, check_out, guests, room_category_id)
+
+    if destination_id:
+        query = query.filter(Homestay.destination_id == destination_id)
+    if destination:
+        query = query.filter(Homestay.destination.has(Destination.name.ilike(f"%{destination}%")))
+    if category_id:
+        query = query.filter(Homestay.category_id == category_id)
+    if min_price:
+        query = query.filter(stay_total >= min_price * nights)
+    if max_price:
+        query = query.filter(stay_total <= max_price * nights)
+
+    total = query.count()
+    rows = query.order_by(stay_total, Homestay.id).offset((page - 1) * limit).limit(limit).all()
+
+    results = []
+    for homestay, total_price, available_rooms in rows:
+        total_price = float(total_price)
+        results.append({
+            "id": homestay.id,
+            "name": homestay.name,
+            "slug": homestay.slug,
+            "address": homestay.address,
+            "latitude": float(homestay.latitude) if homestay.latitude else None,
+            "longitude": float(homestay.longitude) if homestay.longitude else None,
+            "max_guests": homestay.max_guests,
+            "featured": homestay.featured,
+            "discount_percent": homestay.discount_percent,
+            "available_rooms": available_rooms,
+            "total_price": total_price,
+            "avg_price_per_night": total_price / nights
+        })
+
+    return {
+        "homestays": results,
+        "check_in": check_in.isoformat(),
+        "check_out": check_out.isoformat(),
+        "nights": nights,
+        "guests": guests,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "total_pages": (total + limit - 1) // limit
+    }
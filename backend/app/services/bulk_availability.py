@@ -0,0 +1,241 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.room_categories import HomestayRoom, RoomAvailability
+from app.models.bookings import Booking
+from app.services.availability_engine import ACTIVE_BOOKING_STATUSES
+from app.services.occupancy import mark_room_days, refresh_bookings
+
+def parse_dates(dates: List[str]) -> List[date]:
+    """Chuyển danh sách chuỗi ngày (YYYY-MM-DD hoặc ISO datetime) thành các ngày không trùng, đã sắp xếp"""
+    days = set()
+    for date_str in dates:
+        try:
+            days.add(datetime.strptime(date_str, "%Y-%m-%d").date())
+        except ValueError:
+            days.add(datetime.fromisoformat(date_str.replace('Z', '+00:00')).date())
+    return sorted(days)
+
+def find_booking_conflicts(db: Session, homestay_id: int, days: List[date]) -> List[Dict]:
+    """Các ngày trong danh sách đã có booking confirmed/pending, một truy vấn cho cả khoảng"""
+    if not days:
+        return []
+    bookings = db.query(Booking).filter(
+        Booking.homestay_id == homestay_id,
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        Booking.check_in <= days[-1],
+        Booking.check_out > days[0]
+    ).order_by(Booking.id).all()
+
+    conflicts = []
+    for day in days:
+        booking = next((b for b in bookings if b.check_in <= day < b.check_out), None)
+        if booking:
+            conflicts.append({
+                "date": day.isoformat(),
+                "booking_code": booking.booking_code,
+                "status": booking.status
+            })
+    return conflicts
+
+def _lock_rooms(db: Session, room_ids: List[int]):
+    """
+    Khóa các dòng phòng (theo thứ tự id để tránh deadlock) tới hết transaction: các lần vẽ lại khoảng
+    của cùng một phòng chạy tuần tự, không ghi chồng khoảng lên nhau.
+    """
+    db.query(HomestayRoom.id).filter(HomestayRoom.id.in_(room_ids)).order_by(HomestayRoom.id).with_for_update().all()
+
+def _load_ranges(db: Session, room_ids: List[int], days: List[date]) -> Dict[int, List[RoomAvailability]]:
+    """
+    Các khoảng của từng phòng giao hoặc kề với [ngày đầu, ngày cuối], một truy vấn cho cả hình chữ nhật.
+    Đọc có khóa để thấy bản đã commit mới nhất (không phải snapshot đầu transaction).
+    """
+    records = db.query(RoomAvailability).filter(
+        RoomAvailability.room_id.in_(room_ids),
+        RoomAvailability.start_date <= days[-1] + timedelta(days=1),
+        RoomAvailability.end_date >= days[0]
+    ).with_for_update().populate_existing().all()
+    by_room = {}
+    for record in records:
+        by_room.setdefault(record.room_id, []).append(record)
+    return by_room
+
+def _encode_ranges(room_id: int, states: Dict[date, Tuple]) -> List[Dict]:
+    """Gộp các ngày liên tiếp có cùng (is_available, price_override, min_nights) thành khoảng"""
+    ranges = []
+    for day in sorted(states):
+        state = states[day]
+        last = ranges[-1] if ranges else None
+        if last and last["end_date"] == day and (last["is_available"], last["price_override"], last["min_nights"]) == state:
+            last["end_date"] = day + timedelta(days=1)
+        else:
+            ranges.append({
+                "room_id": room_id,
+                "start_date": day,
+                "end_date": day + timedelta(days=1),
+                "is_available": state[0],
+                "price_override": state[1],
+                "min_nights": state[2]
+            })
+    return ranges
+
+def _paint_days(
+    db: Session,
+    room_ids: List[int],
+    days: List[date],
+    is_available: bool,
+    only_existing: bool,
+    days_by_room: Optional[Dict[int, List[date]]] = None
+) -> Dict:
+    """
+    Đặt trạng thái is_available cho các ô phòng × ngày, giữ giá đặc biệt và số đêm tối thiểu.
+    Các khoảng bị ảnh hưởng được xóa bằng một câu DELETE và ghi lại bằng một lần INSERT nhiều dòng (không commit).
+    only_existing: chỉ sửa các ngày đã có khoảng (bỏ chặn không tạo bản ghi mới).
+    days_by_room: chỉ sửa các ngày này của từng phòng thay vì cả hình chữ nhật (days là hợp các ngày, đã sắp xếp).
+    """
+    _lock_rooms(db, room_ids)
+    existing = _load_ranges(db, room_ids, days)
+    stale_ids = []
+    new_ranges = []
+    touched = []
+    painted = []
+    existing_cells = 0
+    changed_cells = 0
+
+    for room_id in room_ids:
+        records = existing.get(room_id, [])
+        states = {}
+        for record in records:
+            day = record.start_date
+            while day < record.end_date:
+                states[day] = (record.is_available, record.price_override, record.min_nights)
+                day += timedelta(days=1)
+
+        before = dict(states)
+        for day in (days_by_room[room_id] if days_by_room is not None else days):
+            if day in states:
+                existing_cells += 1
+                if states[day][0] != is_available:
+                    changed_cells += 1
+                    painted.append((room_id, day))
+                touched.append((room_id, day))
+                states[day] = (is_available,) + states[day][1:]
+            elif not only_existing:
+                touched.append((room_id, day))
+                painted.append((room_id, day))
+                states[day] = (is_available, None, 1)
+
+        if states != before:
+            stale_ids.extend(record.id for record in records)
+            new_ranges.extend(_encode_ranges(room_id, states))
+
+    if stale_ids:
+        db.query(RoomAvailability).filter(RoomAvailability.id.in_(stale_ids)).delete(synchronize_session=False)
+    if new_ranges:
+        db.execute(RoomAvailability.__table__.insert(), new_ranges)
+
+    return {"touched": touched, "painted": painted, "existing": existing_cells, "changed": changed_cells}
+
+def block_room_days(db: Session, homestay_id: int, room_ids: List[int], days: List[date]) -> Dict:
+    """Chặn toàn bộ hình chữ nhật phòng × ngày (không commit)"""
+    cells = [(room_id, day) for room_id in room_ids for day in days]
+    updated = 0
+    newly_blocked = []
+
+    if cells:
+        result = _paint_days(db, room_ids, days, False, only_existing=False)
+        updated = result["existing"]
+        newly_blocked = result["painted"]
+        mark_room_days(db, homestay_id, cells, False)
+
+    return {
+        "affected_cells": len(cells),
+        "inserted_cells": len(cells) - updated,
+        "updated_cells": updated,
+        # Các ô trước đó chưa bị chặn
+        "blocked_cells": newly_blocked,
+        "conflicts": find_booking_conflicts(db, homestay_id, days)
+    }
+
+def unblock_room_days(db: Session, homestay_id: int, room_ids: List[int], days: List[date]) -> Dict:
+    """Bỏ chặn các ô đã được thiết lập trong hình chữ nhật phòng × ngày (không commit)"""
+    if not room_ids or not days:
+        return {"affected_cells": 0, "updated_cells": 0}
+
+    result = _paint_days(db, room_ids, days, True, only_existing=True)
+    mark_room_days(db, homestay_id, result["touched"], True)
+
+    return {
+        "affected_cells": len(result["touched"]),
+        "updated_cells": result["changed"]
+    }
+
+def unblock_room_cells(db: Session, homestay_id: int, cells: List[Tuple[int, date]]) -> Dict:
+    """Bỏ chặn đúng các ô (room_id, ngày) đã cho, không đụng các ngày khác của phòng (không commit)"""
+    days_by_room = {}
+    for room_id, day in cells:
+        days_by_room.setdefault(room_id, []).append(day)
+    if not days_by_room:
+        return {"affected_cells": 0, "updated_cells": 0}
+
+    days = sorted({day for _, day in cells})
+    result = _paint_days(db, sorted(days_by_room), days, True, only_existing=True, days_by_room=days_by_room)
+    mark_room_days(db, homestay_id, result["touched"], True)
+
+    return {
+        "affected_cells": len(result["touched"]),
+        "updated_cells": result["changed"]
+    }
+
+def block_homestay_days(db: Session, homestay_id: int, days: List[date]) -> Dict:
+    """Chặn ngày cho homestay không có phòng bằng booking "blocked", chèn một lần cho các ngày chưa chặn (không commit)"""
+    if not days:
+        return {"affected_cells": 0, "inserted_cells": 0, "inserted_dates": [], "conflicts": []}
+
+    already_blocked = {
+        check_in for (check_in,) in db.query(Booking.check_in).filter(
+            Booking.homestay_id == homestay_id,
+            Booking.check_in.in_(days),
+            Booking.status == "blocked"
+        ).all()
+    }
+    new_days = [day for day in days if day not in already_blocked]
+
+    if new_days:
+        db.execute(Booking.__table__.insert(), [
+            {
+                "booking_code": f"BLOCKED_{homestay_id}_{day.strftime('%Y%m%d')}",
+                "homestay_id": homestay_id,
+                "check_in": day,
+                "check_out": day + timedelta(days=1),
+                "guests": 0,
+                "total_price": 0,
+                "status": "blocked",
+                "guest_details": {"reason": "Blocked by host"},
+                "payment_method": "none"
+            }
+            for day in new_days
+        ])
+        refresh_bookings(db, homestay_id)
+
+    return {
+        "affected_cells": len(days),
+        "inserted_cells": len(new_days),
+        "inserted_dates": new_days,
+        "conflicts": find_booking_conflicts(db, homestay_id, days)
+    }
+
+def unblock_homestay_days(db: Session, homestay_id: int, days: List[date]) -> Dict:
+    """Xóa các booking "blocked" một ngày của homestay trong danh sách ngày bằng một câu lệnh DELETE (không commit)"""
+    if not days:
+        return {"affected_cells": 0}
+
+    deleted = db.query(Booking).filter(
+        Booking.homestay_id == homestay_id,
+        Booking.check_in.in_(days),
+        Booking.status == "blocked"
+    ).delete(synchronize_session=False)
+    if deleted:
+        refresh_bookings(db, homestay_id)
+
+    return {"affected_cells": deleted}
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+
+class MemoryCache:
+    """Cache trong tiến trình với giới hạn số phần tử (LRU) và thời gian sống (TTL)"""
+
+    def __init__(self, max_entries: int = 1024, ttl: int = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class RedisCache:
+    """Cache dùng chung giữa các worker qua Redis; client có thể thay bằng bản giả lập cùng giao diện"""
+
+    def __init__(self, url: Optional[str] = None, namespace: str = "", ttl: int = 300, client=None):
+        if client is None:
+            import redis  # Phụ thuộc tùy chọn, chỉ cần khi CACHE_BACKEND=redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        self.client.setex(self._key(key), ttl or self.ttl, json.dumps(value))
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*[self._key(key) for key in keys])
+
+    def clear(self):
+        for key in self.client.scan_iter(self._key("*")):
+            self.client.delete(key)
+
+def create_cache(namespace: str, max_entries: int = 1024, ttl: int = 300):
+    """Tạo cache theo CACHE_BACKEND: "memory" (mặc định) hoặc "redis" (dùng CACHE_URL)"""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCache(settings.CACHE_URL, namespace=namespace, ttl=ttl)
+    return MemoryCache(max_entries=max_entries, ttl=ttl)
+
+def query_key(query) -> str:
+    """Key cache của một truy vấn ORM: băm câu SQL đã biên dịch cùng tham số"""
+    compiled = query.statement.compile(dialect=query.session.get_bind().dialect)
+    params = sorted(compiled.params.items(), key=lambda item: item[0])
+    return hashlib.sha1(f"{compiled}|{params}".encode()).hexdigest()
+
+def invalidate_after_commit(db: Session, cache, keys: Iterable[str]):
+    """Xóa các key khỏi cache sau khi transaction commit; rollback thì bỏ qua"""
+    keys = list(keys)
+    if keys:
+        db.info.setdefault("cache_invalidations", []).append((cache, keys))
+
+@event.listens_for(Session, "after_commit")
+def _run_invalidations(session):
+    for cache, keys in session.info.pop("cache_invalidations", []):
+        cache.delete(*keys)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_invalidations(session):
+    session.info.pop("cache_invalidations", None)
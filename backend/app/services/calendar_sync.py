@@ -1,154 +1,226 @@
 # backend/app/services/calendar_sync.py
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from datetime import datetime, timedelta
-import asyncio
-
-class CalendarSyncService:
-    def __init__(self, credentials):
-        self.credentials = Credentials.from_authorized_user_info(credentials)
-        self.service = build('calendar', 'v3', credentials=self.credentials)
-    
-    async def sync_availability(self, calendar_id: str, homestay_id: int, db):
-        """
-        Sync availability from Google Calendar to homestay
-        """
-        # Get events from Google Calendar
-        now = datetime.utcnow()
-        time_min = now.isoformat() + 'Z'
-        time_max = (now + timedelta(days=365)).isoformat() + 'Z'
-        
-        events_result = self.service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        
-        synced_count = 0
-        
-        for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            end = event['end'].get('dateTime', event['end'].get('date'))
-            
-            # Parse dates
-            start_date = datetime.fromisoformat(start.replace('Z', '+00:00')).date()
-            end_date = datetime.fromisoformat(end.replace('Z', '+00:00')).date()
-            
-            # Block dates in availability
-            current_date = start_date
-            while current_date < end_date:
-                availability = db.query(Availability).filter(
-                    and_(
-                        Availability.homestay_id == homestay_id,
-                        Availability.date == current_date
-                    )
-                ).first()
-                
-                if not availability:
-                    availability = Availability(
-                        homestay_id=homestay_id,
-                        date=current_date,
-                        status='blocked',
-                        notes=f"Synced from Google Calendar: {event.get('summary', 'Event')}"
-                    )
-                    db.add(availability)
-                else:
-                    availability.status = 'blocked'
-                    availability.notes = f"Synced from Google Calendar: {event.get('summary', 'Event')}"
-                
-                synced_count += 1
-                current_date += timedelta(days=1)
-        
-        db.commit()
-        return synced_count
-    
-    async def export_to_calendar(self, calendar_id: str, booking, db):
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+import requests
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db import SessionLocal
+from app.models.additional import CalendarSync
+from app.models.room_categories import HomestayRoom
+from app.services.bulk_availability import (
+    block_room_days, unblock_room_cells, block_homestay_days, unblock_homestay_days
+)
+
+logger = logging.getLogger(__name__)
+
+# Chỉ đồng bộ các ngày trong khoảng này tính từ hôm nay
+SYNC_HORIZON_DAYS = 365
+
+class CalendarSyncError(Exception):
+    pass
+
+class SyncTokenExpired(CalendarSyncError):
+    """Google trả 410 Gone: sync token hết hạn, cần đồng bộ lại toàn bộ"""
+
+class GoogleCalendarClient:
+    """Client REST tối giản cho Google Calendar API v3"""
+
+    def __init__(self, access_token: str, base_url: Optional[str] = None, page_size: Optional[int] = None):
+        self.base_url = (base_url or settings.GOOGLE_CALENDAR_API_URL).rstrip('/')
+        self.page_size = page_size or settings.CALENDAR_SYNC_PAGE_SIZE
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {access_token}"
+
+    def _events_url(self, calendar_id: str) -> str:
+        return f"{self.base_url}/calendars/{requests.utils.quote(calendar_id, safe='')}/events"
+
+    def list_changes(self, calendar_id: str, sync_token: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
         """
-        Export booking to Google Calendar
+        Lấy các event thay đổi kể từ sync_token (hoặc toàn bộ nếu không có), duyệt hết các trang.
+        Trả về (events, next_sync_token).
         """
+        params = {"maxResults": self.page_size, "singleEvents": "true"}
+        if sync_token:
+            params["syncToken"] = sync_token
+
+        events = []
+        while True:
+            response = self.session.get(self._events_url(calendar_id), params=params, timeout=30)
+            if response.status_code == 410:
+                raise SyncTokenExpired("Sync token expired")
+            if response.status_code != 200:
+                raise CalendarSyncError(f"Google Calendar API error {response.status_code}: {response.text[:200]}")
+
+            result = response.json()
+            events.extend(result.get("items", []))
+
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return events, result.get("nextSyncToken")
+            params["pageToken"] = page_token
+
+    def create_booking_event(self, calendar_id: str, booking) -> Dict:
+        """Xuất booking thành event cả ngày trên lịch"""
         event = {
             'summary': f'Booking: {booking.booking_code}',
-            'description': f'Guest: {booking.guest_info.get("fullName", "N/A")}\nGuests: {booking.guests}',
-            'start': {
-                'date': booking.check_in.isoformat(),
-                'timeZone': 'Asia/Ho_Chi_Minh',
-            },
-            'end': {
-                'date': booking.check_out.isoformat(),
-                'timeZone': 'Asia/Ho_Chi_Minh',
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 24 * 60},
-                    {'method': 'popup', 'minutes': 60},
-                ],
-            },
+            'description': f'Guest: {(booking.guest_info or {}).get("fullName", "N/A")}\nGuests: {booking.guests}',
+            'start': {'date': booking.check_in.isoformat(), 'timeZone': 'Asia/Ho_Chi_Minh'},
+            'end': {'date': booking.check_out.isoformat(), 'timeZone': 'Asia/Ho_Chi_Minh'},
         }
-        
-        created_event = self.service.events().insert(
-            calendarId=calendar_id, 
-            body=event
-        ).execute()
-        
-        # Store calendar event ID in booking
-        booking.calendar_event_id = created_event['id']
+        response = self.session.post(self._events_url(calendar_id), json=event, timeout=30)
+        if response.status_code not in (200, 201):
+            raise CalendarSyncError(f"Google Calendar API error {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+def _parse_event_date(value: Dict) -> Optional[date]:
+    raw = value.get('dateTime') or value.get('date')
+    if not raw:
+        return None
+    return datetime.fromisoformat(raw.replace('Z', '+00:00')).date()
+
+def event_range(event: Dict) -> Optional[Tuple[date, date]]:
+    """Khoảng đêm [bắt đầu, kết thúc) mà event chiếm, None nếu event không chiếm đêm nào"""
+    start = _parse_event_date(event.get('start', {}))
+    end = _parse_event_date(event.get('end', {}))
+    if not start or not end or end <= start:
+        return None
+    return start, end
+
+def merge_events(tracked: Dict[str, List[str]], events: List[Dict]) -> Dict[str, List[str]]:
+    """Áp các event thay đổi lên tập event đang theo dõi (event bị hủy thì bỏ ra)"""
+    tracked = dict(tracked)
+    for event in events:
+        event_id = event.get('id')
+        if not event_id:
+            continue
+        date_range = event_range(event) if event.get('status') != 'cancelled' else None
+        if date_range:
+            tracked[event_id] = [date_range[0].isoformat(), date_range[1].isoformat()]
+        else:
+            tracked.pop(event_id, None)
+    return tracked
+
+def blocked_days(tracked: Dict[str, List[str]], today: date) -> Set[date]:
+    """Các ngày bị chặn bởi các event đang theo dõi, giới hạn trong khoảng đồng bộ"""
+    horizon = today + timedelta(days=SYNC_HORIZON_DAYS)
+    days = set()
+    for start_str, end_str in tracked.values():
+        day = max(date.fromisoformat(start_str), today)
+        end = min(date.fromisoformat(end_str), horizon)
+        while day < end:
+            days.add(day)
+            day += timedelta(days=1)
+    return days
+
+def apply_calendar_changes(db: Session, state: CalendarSync, events: List[Dict], full_sync: bool) -> Dict:
+    """
+    Tính chênh lệch ngày chặn so với lần đồng bộ trước và ghi hàng loạt (không commit).
+    Chỉ các ô do chính lịch này chặn mới được bỏ chặn; ô chủ nhà đã chặn từ trước được giữ nguyên.
+    """
+    today = date.today()
+    tracked = merge_events({} if full_sync else (state.events or {}), events)
+    desired = blocked_days(tracked, today)
+    previous = {
+        day for day in (date.fromisoformat(value) for value in (state.blocked_dates or []))
+        if day >= today
+    }
+    owned = {
+        date.fromisoformat(day): list(rooms) for day, rooms in (state.blocked_cells or {}).items()
+        if date.fromisoformat(day) >= today
+    }
+    to_block = sorted(desired - previous)
+    to_unblock = sorted(previous - desired)
+    released = {day: owned.pop(day) for day in to_unblock if day in owned}
+
+    room_ids = [
+        room_id for (room_id,) in db.query(HomestayRoom.id).filter(
+            HomestayRoom.homestay_id == state.homestay_id,
+            HomestayRoom.is_available == True
+        ).order_by(HomestayRoom.id).all()
+    ]
+    room_cells = [(room_id, day) for day, rooms in released.items() for room_id in rooms if room_id is not None]
+    homestay_days = sorted(day for day, rooms in released.items() if None in rooms)
+    unblocked = unblock_room_cells(db, state.homestay_id, room_cells)
+    unblocked_days = unblock_homestay_days(db, state.homestay_id, homestay_days)
+
+    if room_ids:
+        blocked = block_room_days(db, state.homestay_id, room_ids, to_block)
+        for room_id, day in blocked["blocked_cells"]:
+            owned.setdefault(day, []).append(room_id)
+    else:
+        blocked = block_homestay_days(db, state.homestay_id, to_block)
+        for day in blocked["inserted_dates"]:
+            owned.setdefault(day, []).append(None)
+
+    state.events = tracked
+    state.blocked_dates = [day.isoformat() for day in sorted(desired)]
+    state.blocked_cells = {day.isoformat(): rooms for day, rooms in sorted(owned.items())}
+
+    return {
+        "changed_events": len(events),
+        "blocked_dates": [day.isoformat() for day in to_block],
+        "unblocked_dates": [day.isoformat() for day in to_unblock],
+        "conflicts": blocked.get("conflicts", []),
+        "affected_cells": blocked["affected_cells"] + unblocked["affected_cells"] + unblocked_days["affected_cells"]
+    }
+
+def sync_calendar(db: Session, state: CalendarSync, client: GoogleCalendarClient) -> Dict:
+    """Đồng bộ tăng dần theo sync token; token hết hạn thì đồng bộ lại toàn bộ"""
+    full_sync = not state.sync_token
+    try:
+        events, next_token = client.list_changes(state.calendar_id, state.sync_token)
+    except SyncTokenExpired:
+        full_sync = True
+        events, next_token = client.list_changes(state.calendar_id)
+
+    summary = apply_calendar_changes(db, state, events, full_sync)
+    state.sync_token = next_token
+    state.status = "success"
+    state.last_error = None
+    state.last_synced_at = datetime.now()
+    db.commit()
+    summary["full_sync"] = full_sync
+    return summary
+
+def is_running(state: CalendarSync, now: Optional[datetime] = None) -> bool:
+    """Đang có lần đồng bộ chạy; "running" quá CALENDAR_SYNC_STALE_SECONDS coi như worker đã dừng giữa chừng"""
+    if state.status != "running":
+        return False
+    now = now or datetime.now()
+    return state.started_at is not None and now - state.started_at < timedelta(seconds=settings.CALENDAR_SYNC_STALE_SECONDS)
+
+def release_running(db: Session, sync_id: int, error: Optional[str]):
+    """Đưa trạng thái khỏi "running" bằng transaction mới"""
+    db.rollback()
+    state = db.query(CalendarSync).filter(CalendarSync.id == sync_id).first()
+    if state and state.status == "running":
+        state.status = "failed"
+        state.last_error = (error or "Đồng bộ bị dừng giữa chừng")[:1000]
         db.commit()
-        
-        return created_event['htmlLink']
-
-# API endpoint for calendar sync
-@router.post("/sync-calendar/{homestay_id}")
-async def sync_with_calendar(
-    homestay_id: int,
-    config: CalendarSyncConfig,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
-):
+
+def run_calendar_sync(sync_id: int, access_token: str, base_url: Optional[str] = None):
     """
-    Sync homestay availability with external calendar (Google/Outlook)
+    Job nền: chạy trong threadpool (BackgroundTasks) với session riêng,
+    để lời gọi HTTP và ghi DB không chặn event loop.
     """
-    # Validate homestay ownership
-    homestay = db.query(Homestay).filter(Homestay.id == homestay_id).first()
-    if not homestay:
-        raise HTTPException(status_code=404, detail="Homestay not found")
-    
+    db = SessionLocal()
+    error = None
     try:
-        if config.provider == 'google':
-            # Get Google Calendar credentials from user settings
-            # This would be stored securely after OAuth flow
-            credentials = current_user.google_calendar_credentials
-            
-            if not credentials:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Google Calendar not connected. Please authorize first."
-                )
-            
-            sync_service = CalendarSyncService(credentials)
-            synced_count = await sync_service.sync_availability(
-                config.calendar_id,
-                homestay_id,
-                db
-            )
-            
-            return {
-                "success": True,
-                "message": f"Synced {synced_count} dates from Google Calendar",
-                "provider": "google",
-                "synced_count": synced_count
-            }
-        
-        elif config.provider == 'outlook':
-            # Similar implementation for Outlook
-            pass
-        
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported calendar provider")
-    
+        state = db.query(CalendarSync).filter(CalendarSync.id == sync_id).first()
+        if not state:
+            return
+        state.status = "running"
+        state.started_at = datetime.now()
+        db.commit()
+
+        summary = sync_calendar(db, state, GoogleCalendarClient(access_token, base_url))
+        logger.info(f"Calendar sync {sync_id}: {summary}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
\ No newline at end of file
+        error = str(e)
+        logger.error(f"Calendar sync {sync_id} failed: {e}")
+    finally:
+        try:
+            release_running(db, sync_id, error)
+        finally:
+            db.close()
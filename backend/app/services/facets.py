@@ -0,0 +1,142 @@
+from typing import Dict, List, Sequence
+from sqlalchemy import String, case, cast, func, literal, null, select, union_all
+from sqlalchemy.orm import Query, Session
+from app.config import settings
+from app.models import Homestay, Category
+from app.models.amenities import Amenity, amenity_homestay
+from app.models.room_categories import RoomCategory, Tag, room_category_tags
+from app.services.cache import create_cache, query_key
+
+# Cận trên (VNĐ/đêm) của các khoảng giá; khoảng cuối không giới hạn
+PRICE_BUCKETS = (300000, 500000, 1000000, 2000000)
+ROOM_AMENITY_FLAGS = {
+    "has_balcony": "Có ban công",
+    "has_kitchen": "Có bếp riêng",
+    "is_pet_friendly": "Thân thiện với thú cưng"
+}
+
+# Kết quả đếm theo chữ ký bộ lọc (câu SQL của tập kết quả và tham số)
+facet_cache = create_cache("facets", max_entries=1024, ttl=settings.FACET_CACHE_TTL)
+
+def _price_bucket(column):
+    """Số thứ tự khoảng giá của một giá"""
+    return case(*[(column < bound, index) for index, bound in enumerate(PRICE_BUCKETS)], else_=len(PRICE_BUCKETS))
+
+def _price_ranges(counts: Dict[str, int]) -> List[Dict]:
+    bounds = (0,) + PRICE_BUCKETS + (None,)
+    return [
+        {"min": bounds[index], "max": bounds[index + 1], "count": counts.get(str(index), 0)}
+        for index in range(len(bounds) - 1)
+    ]
+
+def _grouped(facet: str, ids, id_column, value, label=None, source=None, join=None):
+    """SELECT facet, value, label, count nhóm theo value cho các dòng thuộc tập kết quả"""
+    statement = select(
+        literal(facet).label("facet"),
+        cast(value, String(255)).label("value"),
+        (label if label is not None else cast(null(), String(255))).label("label"),
+        func.count(func.distinct(id_column)).label("count")
+    ).select_from(source if source is not None else id_column.table)
+    if join is not None:
+        statement = statement.join(*join)
+    group_by = [value] + ([label] if label is not None else [])
+    return statement.where(id_column.in_(select(ids.c.id)), value.isnot(None)).group_by(*group_by)
+
+def _count_facets(db: Session, ids, statements: Sequence) -> Dict[str, List]:
+    """Chạy mọi nhóm trong một câu UNION ALL; trả về facet -> [(value, label, count)]"""
+    total = select(
+        literal("total").label("facet"),
+        cast(null(), String(255)).label("value"),
+        cast(null(), String(255)).label("label"),
+        func.count().label("count")
+    ).select_from(ids)
+    results: Dict[str, List] = {}
+    for row in db.execute(union_all(total, *statements)):
+        results.setdefault(row.facet, []).append((row.value, row.label, row.count))
+    return results
+
+def _cached(query: Query, build):
+    key = query_key(query)
+    facets = facet_cache.get(key)
+    if facets is None:
+        facets = build()
+        facet_cache.set(key, facets)
+    return facets
+
+def homestay_facets(db: Session, query: Query) -> Dict:
+    """Số homestay theo danh mục, tiện ích, khoảng giá và sức chứa trong tập kết quả của query"""
+    query = query.with_entities(Homestay.id.label("id")).order_by(None).distinct()
+
+    def build():
+        ids = query.subquery()
+        homestays = Homestay.__table__
+        rows = _count_facets(db, ids, [
+            _grouped("category", ids, homestays.c.id, homestays.c.category_id, Category.name,
+                     join=(Category, Category.id == homestays.c.category_id)),
+            _grouped("amenity", ids, amenity_homestay.c.homestay_id, amenity_homestay.c.amenity_id, Amenity.name,
+                     source=amenity_homestay, join=(Amenity, Amenity.id == amenity_homestay.c.amenity_id)),
+            _grouped("price", ids, homestays.c.id, _price_bucket(homestays.c.price_per_night)),
+            _grouped("guests", ids, homestays.c.id, homestays.c.max_guests),
+        ])
+        return {
+            "total": rows["total"][0][2],
+            "categories": [
+                {"id": int(value), "name": label, "count": count} for value, label, count in rows.get("category", [])
+            ],
+            "amenities": sorted(
+                ({"id": int(value), "name": label, "count": count} for value, label, count in rows.get("amenity", [])),
+                key=lambda item: -item["count"]
+            ),
+            "price_ranges": _price_ranges({value: count for value, _, count in rows.get("price", [])}),
+            "guests": sorted(
+                ({"max_guests": int(value), "count": count} for value, _, count in rows.get("guests", [])),
+                key=lambda item: item["max_guests"]
+            )
+        }
+
+    return _cached(query, build)
+
+def room_category_facets(db: Session, query: Query) -> Dict:
+    """Số loại phòng theo view, tag, tiện nghi, khoảng giá và sức chứa trong tập kết quả của query"""
+    query = query.with_entities(RoomCategory.id.label("id")).order_by(None).distinct()
+
+    def build():
+        ids = query.subquery()
+        categories = RoomCategory.__table__
+        statements = [
+            _grouped("view_type", ids, categories.c.id, categories.c.view_type),
+            _grouped("tag", ids, room_category_tags.c.room_category_id, room_category_tags.c.tag_id, Tag.name,
+                     source=room_category_tags, join=(Tag, Tag.id == room_category_tags.c.tag_id)),
+            _grouped("price", ids, categories.c.id, _price_bucket(categories.c.base_price)),
+            _grouped("guests", ids, categories.c.id, categories.c.max_guests),
+        ] + [
+            _grouped(flag, ids, categories.c.id, categories.c[flag]) for flag in ROOM_AMENITY_FLAGS
+        ]
+        rows = _count_facets(db, ids, statements)
+        return {
+            "total": rows["total"][0][2],
+            "view_types": sorted(
+                ({"value": value, "count": count} for value, _, count in rows.get("view_type", [])),
+                key=lambda item: -item["count"]
+            ),
+            "tags": sorted(
+                ({"id": int(value), "name": label, "count": count} for value, label, count in rows.get("tag", [])),
+                key=lambda item: -item["count"]
+            ),
+            "amenities": [
+                {
+                    "key": flag,
+                    "label": label,
+                    # Giá trị Boolean được đếm dưới dạng "1"/"0" (hoặc "true"/"false" tùy dialect)
+                    "count": sum(count for value, _, count in rows.get(flag, []) if value in ("1", "true"))
+                }
+                for flag, label in ROOM_AMENITY_FLAGS.items()
+            ],
+            "price_ranges": _price_ranges({value: count for value, _, count in rows.get("price", [])}),
+            "guests": sorted(
+                ({"max_guests": int(value), "count": count} for value, _, count in rows.get("guests", [])),
+                key=lambda item: item["max_guests"]
+            )
+        }
+
+    return _cached(query, build)
@@ -0,0 +1,208 @@
+import math
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session
+from app.models import Homestay, Destination
+from app.services.availability_engine import available_stays
+from app.services.listing import listing_options
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 12
+# Số ô geohash tối đa để phủ một vùng tìm kiếm (mỗi ô là một khoảng trên index geohash)
+MAX_COVER_CELLS = 16
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+# (nam, tây, bắc, đông) theo độ
+Box = Tuple[float, float, float, float]
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash chuẩn (base32): chia đôi lần lượt kinh độ rồi vĩ độ, 5 bit một ký tự"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Khoảng cách theo đường tròn lớn (haversine)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def radius_box(latitude: float, longitude: float, radius_km: float) -> Box:
+    """Hình chữ nhật bao vòng tròn bán kính radius_km quanh một điểm"""
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return (max(latitude - d_lat, -90.0), max(longitude - d_lng, -180.0),
+            min(latitude + d_lat, 90.0), min(longitude + d_lng, 180.0))
+
+def covering_prefixes(box: Box) -> List[str]:
+    """Các tiền tố geohash phủ kín vùng: độ chính xác lớn nhất mà số ô không vượt MAX_COVER_CELLS"""
+    south, west, north, east = box
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step = 180.0 / 2 ** (5 * precision // 2)
+        lng_step = 360.0 / 2 ** ((5 * precision + 1) // 2)
+        rows = range(math.floor((south + 90) / lat_step), math.floor((north + 90) / lat_step) + 1)
+        cols = range(math.floor((west + 180) / lng_step), math.floor((east + 180) / lng_step) + 1)
+        if len(rows) * len(cols) <= MAX_COVER_CELLS:
+            break
+    return sorted({
+        encode_geohash(min((row + 0.5) * lat_step - 90, 90.0), min((col + 0.5) * lng_step - 180, 180.0), precision)
+        for row in rows for col in cols
+    })
+
+def within_box(model, box: Box):
+    """Điều kiện SQL: các khoảng tiền tố trên index geohash, rồi lọc chính xác theo tọa độ"""
+    south, west, north, east = box
+    return and_(
+        # "{" đứng sau mọi ký tự geohash, [p, p + "{") là mọi geohash bắt đầu bằng p
+        or_(*[and_(model.geohash >= prefix, model.geohash < prefix + "{") for prefix in covering_prefixes(box)]),
+        model.latitude.between(south, north),
+        model.longitude.between(west, east)
+    )
+
+def _set_geohash(mapper, connection, target):
+    """Tính lại geohash trong cùng flush mỗi khi lưu bản ghi có tọa độ"""
+    if target.latitude is None or target.longitude is None:
+        target.geohash = None
+    else:
+        target.geohash = encode_geohash(float(target.latitude), float(target.longitude))
+
+for _model in (Homestay, Destination):
+    event.listen(_model, "before_insert", _set_geohash)
+    event.listen(_model, "before_update", _set_geohash)
+
+def _nearest(rows, latitude: float, longitude: float, radius_km: Optional[float], limit: int):
+    """(tổng số, các dòng gần nhất kèm khoảng cách) trong bán kính, sắp theo khoảng cách rồi id"""
+    scored = []
+    for row in rows:
+        distance = distance_km(latitude, longitude, float(row.latitude), float(row.longitude))
+        if radius_km is None or distance <= radius_km:
+            scored.append((distance, row.id, row))
+    scored.sort(key=lambda item: (item[0], item[1]))
+    return len(scored), scored[:limit]
+
+def find_nearby_homestays(
+    db: Session,
+    latitude: float,
+    longitude: float,
+    box: Box,
+    radius_km: Optional[float] = None,
+    check_in: Optional[date] = None,
+    check_out: Optional[date] = None,
+    guests: int = 1,
+    category_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = 20
+) -> Tuple[int, List[Dict]]:
+    """
+    Homestay trong vùng, gần điểm (latitude, longitude) nhất trước. Có ngày lưu trú thì chỉ lấy homestay còn trống
+    và lọc giá theo giá trung bình mỗi đêm của phòng rẻ nhất, giống /availability/search.
+    """
+    if check_in and check_out:
+        nights = (check_out - check_in).days
+        query, stay_total, available_rooms = available_stays(db, check_in, check_out, guests)
+        nightly_price = stay_total / nights
+        extra = (stay_total.label("stay_total"), available_rooms.label("available_rooms"))
+    else:
+        query = db.query(Homestay).filter(Homestay.status == 'active', Homestay.is_active == True)
+        if guests > 1:
+            query = query.filter(or_(Homestay.max_guests == None, Homestay.max_guests >= guests))
+        nightly_price = Homestay.price_per_night
+        extra = ()
+
+    query = query.filter(within_box(Homestay, box))
+    if category_id:
+        query = query.filter(Homestay.category_id == category_id)
+    if min_price:
+        query = query.filter(nightly_price >= min_price)
+    if max_price:
+        query = query.filter(nightly_price <= max_price)
+
+    # Chỉ lấy id và tọa độ của các ứng viên, nạp đầy đủ cho những homestay được trả về
+    rows = query.with_entities(Homestay.id, Homestay.latitude, Homestay.longitude, *extra).all()
+    total, nearest = _nearest(rows, latitude, longitude, radius_km, limit)
+    homestays = {
+        homestay.id: homestay
+        for homestay in db.query(Homestay).options(*listing_options()).filter(Homestay.id.in_([row.id for _, _, row in nearest]))
+    } if nearest else {}
+
+    results = []
+    for distance, homestay_id, row in nearest:
+        homestay = homestays[homestay_id]
+        item = {
+            "id": homestay.id,
+            "name": homestay.name,
+            "slug": homestay.slug,
+            "address": homestay.address,
+            "latitude": float(homestay.latitude),
+            "longitude": float(homestay.longitude),
+            "distance_km": round(distance, 2),
+            "price_per_night": float(homestay.price_per_night),
+            "max_guests": homestay.max_guests,
+            "featured": homestay.featured,
+            "discount_percent": homestay.discount_percent,
+            "avg_rating": round(float(homestay.avg_rating or 0), 1),
+            "review_count": homestay.review_count or 0,
+            "category": homestay.category.name if homestay.category else None,
+            "images": [img.image_path for img in homestay.images] if homestay.images else []
+        }
+        if extra:
+            item["available_rooms"] = row.available_rooms
+            item["total_price"] = float(row.stay_total)
+            item["avg_price_per_night"] = float(row.stay_total) / nights
+        results.append(item)
+    return total, results
+
+def find_nearby_destinations(
+    db: Session,
+    latitude: float,
+    longitude: float,
+    box: Box,
+    radius_km: Optional[float] = None,
+    limit: int = 20
+) -> Tuple[int, List[Dict]]:
+    """Điểm đến trong vùng, gần điểm (latitude, longitude) nhất trước"""
+    rows = db.query(Destination.id, Destination.latitude, Destination.longitude).filter(
+        Destination.is_active == True,
+        within_box(Destination, box)
+    ).all()
+    total, nearest = _nearest(rows, latitude, longitude, radius_km, limit)
+    destinations = {
+        destination.id: destination
+        for destination in db.query(Destination).filter(Destination.id.in_([row.id for _, _, row in nearest]))
+    } if nearest else {}
+
+    results = []
+    for distance, destination_id, _ in nearest:
+        destination = destinations[destination_id]
+        results.append({
+            "id": destination.id,
+            "name": destination.name,
+            "slug": destination.slug,
+            "province": destination.province,
+            "city": destination.city,
+            "latitude": destination.latitude,
+            "longitude": destination.longitude,
+            "distance_km": round(distance, 2),
+            "banner_image": destination.banner_image,
+            "avg_rating": destination.avg_rating,
+            "review_count": destination.review_count
+        })
+    return total, results
@@ -0,0 +1,183 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, object_session, selectinload
+from app.config import settings
+from app.models import Homestay, HomestayImage, Review
+from app.models.seo import SEOMetadata
+from app.services.cache import create_cache, invalidate_after_commit
+from app.services.occupancy import blocked_days, quick_availability
+from app.services.ratings import empty_histogram
+from app.services.seo import seo_metadata
+
+# Các phần của trang chi tiết; phần lịch phụ thuộc tham số ngày nên không cache ở đây
+# (lịch nhanh đã có cache theo tháng của riêng nó)
+CACHED_SECTIONS = ("homestay", "host", "images", "amenities", "reviews", "seo")
+SECTIONS = CACHED_SECTIONS + ("availability", "blocked_dates")
+REVIEW_LIMIT = 10
+
+# Từng phần của trang chi tiết theo (homestay, phần)
+page_cache = create_cache("homestay_page", max_entries=4096, ttl=settings.HOMESTAY_PAGE_CACHE_TTL)
+
+def section_key(homestay_id: int, section: str) -> str:
+    return f"{homestay_id}:{section}"
+
+def invalidate_sections(db: Session, homestay_id: int, sections: Iterable[str] = CACHED_SECTIONS):
+    """Xóa cache các phần của trang chi tiết sau khi commit"""
+    invalidate_after_commit(db, page_cache, [section_key(homestay_id, section) for section in sections])
+
+def _homestay_section(homestay: Homestay) -> Dict:
+    return {
+        "id": homestay.id,
+        "name": homestay.name,
+        "description": homestay.description,
+        "price_per_night": float(homestay.price_per_night),
+        "max_guests": homestay.max_guests,
+        "address": homestay.address,
+        "latitude": float(homestay.latitude) if homestay.latitude else None,
+        "longitude": float(homestay.longitude) if homestay.longitude else None,
+        "contact_info": homestay.contact_info,
+        "rules": homestay.rules,
+        "check_in_out_times": homestay.check_in_out_times,
+        "featured": homestay.featured,
+        "discount_percent": homestay.discount_percent,
+        "avg_rating": round(float(homestay.avg_rating or 0), 1),
+        "review_count": homestay.review_count or 0,
+        "rating_histogram": homestay.rating_histogram or empty_histogram(),
+        "category": {
+            "id": homestay.category.id if homestay.category else None,
+            "name": homestay.category.name if homestay.category else None
+        },
+        "created_at": homestay.created_at.isoformat() if homestay.created_at else None
+    }
+
+def _host_section(homestay: Homestay) -> Dict:
+    host = homestay.host
+    return {
+        "id": host.id if host else None,
+        "name": host.name if host else "Unknown",
+        "email": host.email if host else None,
+        "phone": host.phone if host else None
+    }
+
+def _images_section(homestay: Homestay) -> List[Dict]:
+    return [
+        {
+            "id": img.id,
+            "image_path": img.image_path,
+            "is_primary": img.is_primary
+        } for img in homestay.images
+    ]
+
+def _amenities_section(homestay: Homestay) -> List[Dict]:
+    return [
+        {
+            "id": amenity.id,
+            "name": amenity.name,
+            "icon": amenity.icon
+        } for amenity in homestay.amenities
+    ]
+
+def _reviews_section(db: Session, homestay_id: int) -> List[Dict]:
+    reviews = db.query(Review).options(joinedload(Review.user)).filter(
+        Review.homestay_id == homestay_id,
+        Review.is_approved == True
+    ).order_by(Review.created_at.desc()).limit(REVIEW_LIMIT).all()
+    return [
+        {
+            "id": review.id,
+            "rating": review.rating,
+            "comment": review.comment,
+            "user_name": review.user.name if review.user else "Anonymous",
+            "created_at": review.created_at.isoformat() if review.created_at else None
+        } for review in reviews
+    ]
+
+def _load_homestay(db: Session, homestay_id: int, sections: Iterable[str]) -> Optional[Homestay]:
+    """Homestay đang hoạt động, nạp sẵn trong cùng lượt các quan hệ mà các phần cần"""
+    sections = set(sections)
+    options = [joinedload(Homestay.category), joinedload(Homestay.host)]
+    if "images" in sections:
+        options.append(selectinload(Homestay.images))
+    if "amenities" in sections:
+        options.append(selectinload(Homestay.amenities))
+    if "seo" in sections:
+        options.append(joinedload(Homestay.location))
+    return db.query(Homestay).options(*options).filter(
+        Homestay.id == homestay_id,
+        Homestay.status == 'active',
+        Homestay.is_active == True
+    ).first()
+
+def homestay_page(
+    db: Session,
+    homestay_id: int,
+    sections: Iterable[str] = SECTIONS,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> Optional[Dict]:
+    """
+    Các phần được chọn của trang chi tiết homestay. Phần đã cache lấy từ cache, các phần còn lại nạp chung
+    một lượt (homestay kèm quan hệ, review, SEO). None nếu homestay không tồn tại hoặc không hoạt động.
+    """
+    sections = [section for section in SECTIONS if section in set(sections)]
+    result = {}
+    missing = []
+    for section in sections:
+        if section in CACHED_SECTIONS:
+            cached = page_cache.get(section_key(homestay_id, section))
+            if cached is not None:
+                result[section] = cached
+            else:
+                missing.append(section)
+
+    # Phần lịch luôn cần biết homestay còn hoạt động; phần đã cache thì đã kiểm tra lúc ghi cache
+    if missing or "homestay" not in result:
+        homestay = _load_homestay(db, homestay_id, missing)
+        if not homestay:
+            return None
+        builders = {
+            "homestay": lambda: _homestay_section(homestay),
+            "host": lambda: _host_section(homestay),
+            "images": lambda: _images_section(homestay),
+            "amenities": lambda: _amenities_section(homestay),
+            "reviews": lambda: _reviews_section(db, homestay_id),
+            "seo": lambda: seo_metadata(db, "homestay", homestay)
+        }
+        for section in missing:
+            result[section] = builders[section]()
+            page_cache.set(section_key(homestay_id, section), result[section])
+
+    if "availability" in sections:
+        result["availability"] = quick_availability(db, homestay_id, year, month)
+    if "blocked_dates" in sections:
+        result["blocked_dates"] = blocked_days(db, homestay_id, start, end)
+
+    return {section: result[section] for section in sections}
+
+def _homestay_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        invalidate_sections(session, target.id)
+
+def _section_changed(sections):
+    def listener(mapper, connection, target):
+        session = object_session(target)
+        if session is not None and target.homestay_id:
+            invalidate_sections(session, target.homestay_id, sections)
+    return listener
+
+def _seo_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.entity_type == "homestay":
+        invalidate_sections(session, target.entity_id, ("seo",))
+
+# Thay đổi qua ORM xóa cache sau commit; thay đổi bằng SQL thuần hết hạn theo HOMESTAY_PAGE_CACHE_TTL
+# (cập nhật rating của homestay sau khi thêm review cũng làm Homestay thay đổi)
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Homestay, _event, _homestay_changed)
+    event.listen(HomestayImage, _event, _section_changed(("images",)))
+    event.listen(Review, _event, _section_changed(("homestay", "reviews")))
+    event.listen(SEOMetadata, _event, _seo_changed)
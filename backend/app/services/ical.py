@@ -0,0 +1,276 @@
+import ipaddress
+import logging
+import socket
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from zoneinfo import ZoneInfo
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db import SessionLocal
+from app.models.additional import CalendarSync
+from app.models.room_categories import HomestayRoom
+from app.services.cache import create_cache
+from app.services.occupancy import load_occupancy
+from app.services.calendar_sync import (
+    SYNC_HORIZON_DAYS, CalendarSyncError, apply_calendar_changes, release_running
+)
+
+logger = logging.getLogger(__name__)
+
+PRODID = "-//Homestay Hub//Availability//VI"
+
+MAX_REDIRECTS = 5
+
+class UnsafeFeedURL(CalendarSyncError):
+    """URL feed không phải http(s) hoặc trỏ vào mạng nội bộ"""
+
+def validate_feed_url(url: str) -> str:
+    """
+    Chỉ cho phép http(s) tới địa chỉ công khai: mọi địa chỉ mà hostname phân giải ra đều không được là
+    private, loopback, link-local (gồm metadata 169.254.169.254), multicast hay reserved.
+    Trả về địa chỉ IP đã kiểm tra để kết nối thẳng tới đó.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsafeFeedURL("URL feed iCal không hợp lệ")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+    except (ValueError, socket.gaierror):
+        raise UnsafeFeedURL("Không phân giải được địa chỉ feed iCal")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise UnsafeFeedURL("URL feed iCal trỏ tới địa chỉ nội bộ")
+    return infos[0][4][0].split("%", 1)[0]
+
+class _PinnedAdapter(HTTPAdapter):
+    """Kết nối tới IP đã kiểm tra thay vì phân giải lại hostname; SNI và kiểm tra chứng chỉ vẫn theo hostname"""
+
+    def __init__(self, hostname: str):
+        self.hostname = hostname
+        super().__init__()
+
+    def init_poolmanager(self, *args, **kwargs):
+        # urllib3 chỉ dùng server_hostname cho kết nối https
+        kwargs["server_hostname"] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+def _get_pinned(url: str, address: str, headers: Dict) -> requests.Response:
+    """
+    GET tới đúng địa chỉ validate_feed_url đã kiểm tra, tránh DNS rebinding
+    (hostname phân giải lần hai ra địa chỉ nội bộ); header Host giữ hostname gốc.
+    """
+    parts = urlsplit(url)
+    userinfo, _, host = parts.netloc.rpartition("@")
+    pinned_host = f"[{address}]" if ":" in address else address
+    netloc = (f"{userinfo}@" if userinfo else "") + pinned_host + (f":{parts.port}" if parts.port else "")
+    with requests.Session() as session:
+        session.mount(f"{parts.scheme}://", _PinnedAdapter(parts.hostname))
+        return session.get(
+            urlunsplit(parts._replace(netloc=netloc)),
+            headers={**headers, "Host": host},
+            timeout=30,
+            allow_redirects=False
+        )
+
+def fetch_feed(url: str, headers: Dict) -> requests.Response:
+    """GET feed, tự theo chuyển hướng và kiểm tra lại từng đích"""
+    for _ in range(MAX_REDIRECTS + 1):
+        address = validate_feed_url(url)
+        response = _get_pinned(url, address, headers)
+        if not response.is_redirect:
+            return response
+        url = urljoin(url, response.headers["Location"])
+    raise UnsafeFeedURL("Feed iCal chuyển hướng quá nhiều lần")
+
+def db_time_to_utc(value: datetime) -> datetime:
+    """Giờ naive do MySQL ghi (NOW() theo DB_TIMEZONE) sang UTC"""
+    if settings.DB_TIMEZONE:
+        return value.replace(tzinfo=ZoneInfo(settings.DB_TIMEZONE)).astimezone(timezone.utc)
+    return value.astimezone(timezone.utc)
+
+# Feed đã dựng theo homestay/phòng: [etag, nội dung]
+feed_cache = create_cache("ical_feeds", max_entries=settings.ICAL_FEED_CACHE_SIZE, ttl=settings.ICAL_FEED_CACHE_TTL)
+
+class ICalFeed:
+    """Feed ICS đã dựng hoặc lấy từ cache, kèm validator cho conditional GET"""
+
+    def __init__(self, etag: str, last_modified: Optional[datetime], build):
+        self.etag = etag
+        self.last_modified = last_modified
+        self._build = build
+
+    @property
+    def body(self) -> str:
+        return self._build()
+
+def _unavailable_ranges(occupancy, room_ids: List[int], room_id: Optional[int], start: date, end: date) -> List[Tuple[date, date, str]]:
+    """Gộp các ngày liên tiếp cùng trạng thái (đã đặt / bị chặn) thành khoảng [bắt đầu, kết thúc)"""
+    ranges = []
+    day = start
+    while day < end:
+        if occupancy.booking_status(day):
+            state = "Booked" if occupancy.booking_status(day) != "blocked" else "Blocked"
+        elif room_id:
+            state = "Blocked" if occupancy.room_state(room_id, day) is False else None
+        elif room_ids and all(occupancy.room_state(rid, day) is False for rid in room_ids):
+            state = "Blocked"
+        else:
+            state = None
+
+        if state and ranges and ranges[-1][1] == day and ranges[-1][2] == state:
+            ranges[-1] = (ranges[-1][0], day + timedelta(days=1), state)
+        elif state:
+            ranges.append((day, day + timedelta(days=1), state))
+        day += timedelta(days=1)
+    return ranges
+
+def _render(homestay_id: int, room_id: Optional[int], ranges: List[Tuple[date, date, str]], stamp: datetime) -> str:
+    scope = f"room-{room_id}" if room_id else "all"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:Homestay {homestay_id}" + (f" - Room {room_id}" if room_id else ""),
+    ]
+    for start, end, state in ranges:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{homestay_id}-{scope}-{start.strftime('%Y%m%d')}@homestayhub",
+            f"DTSTAMP:{stamp.strftime('%Y%m%dT%H%M%SZ')}",
+            f"DTSTART;VALUE=DATE:{start.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{end.strftime('%Y%m%d')}",
+            f"SUMMARY:{'Not available' if state == 'Blocked' else 'Reserved'}",
+            "TRANSP:OPAQUE",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+def export_feed(db: Session, homestay_id: int, room_id: Optional[int] = None) -> ICalFeed:
+    """
+    Feed ICS các ngày không nhận khách từ hôm nay, dựng từ bitmap occupancy.
+    ETag là mã băm bitmap nên kiểm tra 304 chỉ tốn hai truy vấn nhỏ, không chạm bảng bookings.
+    """
+    today = date.today()
+    end = today + timedelta(days=SYNC_HORIZON_DAYS)
+    room_ids = [
+        rid for (rid,) in db.query(HomestayRoom.id).filter(
+            HomestayRoom.homestay_id == homestay_id,
+            HomestayRoom.is_available == True
+        ).all()
+    ]
+    occupancy = load_occupancy(db, homestay_id, today, end)
+    etag = f'"{occupancy.fingerprint([room_id] if room_id else room_ids)}-{today.strftime("%Y%m%d")}"'
+    key = f"{homestay_id}:{room_id or 'all'}"
+
+    # Bitmap dựng tạm (chưa có hoặc đang dựng lại) không có thời điểm sửa: không gửi Last-Modified, chỉ dùng ETag
+    last_modified = None
+    if occupancy.last_modified:
+        # Nội dung trượt theo ngày nên không cũ hơn đầu ngày hôm nay (giờ máy chủ app); so sánh và trả về theo UTC
+        start_of_day = datetime.combine(today, time.min).astimezone(timezone.utc)
+        last_modified = max(db_time_to_utc(occupancy.last_modified), start_of_day)
+
+    def build() -> str:
+        cached = feed_cache.get(key)
+        if cached and cached[0] == etag:
+            return cached[1]
+        stamp = last_modified or datetime.now(timezone.utc)
+        body = _render(homestay_id, room_id, _unavailable_ranges(occupancy, room_ids, room_id, today, end), stamp)
+        feed_cache.set(key, [etag, body])
+        return body
+
+    return ICalFeed(etag, last_modified, build)
+
+def _unfold(text: str) -> List[str]:
+    lines = []
+    for raw in text.replace("\r\n", "\n").split("\n"):
+        if raw[:1] in (" ", "\t") and lines:
+            lines[-1] += raw[1:]
+        elif raw:
+            lines.append(raw)
+    return lines
+
+def _parse_ics_date(value: str) -> date:
+    return datetime.strptime(value[:8], "%Y%m%d").date()
+
+def parse_ics_events(text: str) -> List[Dict]:
+    """Đọc các VEVENT của feed ICS thành dạng event giống Google Calendar (id, status, start, end)"""
+    events = []
+    current = None
+    for line in _unfold(text):
+        if line == "BEGIN:VEVENT":
+            current = {}
+            continue
+        if line == "END:VEVENT":
+            if current is not None and current.get("DTSTART"):
+                start = _parse_ics_date(current["DTSTART"])
+                end = _parse_ics_date(current["DTEND"]) if current.get("DTEND") else start + timedelta(days=1)
+                events.append({
+                    "id": current.get("UID") or f"{start.isoformat()}/{end.isoformat()}",
+                    "status": "cancelled" if current.get("STATUS", "").upper() == "CANCELLED" else "confirmed",
+                    "start": {"date": start.isoformat()},
+                    "end": {"date": end.isoformat()}
+                })
+            current = None
+            continue
+        if current is not None and ":" in line:
+            name, value = line.split(":", 1)
+            current[name.split(";", 1)[0].upper()] = value.strip()
+    return events
+
+def import_feed(db: Session, state: CalendarSync) -> Optional[Dict]:
+    """
+    Tải feed ICS (conditional GET theo ETag lần trước) và áp chênh lệch ngày chặn (commit).
+    Feed là ảnh chụp đầy đủ nên mỗi lần tải là một lần đồng bộ toàn bộ; None nếu feed không đổi.
+    """
+    headers = {"If-None-Match": state.sync_token} if state.sync_token else {}
+    response = fetch_feed(state.calendar_id, headers)
+    now = datetime.now()
+
+    if response.status_code == 304:
+        state.status = "success"
+        state.last_error = None
+        state.last_synced_at = now
+        db.commit()
+        return None
+    response.raise_for_status()
+
+    summary = apply_calendar_changes(db, state, parse_ics_events(response.text), full_sync=True)
+    state.sync_token = response.headers.get("ETag")
+    state.status = "success"
+    state.last_error = None
+    state.last_synced_at = now
+    db.commit()
+    return summary
+
+def run_ical_import(sync_id: int):
+    """Job nền nhập feed ICS, chạy trong threadpool với session riêng"""
+    db = SessionLocal()
+    error = None
+    try:
+        state = db.query(CalendarSync).filter(CalendarSync.id == sync_id).first()
+        if not state:
+            return
+        state.status = "running"
+        state.started_at = datetime.now()
+        db.commit()
+
+        summary = import_feed(db, state)
+        logger.info(f"iCal import {sync_id}: {summary if summary is not None else 'not modified'}")
+    except Exception as e:
+        error = str(e)
+        logger.error(f"iCal import {sync_id} failed: {e}")
+    finally:
+        try:
+            release_running(db, sync_id, error)
+        finally:
+            db.close()
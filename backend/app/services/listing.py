@@ -0,0 +1,18 @@
+from typing import Dict, Iterable
+from sqlalchemy.orm import Session, selectinload
+from app.models import Homestay, User
+
+def listing_options():
+    """Nạp sẵn category, ảnh và tiện ích cho cả trang bằng truy vấn IN thay vì lazy load từng dòng"""
+    return (
+        selectinload(Homestay.category),
+        selectinload(Homestay.images),
+        selectinload(Homestay.amenities),
+    )
+
+def host_names(db: Session, host_ids: Iterable[int]) -> Dict[int, str]:
+    """Tên chủ nhà theo id, một truy vấn IN cho cả trang"""
+    host_ids = {host_id for host_id in host_ids if host_id is not None}
+    if not host_ids:
+        return {}
+    return dict(db.query(User.id, User.name).filter(User.id.in_(host_ids)).all())
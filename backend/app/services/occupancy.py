@@ -0,0 +1,517 @@
+import hashlib
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+from app.db import SessionLocal
+from app.models.room_categories import HomestayRoom, RoomAvailability, RoomOccupancy
+from app.models.bookings import Booking
+from app.models.homestays import Homestay
+from app.services.availability_engine import (
+    BLOCKING_BOOKING_STATUSES, invalidate_quick_months, load_overrides, load_rooms, month_bounds,
+    quick_availability_cache, quick_cache_key, room_base_price
+)
+
+logger = logging.getLogger(__name__)
+
+# Cửa sổ lưu trữ: bắt đầu từ đầu tháng hiện tại, kéo dài 730 ngày
+WINDOW_DAYS = 730
+
+# Loại dòng theo phòng (từ RoomAvailability) và theo homestay (từ Booking)
+ROOM_KINDS = ("blocked", "open")
+BOOKING_KINDS = ("confirmed", "pending", "held")
+BOOKING_STATUS_KIND = {"confirmed": "confirmed", "pending": "pending", "blocked": "held"}
+
+def current_window_start(today: Optional[date] = None) -> date:
+    today = today or date.today()
+    return today.replace(day=1)
+
+def _empty_bits(days: int) -> bytearray:
+    return bytearray((days + 7) // 8)
+
+def _set_bit(bits: bytearray, index: int, value: bool = True):
+    if value:
+        bits[index >> 3] |= 1 << (index & 7)
+    else:
+        bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+def _get_bit(bits: bytes, index: int) -> bool:
+    return bool(bits[index >> 3] & (1 << (index & 7)))
+
+class OccupancyMap:
+    """Bitmap chiếm chỗ theo ngày cho các phòng và booking của một homestay"""
+
+    def __init__(
+        self,
+        window_start: date,
+        days: int,
+        bits: Dict[Tuple[Optional[int], str], bytes],
+        last_modified: Optional[datetime] = None
+    ):
+        self.window_start = window_start
+        self.days = days
+        self._bits = bits
+        self.last_modified = last_modified
+
+    def fingerprint(self, room_ids: Optional[Iterable[int]] = None) -> str:
+        """Mã băm nội dung bitmap (dòng booking và các phòng được chọn), dùng làm ETag"""
+        keys = [key for key in self._bits if key[0] is None or room_ids is None or key[0] in room_ids]
+        digest = hashlib.sha1(self.window_start.isoformat().encode())
+        for room_id, kind in sorted(keys, key=lambda key: (key[0] or 0, key[1])):
+            digest.update(f"{room_id}:{kind}:".encode())
+            digest.update(bytes(self._bits[(room_id, kind)]))
+        return digest.hexdigest()
+
+    def _has(self, room_id: Optional[int], kind: str, day: date) -> bool:
+        bits = self._bits.get((room_id, kind))
+        index = (day - self.window_start).days
+        if bits is None or index < 0 or index >= self.days:
+            return False
+        return _get_bit(bits, index)
+
+    def room_state(self, room_id: int, day: date) -> Optional[bool]:
+        """True: có bản ghi trống, False: bị chặn, None: chưa thiết lập"""
+        if self._has(room_id, "blocked", day):
+            return False
+        if self._has(room_id, "open", day):
+            return True
+        return None
+
+    def has_room_data(self, day: date) -> bool:
+        """Có phòng nào được thiết lập lịch cho ngày này không"""
+        return any(
+            self._has(room_id, kind, day)
+            for room_id, kind in self._bits
+            if room_id is not None
+        )
+
+    def booking_status(self, day: date) -> Optional[str]:
+        """Trạng thái booking chiếm ngày; booking chặn bởi chủ nhà được ưu tiên"""
+        if self._has(None, "held", day):
+            return "blocked"
+        if self._has(None, "confirmed", day):
+            return "confirmed"
+        if self._has(None, "pending", day):
+            return "pending"
+        return None
+
+    def first_booked(self, start: date, end: date) -> Optional[Tuple[date, str]]:
+        """Đêm sớm nhất trong [start, end) có booking và trạng thái của nó"""
+        day = start
+        while day < end:
+            status = self.booking_status(day)
+            if status:
+                return day, status
+            day += timedelta(days=1)
+        return None
+
+    def first_blocked(self, room_id: int, start: date, end: date) -> Optional[date]:
+        """Ngày bị chặn sớm nhất của phòng trong [start, end)"""
+        day = start
+        while day < end:
+            if self._has(room_id, "blocked", day):
+                return day
+            day += timedelta(days=1)
+        return None
+
+def _build_bits(
+    window_start: date,
+    days: int,
+    room_ids: List[int],
+    overrides: List[RoomAvailability],
+    bookings: List[Booking]
+) -> Dict[Tuple[Optional[int], str], bytearray]:
+    bits = {}
+    for room_id in room_ids:
+        for kind in ROOM_KINDS:
+            bits[(room_id, kind)] = _empty_bits(days)
+    for kind in BOOKING_KINDS:
+        bits[(None, kind)] = _empty_bits(days)
+
+    for record in overrides:
+        if (record.room_id, "blocked") not in bits:
+            continue
+        kind = "blocked" if not record.is_available else "open"
+        first = max((record.start_date - window_start).days, 0)
+        last = min((record.end_date - window_start).days, days)
+        for index in range(first, last):
+            _set_bit(bits[(record.room_id, kind)], index)
+
+    for booking in bookings:
+        kind = BOOKING_STATUS_KIND.get(booking.status)
+        if not kind:
+            continue
+        first = max((booking.check_in - window_start).days, 0)
+        last = min((booking.check_out - window_start).days, days)
+        for index in range(first, last):
+            _set_bit(bits[(None, kind)], index)
+    return bits
+
+def _load_raw(db: Session, homestay_id: int, start: date, end: date):
+    room_ids = [
+        room_id for (room_id,) in db.query(HomestayRoom.id).filter(HomestayRoom.homestay_id == homestay_id).all()
+    ]
+    overrides = db.query(RoomAvailability).filter(
+        RoomAvailability.room_id.in_(room_ids),
+        RoomAvailability.start_date < end,
+        RoomAvailability.end_date > start
+    ).all() if room_ids else []
+    bookings = db.query(Booking).filter(
+        Booking.homestay_id == homestay_id,
+        Booking.status.in_(BLOCKING_BOOKING_STATUSES),
+        Booking.check_in < end,
+        Booking.check_out > start
+    ).all()
+    return room_ids, overrides, bookings
+
+def _changed_days(window_start: date, old: Optional[bytes], new: bytes) -> List[date]:
+    """Các ngày có bit khác nhau giữa hai bitmap"""
+    old = old or bytes(len(new))
+    days = []
+    for byte_index, (a, b) in enumerate(zip(old, new)):
+        diff = a ^ b
+        while diff:
+            bit = diff & -diff
+            days.append(window_start + timedelta(days=byte_index * 8 + bit.bit_length() - 1))
+            diff ^= bit
+    return days
+
+def _window_days() -> List[date]:
+    window_start = current_window_start()
+    return [window_start + timedelta(days=offset) for offset in range(WINDOW_DAYS)]
+
+def _upsert_rows(db: Session, rows: List[Dict]):
+    """Ghi các dòng bitmap theo khóa (homestay_id, room_key, kind): chèn mới hoặc ghi đè bits"""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "mysql":
+        statement = mysql.insert(RoomOccupancy.__table__)
+        statement = statement.on_duplicate_key_update(
+            window_start=statement.inserted.window_start,
+            bits=statement.inserted.bits
+        )
+    else:
+        statement = sqlite.insert(RoomOccupancy.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=["homestay_id", "room_key", "kind"],
+            set_={"window_start": statement.excluded.window_start, "bits": statement.excluded.bits}
+        )
+    db.execute(statement, rows)
+
+def _lock_homestay(db: Session, homestay_id: int):
+    """Khóa dòng homestay tới hết transaction để các lần dựng lại bitmap của cùng homestay chạy tuần tự"""
+    db.query(Homestay.id).filter(Homestay.id == homestay_id).with_for_update().first()
+
+def rebuild_homestay(db: Session, homestay_id: int) -> OccupancyMap:
+    """Tính lại toàn bộ bitmap của homestay từ RoomAvailability và Booking (không commit)"""
+    db.flush()
+    _lock_homestay(db, homestay_id)
+    window_start = current_window_start()
+    window_end = window_start + timedelta(days=WINDOW_DAYS)
+    room_ids, overrides, bookings = _load_raw(db, homestay_id, window_start, window_end)
+    bits = _build_bits(window_start, WINDOW_DAYS, room_ids, overrides, bookings)
+
+    _upsert_rows(db, [
+        {
+            "homestay_id": homestay_id,
+            "room_id": room_id,
+            "kind": kind,
+            "window_start": window_start,
+            "bits": bytes(value)
+        } for (room_id, kind), value in bits.items()
+    ])
+    # Dòng của các phòng đã bị xóa khỏi homestay
+    stale = db.query(RoomOccupancy).filter(
+        RoomOccupancy.homestay_id == homestay_id,
+        RoomOccupancy.room_id.isnot(None)
+    )
+    if room_ids:
+        stale = stale.filter(RoomOccupancy.room_id.notin_(room_ids))
+    stale.delete(synchronize_session=False)
+    return OccupancyMap(window_start, WINDOW_DAYS, bits)
+
+_rebuilding = set()
+_rebuilding_lock = threading.Lock()
+
+def rebuild_if_stale(homestay_id: int):
+    """Dựng lại và commit bitmap của homestay bằng session riêng nếu vẫn chưa có hoặc đã lệch cửa sổ"""
+    db = SessionLocal()
+    try:
+        if _current_rows(db, homestay_id, for_update=True) is None:
+            rebuild_homestay(db, homestay_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Occupancy rebuild for homestay {homestay_id} failed: {e}")
+    finally:
+        db.close()
+
+def rebuild_in_background(homestay_id: int):
+    """Dựng lại bitmap trong thread riêng; bỏ qua nếu homestay đang được dựng lại trong tiến trình này"""
+    with _rebuilding_lock:
+        if homestay_id in _rebuilding:
+            return
+        _rebuilding.add(homestay_id)
+
+    def run():
+        try:
+            rebuild_if_stale(homestay_id)
+        finally:
+            with _rebuilding_lock:
+                _rebuilding.discard(homestay_id)
+
+    threading.Thread(target=run, name=f"occupancy-{homestay_id}", daemon=True).start()
+
+def _current_rows(db: Session, homestay_id: int, for_update: bool = False) -> Optional[List[RoomOccupancy]]:
+    """
+    Các dòng bitmap còn hiệu lực của homestay, None nếu chưa có hoặc đã lệch cửa sổ.
+    for_update: khóa homestay và đọc bản mới nhất của các dòng trước khi sửa bits.
+    """
+    query = db.query(RoomOccupancy).filter(RoomOccupancy.homestay_id == homestay_id)
+    if for_update:
+        _lock_homestay(db, homestay_id)
+        query = query.with_for_update().populate_existing()
+    rows = query.all()
+    window_start = current_window_start()
+    if not rows or any(row.window_start != window_start for row in rows):
+        return None
+    return rows
+
+def load_occupancy(db: Session, homestay_id: int, start: date, end: date) -> OccupancyMap:
+    """
+    Bitmap chiếm chỗ của homestay cho [start, end).
+    Trong cửa sổ lưu trữ: một truy vấn theo chỉ mục homestay_id.
+    Ngoài cửa sổ, hoặc bitmap chưa có/đã lệch cửa sổ: dựng tạm từ dữ liệu gốc, không ghi trong request đọc;
+    trường hợp sau bitmap được dựng lại ở nền.
+    """
+    end = max(end, start)
+    window_start = current_window_start()
+    window_end = window_start + timedelta(days=WINDOW_DAYS)
+    if not (window_start <= start and end <= window_end):
+        room_ids, overrides, bookings = _load_raw(db, homestay_id, start, end)
+        days = (end - start).days
+        return OccupancyMap(start, days, _build_bits(start, days, room_ids, overrides, bookings))
+
+    rows = _current_rows(db, homestay_id)
+    if rows is None:
+        rebuild_in_background(homestay_id)
+        room_ids, overrides, bookings = _load_raw(db, homestay_id, start, end)
+        days = (end - start).days
+        return OccupancyMap(start, days, _build_bits(start, days, room_ids, overrides, bookings))
+
+    bits = {}
+    for row in sorted(rows, key=lambda r: r.id):
+        bits[(row.room_id, row.kind)] = row.bits
+    last_modified = max((row.updated_at for row in rows if row.updated_at), default=None)
+    return OccupancyMap(window_start, WINDOW_DAYS, bits, last_modified)
+
+def refresh_bookings(db: Session, homestay_id: int):
+    """Cập nhật dòng booking của homestay sau khi tạo, xác nhận hoặc hủy booking (không commit)"""
+    db.flush()
+    rows = _current_rows(db, homestay_id, for_update=True)
+    if rows is None:
+        rebuild_homestay(db, homestay_id)
+        invalidate_quick_months(db, homestay_id, _window_days())
+        return
+
+    window_start = current_window_start()
+    window_end = window_start + timedelta(days=WINDOW_DAYS)
+    bookings = db.query(Booking).filter(
+        Booking.homestay_id == homestay_id,
+        Booking.status.in_(BLOCKING_BOOKING_STATUSES),
+        Booking.check_in < window_end,
+        Booking.check_out > window_start
+    ).all()
+    bits = _build_bits(window_start, WINDOW_DAYS, [], [], bookings)
+
+    by_kind = {row.kind: row for row in rows if row.room_id is None}
+    changed = set()
+    missing = []
+    for kind in BOOKING_KINDS:
+        value = bytes(bits[(None, kind)])
+        changed.update(_changed_days(window_start, by_kind[kind].bits if kind in by_kind else None, value))
+        if kind in by_kind:
+            by_kind[kind].bits = value
+        else:
+            missing.append({
+                "homestay_id": homestay_id,
+                "room_id": None,
+                "kind": kind,
+                "window_start": window_start,
+                "bits": value
+            })
+    db.flush()
+    _upsert_rows(db, missing)
+    invalidate_quick_months(db, homestay_id, changed)
+
+def mark_room_days(db: Session, homestay_id: int, cells: Iterable[Tuple[int, date]], is_available: bool):
+    """Cập nhật bitmap phòng sau khi chặn/bỏ chặn các ô (room_id, ngày) (không commit)"""
+    cells = list(cells)
+    invalidate_quick_months(db, homestay_id, [day for _, day in cells])
+
+    db.flush()
+    rows = _current_rows(db, homestay_id, for_update=True)
+    if rows is None:
+        rebuild_homestay(db, homestay_id)
+        return
+
+    window_start = current_window_start()
+    by_key = {(row.room_id, row.kind): row for row in rows if row.room_id is not None}
+    changed = {}
+
+    for room_id, day in cells:
+        index = (day - window_start).days
+        if index < 0 or index >= WINDOW_DAYS:
+            continue
+        for kind in ROOM_KINDS:
+            if (room_id, kind) not in changed:
+                row = by_key.get((room_id, kind))
+                changed[(room_id, kind)] = bytearray(row.bits) if row else _empty_bits(WINDOW_DAYS)
+        _set_bit(changed[(room_id, "blocked")], index, not is_available)
+        _set_bit(changed[(room_id, "open")], index, is_available)
+
+    missing = []
+    for (room_id, kind), value in changed.items():
+        row = by_key.get((room_id, kind))
+        if row:
+            row.bits = bytes(value)
+        else:
+            missing.append({
+                "homestay_id": homestay_id,
+                "room_id": room_id,
+                "kind": kind,
+                "window_start": window_start,
+                "bits": bytes(value)
+            })
+    db.flush()
+    _upsert_rows(db, missing)
+
+def quick_availability(db: Session, homestay_id: int, year: int, month: int) -> Dict:
+    """Lịch nhanh một tháng của homestay (số phòng trống/đặt/chờ và giá thấp nhất theo ngày), cache theo tháng"""
+    cache_key = quick_cache_key(homestay_id, year, month)
+    cached = quick_availability_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    start_date, end_date = month_bounds(year, month)
+    window_end = end_date + timedelta(days=1)
+    
+    # Lấy tất cả phòng
+    rooms = load_rooms(db, homestay_id)
+    
+    # Tình trạng phòng và booking (bao gồm cả blocked) lấy từ bitmap occupancy
+    occupancy = load_occupancy(db, homestay_id, start_date, window_end)
+    prices = load_overrides(db, [room.id for room in rooms], start_date, window_end, priced_only=True)
+    
+    availability_data = {}
+    current_date = start_date
+    
+    while current_date <= end_date:
+        available_count = 0
+        booked_count = 0
+        pending_count = 0
+        min_price = None
+        booking_status = occupancy.booking_status(current_date)
+        
+        for room in rooms:
+            # Chỉ coi là available nếu có record availability và is_available = True
+            # Hoặc nếu không có record availability nào thì coi như chưa được thiết lập
+            is_available = occupancy.room_state(room.id, current_date) is True
+            
+            if booking_status:
+                if booking_status == "confirmed":
+                    booked_count += 1
+                elif booking_status == "pending":
+                    pending_count += 1
+                # Nếu status là "blocked" thì không tăng counter nào, sẽ xử lý ở logic sau
+            elif is_available:
+                available_count += 1
+                override = prices.get(room.id, current_date)
+                room_price = override.price_override if override else room_base_price(room)
+                if min_price is None or room_price < min_price:
+                    min_price = float(room_price)
+        
+        # Kiểm tra xem có bất kỳ availability record nào cho ngày này không
+        has_availability_data = occupancy.has_room_data(current_date)
+        
+        # Kiểm tra có booking blocked không
+        blocked_booking = booking_status == "blocked"
+        
+        # Xác định màu sắc và trạng thái
+        if available_count > 0:
+            color = "#4caf50"  # Xanh lá - trống
+            status = "available"
+        elif blocked_booking or (has_availability_data and available_count == 0 and booked_count == 0 and pending_count == 0):
+            color = "#9e9e9e"  # Xám - bị chặn
+            status = "blocked"
+        elif pending_count > 0:
+            color = "#ff9800"  # Vàng - chờ xác nhận  
+            status = "pending"
+        elif booked_count > 0:
+            color = "#f44336"  # Đỏ - đã đặt
+            status = "booked"
+        else:
+            # Chưa có dữ liệu availability được thiết lập
+            color = "#e0e0e0"  # Xám nhạt - chưa thiết lập
+            status = "not_set"
+        
+        availability_data[current_date.isoformat()] = {
+            "status": status,
+            "color": color,
+            "available_rooms": available_count,
+            "booked_rooms": booked_count,
+            "pending_rooms": pending_count,
+            "min_price": min_price,
+            "tooltip": f"Trống: {available_count}, Đặt: {booked_count}, Chờ: {pending_count}" if has_availability_data else "Chưa thiết lập lịch trống"
+        }
+        
+        current_date += timedelta(days=1)
+    
+    result = {
+        "month": month,
+        "year": year,
+        "availability": availability_data,
+        "total_rooms": len(rooms)
+    }
+    quick_availability_cache.set(cache_key, result)
+    return result
+
+def blocked_days(db: Session, homestay_id: int, start: date, end: date) -> List[str]:
+    """Các ngày trong [start, end] mà homestay không còn phòng nào nhận khách"""
+    blocked_dates = set()
+    
+    # Lấy tất cả phòng của homestay
+    room_ids = [
+        room_id for (room_id,) in db.query(HomestayRoom.id).filter(
+            HomestayRoom.homestay_id == homestay_id,
+            HomestayRoom.is_available == True
+        ).all()
+    ]
+    
+    occupancy = load_occupancy(db, homestay_id, start, end + timedelta(days=1))
+    
+    if not room_ids:
+        # Homestay không có phòng - kiểm tra booking trực tiếp
+        current = start
+        while current < end:
+            if occupancy.booking_status(current):
+                blocked_dates.add(current.isoformat())
+            current += timedelta(days=1)
+    else:
+        # Ngày bị chặn khi mọi phòng đều bị chặn, hoặc chưa thiết lập nhưng đã có booking
+        current_date = start
+        while current_date <= end:
+            booked = occupancy.booking_status(current_date) is not None
+            all_rooms_blocked = all(
+                state is False or (state is None and booked)
+                for state in (occupancy.room_state(room_id, current_date) for room_id in room_ids)
+            )
+            
+            if all_rooms_blocked:
+                blocked_dates.add(current_date.isoformat())
+            
+            current_date += timedelta(days=1)
+    
+    return sorted(blocked_dates)
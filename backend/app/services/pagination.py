@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Float, and_, desc, false, literal, or_, true
+from sqlalchemy.orm import Query
+from app.config import settings
+from app.services.cache import create_cache, query_key
+
+# Tổng số dòng của danh sách được cache ngắn hạn, theo câu SQL và tham số của truy vấn
+count_cache = create_cache("list_counts", max_entries=4096, ttl=settings.LIST_COUNT_CACHE_TTL)
+
+# Khóa sắp xếp: (biểu thức, giảm dần); khóa cuối phải duy nhất (thường là id)
+SortKey = Tuple[Any, bool]
+
+def _fingerprint(keys: Sequence[SortKey]) -> str:
+    """Dấu của thứ tự sắp xếp, để cursor của thứ tự này không bị dùng cho thứ tự khác"""
+    spec = ",".join(f"{expr}{' desc' if descending else ''}" for expr, descending in keys)
+    return hashlib.sha1(spec.encode()).hexdigest()[:8]
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    return value
+
+def _load(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "n" in value:
+            return Decimal(value["n"])
+    return value
+
+def encode_cursor(keys: Sequence[SortKey], values: Sequence) -> str:
+    payload = json.dumps({"k": _fingerprint(keys), "v": [_dump(value) for value in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(keys: Sequence[SortKey], cursor: str) -> List:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = [_load(value) for value in payload["v"]]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+    if payload.get("k") != _fingerprint(keys) or len(values) != len(keys):
+        raise HTTPException(status_code=400, detail="Cursor không khớp với thứ tự sắp xếp hiện tại")
+    return values
+
+def _compare(expr, descending: bool, value):
+    """(điều kiện đứng sau giá trị, điều kiện bằng giá trị) theo thứ tự của MySQL: NULL nhỏ nhất"""
+    if value is None:
+        return (false() if descending else expr.isnot(None)), expr.is_(None)
+    if isinstance(expr.type, Float):
+        # FLOAT của MySQL là số thực đơn, so sánh bằng trực tiếp với số thực kép sẽ lệch
+        epsilon = max(abs(value), 1) * 1e-6
+        low, high = literal(value - epsilon, expr.type), literal(value + epsilon, expr.type)
+        if descending:
+            return or_(expr < low, expr.is_(None)), expr.between(low, high)
+        return expr > high, expr.between(low, high)
+    # Tham số có kiểu để so sánh được cả cột Boolean
+    value = literal(value, expr.type)
+    if descending:
+        return or_(expr < value, expr.is_(None)), expr == value
+    return expr > value, expr == value
+
+def _after(keys: Sequence[SortKey], values: Sequence):
+    """Các dòng đứng sau cursor: (k1 sau v1) OR (k1 = v1 AND k2 sau v2) OR ..."""
+    clauses, equal = [], []
+    for (expr, descending), value in zip(keys, values):
+        after, same = _compare(expr, descending, value)
+        clauses.append(and_(*equal, after) if equal else after)
+        equal.append(same)
+    return or_(*clauses) if clauses else true()
+
+def paginate(query: Query, keys: Sequence[SortKey], limit: int, page: int = 1, cursor: Optional[str] = None):
+    """
+    Một trang của truy vấn theo thứ tự keys. Có cursor thì lọc theo khóa (keyset) thay cho OFFSET,
+    không có thì dùng page như cũ. Trả về (các dòng, cursor của trang sau hoặc None).
+    """
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(keys, cursor)))
+    # Lấy kèm giá trị các khóa để dựng cursor, thêm một dòng để biết còn trang sau
+    query = query.add_columns(*[expr.label(f"cursor_{i}") for i, (expr, _) in enumerate(keys)])
+    query = query.order_by(*[desc(expr) if descending else expr for expr, descending in keys])
+    if not cursor:
+        query = query.offset((page - 1) * limit)
+    rows = query.limit(limit + 1).all()
+
+    items = [row[0] for row in rows[:limit]]
+    next_cursor = encode_cursor(keys, list(rows[limit - 1][1:])) if len(rows) > limit else None
+    return items, next_cursor
+
+def count_rows(query: Query) -> int:
+    """COUNT của truy vấn danh sách, cache theo câu SQL và tham số trong LIST_COUNT_CACHE_TTL giây"""
+    key = query_key(query)
+    total = count_cache.get(key)
+    if total is None:
+        total = query.count()
+        count_cache.set(key, total)
+    return total
+
+def page_info(query: Query, limit: int, page: int, cursor: Optional[str], next_cursor: Optional[str], include_total: bool = False) -> Dict:
+    """Các trường phân trang của response: giữ page/total/total_pages khi phân trang theo page, cursor thì total là tùy chọn"""
+    info = {"limit": limit, "next_cursor": next_cursor, "has_more": next_cursor is not None}
+    if cursor:
+        if include_total:
+            info["total"] = count_rows(query)
+        return info
+    total = count_rows(query)
+    return {"total": total, "page": page, "total_pages": (total + limit - 1) // limit, **info}
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from app.models.room_categories import HomestayRoom
+from app.services.availability_engine import OverrideIndex, load_overrides, room_base_price
+
+class StayQuote:
+    """Giá từng đêm của một phòng cho kỳ lưu trú"""
+
+    def __init__(self, room_id: int, check_in: date, nightly: List[float]):
+        self.room_id = room_id
+        self.check_in = check_in
+        self.nightly = nightly
+        self.total = sum(nightly)
+        self.average = self.total / len(nightly) if nightly else 0.0
+
+    def breakdown(self) -> List[Dict]:
+        return [
+            {"date": (self.check_in + timedelta(days=offset)).isoformat(), "price": price}
+            for offset, price in enumerate(self.nightly)
+        ]
+
+def nightly_prices(room: HomestayRoom, overrides: OverrideIndex, check_in: date, check_out: date) -> List[float]:
+    """
+    Vector giá các đêm trong [check_in, check_out) của một phòng.
+    Khởi tạo bằng giá mặc định rồi ghi đè theo từng khoảng giá đặc biệt bằng gán lát cắt,
+    nên chi phí tỉ lệ với số khoảng chứ không phải số đêm.
+    """
+    nights = (check_out - check_in).days
+    prices = [float(room_base_price(room))] * nights
+    for record in overrides.for_room(room.id):
+        if not record.price_override:
+            continue
+        start = max((record.start_date - check_in).days, 0)
+        end = min((record.end_date - check_in).days, nights)
+        if start < end:
+            prices[start:end] = [float(record.price_override)] * (end - start)
+    return prices
+
+def quote_rooms(rooms: List[HomestayRoom], overrides: OverrideIndex, check_in: date, check_out: date) -> Dict[int, StayQuote]:
+    """Báo giá cho nhiều phòng × nhiều đêm từ các khoảng giá đã tải"""
+    return {
+        room.id: StayQuote(room.id, check_in, nightly_prices(room, overrides, check_in, check_out))
+        for room in rooms
+    }
+
+def price_stays(db: Session, rooms: List[HomestayRoom], check_in: date, check_out: date) -> Dict[int, StayQuote]:
+    """Báo giá cho các phòng, tải các khoảng giá đặc biệt trong một truy vấn"""
+    overrides = load_overrides(db, [room.id for room in rooms], check_in, check_out, priced_only=True)
+    return quote_rooms(rooms, overrides, check_in, check_out)
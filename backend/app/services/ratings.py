@@ -0,0 +1,94 @@
+import logging
+from typing import Dict, Iterable, Optional
+from sqlalchemy import bindparam, func
+from sqlalchemy.orm import Session
+from app.db import SessionLocal
+from app.models import Homestay, Review
+
+logger = logging.getLogger(__name__)
+
+STARS = ("1", "2", "3", "4", "5")
+
+def empty_histogram() -> Dict[str, int]:
+    return {star: 0 for star in STARS}
+
+def summarize(histogram: Dict[str, int]):
+    """(điểm trung bình, số review) tính từ histogram số sao"""
+    count = sum(histogram.values())
+    total = sum(int(star) * n for star, n in histogram.items())
+    return (total / count if count else 0.0), count
+
+def _apply(db: Session, homestay_id: int, rating: int, delta: int):
+    """Cộng/trừ một review đã duyệt vào tóm tắt rating, khóa dòng homestay để không mất cập nhật đồng thời"""
+    homestay = db.query(Homestay).filter(Homestay.id == homestay_id).populate_existing().with_for_update().first()
+    if not homestay:
+        return
+    histogram = dict(homestay.rating_histogram or empty_histogram())
+    star = str(rating)
+    histogram[star] = max(histogram.get(star, 0) + delta, 0)
+    homestay.rating_histogram = histogram
+    homestay.avg_rating, homestay.review_count = summarize(histogram)
+
+def review_added(db: Session, review: Review):
+    """Gọi sau khi thêm review (không commit)"""
+    if review.is_approved:
+        _apply(db, review.homestay_id, review.rating, 1)
+
+def review_removed(db: Session, review: Review):
+    """Gọi khi xóa review (không commit)"""
+    if review.is_approved:
+        _apply(db, review.homestay_id, review.rating, -1)
+
+def review_approval_changed(db: Session, review: Review, was_approved: bool):
+    """Gọi sau khi đổi trạng thái duyệt của review (không commit)"""
+    if bool(was_approved) != bool(review.is_approved):
+        _apply(db, review.homestay_id, review.rating, 1 if review.is_approved else -1)
+
+def reconcile_ratings(db: Session, homestay_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Dựng lại tóm tắt rating từ bảng reviews bằng một truy vấn GROUP BY,
+    chỉ ghi các homestay bị lệch trong một lần UPDATE nhiều dòng (commit). Trả về số homestay đã sửa.
+    """
+    homestay_query = db.query(Homestay.id, Homestay.avg_rating, Homestay.review_count, Homestay.rating_histogram)
+    review_query = db.query(Review.homestay_id, Review.rating, func.count(Review.id)).filter(Review.is_approved == True)
+    if homestay_ids is not None:
+        homestay_ids = list(homestay_ids)
+        homestay_query = homestay_query.filter(Homestay.id.in_(homestay_ids))
+        review_query = review_query.filter(Review.homestay_id.in_(homestay_ids))
+
+    current = {row[0]: row[1:] for row in homestay_query.all()}
+    histograms = {homestay_id: empty_histogram() for homestay_id in current}
+    for homestay_id, rating, count in review_query.group_by(Review.homestay_id, Review.rating).all():
+        if homestay_id in histograms and str(rating) in histograms[homestay_id]:
+            histograms[homestay_id][str(rating)] = count
+
+    updates = []
+    for homestay_id, histogram in histograms.items():
+        avg_rating, review_count = summarize(histogram)
+        old_avg, old_count, old_histogram = current[homestay_id]
+        if old_histogram == histogram and old_count == review_count and abs((old_avg or 0) - avg_rating) < 1e-9:
+            continue
+        updates.append({
+            "b_id": homestay_id,
+            "avg_rating": avg_rating,
+            "review_count": review_count,
+            "rating_histogram": histogram
+        })
+
+    if updates:
+        table = Homestay.__table__
+        db.execute(table.update().where(table.c.id == bindparam("b_id")), updates)
+    db.commit()
+    return len(updates)
+
+def run_rating_reconciliation():
+    """Job nền đối soát tóm tắt rating toàn bộ homestay, chạy trong threadpool với session riêng"""
+    db = SessionLocal()
+    try:
+        fixed = reconcile_ratings(db)
+        logger.info(f"Rating reconciliation: {fixed} homestays updated")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Rating reconciliation failed: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,43 @@
+from typing import Dict, Iterable, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from app.models.room_categories import RoomCategory, HomestayRoom
+
+def category_options():
+    """Nạp sẵn tags của cả danh sách loại phòng bằng một truy vấn IN thay vì lazy load từng dòng"""
+    return (selectinload(RoomCategory.tags),)
+
+def available_room_counts(db: Session, category_ids: Iterable[int], homestay_id: Optional[int]) -> Dict[int, int]:
+    """Số phòng đang mở bán của homestay theo từng loại phòng, một truy vấn GROUP BY cho cả danh sách"""
+    category_ids = set(category_ids)
+    if not homestay_id or not category_ids:
+        return {}
+    return dict(db.query(HomestayRoom.room_category_id, func.count(HomestayRoom.id)).filter(
+        HomestayRoom.room_category_id.in_(category_ids),
+        HomestayRoom.homestay_id == homestay_id,
+        HomestayRoom.is_available == True
+    ).group_by(HomestayRoom.room_category_id).all())
+
+def tag_payload(tag) -> Dict:
+    return {"id": tag.id, "name": tag.name, "slug": tag.slug, "color": tag.color, "icon": tag.icon}
+
+def category_payload(category: RoomCategory, available_rooms_count: int = 0) -> Dict:
+    """Các trường của RoomCategoryResponse; tags cần được nạp sẵn bằng category_options()"""
+    return {
+        "id": category.id,
+        "name": category.name,
+        "slug": category.slug,
+        "description": category.description,
+        "base_price": float(category.base_price) if category.base_price else None,
+        "max_guests": category.max_guests,
+        "room_size": float(category.room_size) if category.room_size else None,
+        "bed_type": category.bed_type,
+        "view_type": category.view_type,
+        "has_balcony": category.has_balcony,
+        "has_kitchen": category.has_kitchen,
+        "is_pet_friendly": category.is_pet_friendly,
+        "amenities": category.amenities or [],
+        "images": category.images or [],
+        "tags": [tag_payload(tag) for tag in category.tags],
+        "available_rooms_count": available_rooms_count
+    }
@@ -0,0 +1,207 @@
+import logging
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, event, func, inspect, select
+from sqlalchemy.orm import Session, aliased
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Homestay, Destination, SearchTerm
+from app.services.cache import create_cache
+
+logger = logging.getLogger(__name__)
+
+# Bảng chuyển đổi dấu tiếng Việt (dùng chung với services.seo.generate_slug)
+VIETNAMESE_MAP = {
+    'à': 'a', 'á': 'a', 'ạ': 'a', 'ả': 'a', 'ã': 'a', 'â': 'a', 'ầ': 'a', 'ấ': 'a', 'ậ': 'a', 'ẩ': 'a', 'ẫ': 'a',
+    'ă': 'a', 'ằ': 'a', 'ắ': 'a', 'ặ': 'a', 'ẳ': 'a', 'ẵ': 'a',
+    'è': 'e', 'é': 'e', 'ẹ': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ê': 'e', 'ề': 'e', 'ế': 'e', 'ệ': 'e', 'ể': 'e', 'ễ': 'e',
+    'ì': 'i', 'í': 'i', 'ị': 'i', 'ỉ': 'i', 'ĩ': 'i',
+    'ò': 'o', 'ó': 'o', 'ọ': 'o', 'ỏ': 'o', 'õ': 'o', 'ô': 'o', 'ồ': 'o', 'ố': 'o', 'ộ': 'o', 'ổ': 'o', 'ỗ': 'o',
+    'ơ': 'o', 'ờ': 'o', 'ớ': 'o', 'ợ': 'o', 'ở': 'o', 'ỡ': 'o',
+    'ù': 'u', 'ú': 'u', 'ụ': 'u', 'ủ': 'u', 'ũ': 'u', 'ư': 'u', 'ừ': 'u', 'ứ': 'u', 'ự': 'u', 'ử': 'u', 'ữ': 'u',
+    'ỳ': 'y', 'ý': 'y', 'ỵ': 'y', 'ỷ': 'y', 'ỹ': 'y',
+    'đ': 'd'
+}
+_FOLD_TABLE = str.maketrans(VIETNAMESE_MAP)
+
+# Các trường được đánh chỉ mục và trọng số khi xếp hạng
+INDEXED_FIELDS = {
+    "homestay": (Homestay, (("name", 5), ("address", 3), ("description", 1))),
+    "destination": (Destination, (("name", 5), ("province", 3), ("city", 3), ("short_description", 1), ("description", 1))),
+}
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+REBUILD_BATCH_SIZE = 1000
+# Đếm tối đa chừng này dòng chỉ mục cho mỗi từ khi so độ hiếm; từ phổ biến hơn coi như bằng nhau
+FREQUENCY_SAMPLE = 20000
+
+# Độ hiếm của từ chỉ dùng để chọn thứ tự tra cứu, số cũ không làm sai kết quả
+term_frequencies = create_cache("search_term_frequency", max_entries=4096, ttl=settings.SEARCH_TERM_FREQUENCY_TTL)
+
+def fold_text(text: str) -> str:
+    """Chữ thường, bỏ dấu tiếng Việt"""
+    return unicodedata.normalize("NFC", text).lower().translate(_FOLD_TABLE)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Tách văn bản đã bỏ dấu thành các từ chữ/số"""
+    if not text:
+        return []
+    return [token[:MAX_TERM_LENGTH] for token in re.findall(r"[a-z0-9]+", fold_text(text))]
+
+def document_terms(entity, fields) -> Dict[str, int]:
+    """Từ -> tổng trọng số các trường chứa từ đó (mỗi trường tính một lần)"""
+    terms: Dict[str, int] = {}
+    for name, weight in fields:
+        for term in set(tokenize(getattr(entity, name))):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+def _term_rows(entity_type: str, entity_id: int, terms: Dict[str, int]) -> List[Dict]:
+    return [
+        {"entity_type": entity_type, "entity_id": entity_id, "term": term, "weight": weight}
+        for term, weight in terms.items()
+    ]
+
+def _delete_terms(connection, entity_type: str, entity_id: int):
+    table = SearchTerm.__table__
+    connection.execute(table.delete().where(table.c.entity_type == entity_type, table.c.entity_id == entity_id))
+
+def _register(entity_type: str, model, fields):
+    """Cập nhật chỉ mục trong cùng flush khi bản ghi được thêm, sửa các trường văn bản hoặc xóa"""
+
+    def reindex(mapper, connection, target):
+        _delete_terms(connection, entity_type, target.id)
+        rows = _term_rows(entity_type, target.id, document_terms(target, fields))
+        if rows:
+            connection.execute(SearchTerm.__table__.insert(), rows)
+
+    def reindex_if_changed(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name, _ in fields):
+            reindex(mapper, connection, target)
+
+    def remove(mapper, connection, target):
+        _delete_terms(connection, entity_type, target.id)
+
+    event.listen(model, "after_insert", reindex)
+    event.listen(model, "after_update", reindex_if_changed)
+    event.listen(model, "after_delete", remove)
+
+for _entity_type, (_model, _fields) in INDEXED_FIELDS.items():
+    _register(_entity_type, _model, _fields)
+
+def _prefix_range(terms, token: str):
+    """Khoảng [token, token tiếp theo) thay cho LIKE 'token%' để luôn dùng được index trên term"""
+    return terms.term >= token, terms.term < token[:-1] + chr(ord(token[-1]) + 1)
+
+def _postings(terms, entity_type: str, token: str, prefix: bool):
+    """Điều kiện chọn các dòng chỉ mục của một từ (khớp nguyên từ hoặc theo tiền tố)"""
+    if prefix:
+        return (terms.entity_type == entity_type, *_prefix_range(terms, token))
+    return (terms.entity_type == entity_type, terms.term == token)
+
+def _frequencies(db: Session, entity_type: str, words: List[Tuple[str, bool]]) -> Dict[Tuple[str, bool], int]:
+    """Số dòng chỉ mục của mỗi từ (chặn ở FREQUENCY_SAMPLE), đếm một truy vấn cho các từ chưa có trong cache"""
+    keys = {word: f"{entity_type}|{'prefix' if word[1] else 'term'}|{word[0]}" for word in words}
+    frequencies = {}
+    for word, key in keys.items():
+        count = term_frequencies.get(key)
+        if count is not None:
+            frequencies[word] = count
+    missing = [word for word in words if word not in frequencies]
+    if missing:
+        counts = db.execute(select(*[
+            select(func.count()).select_from(
+                select(SearchTerm.entity_id).where(*_postings(SearchTerm, entity_type, token, prefix))
+                .limit(FREQUENCY_SAMPLE).subquery()
+            ).scalar_subquery()
+            for token, prefix in missing
+        ])).one()
+        for word, count in zip(missing, counts):
+            frequencies[word] = count
+            term_frequencies.set(keys[word], count)
+    return frequencies
+
+def match_scores(db: Session, entity_type: str, text: Optional[str]):
+    """
+    Subquery (entity_id, score) các bản ghi chứa đủ mọi từ của truy vấn; từ cuối khớp theo tiền tố.
+    Điểm là tổng trọng số các trường khớp. None nếu truy vấn không có từ nào.
+    """
+    tokens = tokenize(text)[:MAX_QUERY_TERMS]
+    if not tokens:
+        return None
+    words = list(dict.fromkeys([(token, False) for token in tokens[:-1]] + [(tokens[-1], True)]))
+
+    # Từ hiếm nhất dẫn truy vấn, các từ còn lại chỉ tra theo entity_id của các bản ghi nó tìm được
+    frequencies = _frequencies(db, entity_type, words)
+    (token, prefix), *others = sorted(words, key=lambda word: frequencies[word])
+
+    lead = aliased(SearchTerm)
+    if prefix:
+        # Một bản ghi có thể chứa nhiều từ cùng tiền tố: lấy trọng số lớn nhất
+        lead = (
+            select(SearchTerm.entity_id, func.max(SearchTerm.weight).label("weight"))
+            .where(*_postings(SearchTerm, entity_type, token, prefix))
+            .group_by(SearchTerm.entity_id)
+            .subquery("search_lead")
+        )
+        query = select(lead.c.entity_id)
+        entity_id, score = lead.c.entity_id, lead.c.weight
+    else:
+        query = select(lead.entity_id).where(*_postings(lead, entity_type, token, prefix))
+        entity_id, score = lead.entity_id, lead.weight
+
+    for token, prefix in others:
+        other = aliased(SearchTerm)
+        if prefix:
+            weight = (
+                select(func.max(other.weight))
+                .where(other.entity_id == entity_id, *_postings(other, entity_type, token, prefix))
+                .scalar_subquery()
+            )
+            query = query.where(weight.isnot(None))
+            score = score + weight
+        else:
+            # Tra theo khóa chính (entity_type, term, entity_id)
+            query = query.join(other, and_(other.entity_id == entity_id, *_postings(other, entity_type, token, prefix)))
+            score = score + other.weight
+
+    return query.add_columns(score.label("score")).subquery("search_matches")
+
+def rebuild_search_index(db: Session, entity_type: Optional[str] = None) -> int:
+    """Dựng lại chỉ mục từ bảng gốc theo từng lô, ghi bằng INSERT nhiều dòng (commit). Trả về số bản ghi đã đánh chỉ mục."""
+    table = SearchTerm.__table__
+    indexed = 0
+    for current_type, (model, fields) in INDEXED_FIELDS.items():
+        if entity_type and current_type != entity_type:
+            continue
+        db.execute(table.delete().where(table.c.entity_type == current_type))
+        columns = [model.id] + [getattr(model, name) for name, _ in fields]
+        last_id = 0
+        while True:
+            # Phân trang theo id để không giữ cursor mở trong lúc ghi
+            batch = db.query(*columns).filter(model.id > last_id).order_by(model.id).limit(REBUILD_BATCH_SIZE).all()
+            if not batch:
+                break
+            rows = []
+            for entity in batch:
+                rows.extend(_term_rows(current_type, entity.id, document_terms(entity, fields)))
+            if rows:
+                db.execute(table.insert(), rows)
+            indexed += len(batch)
+            last_id = batch[-1].id
+    db.commit()
+    return indexed
+
+def run_search_reindex():
+    """Job nền dựng lại chỉ mục tìm kiếm, chạy trong threadpool với session riêng"""
+    db = SessionLocal()
+    try:
+        indexed = rebuild_search_index(db)
+        logger.info(f"Search reindex: {indexed} records indexed")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Search reindex failed: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,51 @@
+import re
+from typing import Dict
+from sqlalchemy.orm import Session
+from app.models.seo import SEOMetadata
+from app.services.search import fold_text
+
+SEO_FIELDS = ("meta_title", "meta_description", "meta_keywords", "og_title", "og_description", "og_image", "canonical_url")
+
+def generate_slug(text: str) -> str:
+    """Tạo URL slug thân thiện"""
+    # Chuyển về lowercase và loại bỏ dấu tiếng Việt
+    slug = fold_text(text)
+    
+    # Loại bỏ ký tự đặc biệt và thay thế bằng dấu gạch ngang
+    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
+    slug = re.sub(r'\s+', '-', slug)
+    slug = re.sub(r'-+', '-', slug)
+    slug = slug.strip('-')
+    
+    return slug
+
+def seo_metadata(db: Session, entity_type: str, entity) -> Dict:
+    """SEO metadata đã lưu của entity (homestay hoặc destination), chưa có thì tạo mặc định"""
+    seo_data = db.query(SEOMetadata).filter(
+        SEOMetadata.entity_type == entity_type,
+        SEOMetadata.entity_id == entity.id
+    ).first()
+    
+    if seo_data:
+        return {field: getattr(seo_data, field) for field in SEO_FIELDS}
+    
+    # Tạo SEO metadata mặc định
+    if entity_type == "homestay":
+        return {
+            "meta_title": f"{entity.name} - Homestay tại {entity.location.name if entity.location else 'Việt Nam'}",
+            "meta_description": f"Đặt phòng {entity.name} với giá {entity.price_per_night:,.0f}đ/đêm. {entity.description[:150] if entity.description else ''}",
+            "meta_keywords": f"homestay, {entity.name}, {entity.location.name if entity.location else ''}, đặt phòng",
+            "og_title": f"{entity.name} - Homestay",
+            "og_description": f"Homestay tuyệt vời tại {entity.location.name if entity.location else 'Việt Nam'}",
+            "og_image": None,
+            "canonical_url": f"/homestay/{generate_slug(entity.name)}-{entity.id}"
+        }
+    return {
+        "meta_title": f"Du lịch {entity.name} - Homestay & Khách sạn tốt nhất",
+        "meta_description": f"Khám phá {entity.name} với những homestay và khách sạn tuyệt vời. Đặt ngay để có giá tốt nhất!",
+        "meta_keywords": f"du lịch, {entity.name}, homestay, khách sạn, đặt phòng",
+        "og_title": f"Du lịch {entity.name}",
+        "og_description": f"Điểm đến tuyệt vời cho kỳ nghỉ của bạn",
+        "og_image": None,
+        "canonical_url": f"/destination/{generate_slug(entity.name)}"
+    }
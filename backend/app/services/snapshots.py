@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import and_, desc, event, func, inspect
+from sqlalchemy.orm import Session, object_session
+from app.config import settings
+from app.db import SessionLocal
+from app.models import Homestay, Destination, HomestayImage
+from app.services.listing import listing_options
+
+logger = logging.getLogger(__name__)
+
+# Số phần tử dựng sẵn của mỗi danh sách, bằng limit lớn nhất các endpoint cho phép
+SNAPSHOT_SIZE = 20
+
+class Snapshot:
+    """
+    Một danh sách dựng sẵn trong bộ nhớ cho trang chủ. Phục vụ bản hiện có kể cả khi đã cũ
+    và làm mới ở nền (stale-while-revalidate); chỉ lần đầu chưa có dữ liệu mới dựng ngay trong request.
+    """
+
+    def __init__(self, name: str, build: Callable[[Session], List[Dict]], max_age: int):
+        self.name = name
+        self.max_age = max_age
+        self._build = build
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._stale = False
+        self.items: Optional[List[Dict]] = None
+        self.built_at: Optional[float] = None
+
+    def get(self, db: Session) -> List[Dict]:
+        items = self.items
+        if items is None:
+            return self.refresh(db)
+        if self._stale or time.monotonic() - self.built_at > self.max_age:
+            self.refresh_in_background()
+        return items
+
+    def refresh(self, db: Session) -> List[Dict]:
+        """Dựng lại từ database rồi thay bản đang phục vụ"""
+        # Thay đổi xảy ra trong lúc dựng sẽ đánh dấu cũ lại, lần đọc sau dựng tiếp
+        self._stale = False
+        try:
+            items = self._build(db)
+        except Exception:
+            # Dựng lỗi: giữ bản cũ nhưng vẫn là cũ, lần đọc hoặc lần chạy lịch sau dựng lại
+            self._stale = True
+            raise
+        self.items, self.built_at = items, time.monotonic()
+        return items
+
+    def refresh_in_background(self):
+        """Làm mới trong thread riêng với session riêng; bỏ qua nếu đang làm mới"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            db = SessionLocal()
+            try:
+                self.refresh(db)
+            except Exception as e:
+                logger.error(f"Snapshot {self.name} refresh failed: {e}")
+            finally:
+                db.close()
+                self._refreshing = False
+
+        threading.Thread(target=run, name=f"snapshot-{self.name}", daemon=True).start()
+
+    def mark_stale(self):
+        self._stale = True
+
+def _featured_homestays(db: Session) -> List[Dict]:
+    """Homestay featured mới nhất trước, thiếu thì bổ sung homestay đang hoạt động mới nhất"""
+    active = and_(Homestay.status == 'active', Homestay.is_active == True)
+    homestays = db.query(Homestay).filter(active, Homestay.featured == True).options(
+        *listing_options()
+    ).order_by(desc(Homestay.created_at)).limit(SNAPSHOT_SIZE).all()
+
+    if len(homestays) < SNAPSHOT_SIZE:
+        homestays += db.query(Homestay).filter(active, ~Homestay.id.in_([h.id for h in homestays])).options(
+            *listing_options()
+        ).order_by(desc(Homestay.created_at)).limit(SNAPSHOT_SIZE - len(homestays)).all()
+
+    return [
+        {
+            "id": homestay.id,
+            "name": homestay.name,
+            "description": homestay.description,
+            "price_per_night": float(homestay.price_per_night),
+            "max_guests": homestay.max_guests,
+            "address": homestay.address,
+            "featured": homestay.featured,
+            "discount_percent": homestay.discount_percent,
+            "avg_rating": round(float(homestay.avg_rating or 0), 1),
+            "review_count": homestay.review_count or 0,
+            "category": homestay.category.name if homestay.category else None,
+            "images": [img.image_path for img in homestay.images] if homestay.images else [],
+            "amenities": [
+                {
+                    "id": amenity.id,
+                    "name": amenity.name,
+                    "icon": amenity.icon
+                } for amenity in homestay.amenities
+            ] if homestay.amenities else [],
+            "created_at": homestay.created_at.isoformat() if homestay.created_at else None
+        } for homestay in homestays
+    ]
+
+def _featured_destinations(db: Session) -> List[Dict]:
+    """Điểm đến featured nhiều lượt xem trước, thiếu thì bổ sung điểm đến phổ biến; số homestay đếm chung một truy vấn"""
+    destinations = db.query(Destination).filter(
+        Destination.is_active == True, Destination.is_featured == True
+    ).order_by(desc(Destination.view_count)).limit(SNAPSHOT_SIZE).all()
+
+    if len(destinations) < SNAPSHOT_SIZE:
+        destinations += db.query(Destination).filter(
+            Destination.is_active == True, ~Destination.id.in_([d.id for d in destinations])
+        ).order_by(desc(Destination.view_count)).limit(SNAPSHOT_SIZE - len(destinations)).all()
+
+    homestay_counts = dict(db.query(Homestay.destination_id, func.count(Homestay.id)).filter(
+        Homestay.destination_id.in_([d.id for d in destinations]),
+        Homestay.status == 'active',
+        Homestay.is_active == True
+    ).group_by(Homestay.destination_id).all()) if destinations else {}
+
+    return [
+        {
+            "id": destination.id,
+            "name": destination.name,
+            "slug": destination.slug,
+            "short_description": destination.short_description,
+            "province": destination.province,
+            "banner_image": destination.banner_image,
+            "is_featured": destination.is_featured,
+            "view_count": destination.view_count,
+            "avg_rating": destination.avg_rating,
+            "homestay_count": homestay_counts.get(destination.id, 0)
+        } for destination in destinations
+    ]
+
+featured_homestays = Snapshot("featured_homestays", _featured_homestays, settings.SNAPSHOT_REFRESH_SECONDS)
+featured_destinations = Snapshot("featured_destinations", _featured_destinations, settings.SNAPSHOT_REFRESH_SECONDS)
+SNAPSHOTS = (featured_homestays, featured_destinations)
+
+def refresh_all_in_background():
+    for snapshot in SNAPSHOTS:
+        snapshot.refresh_in_background()
+
+_schedule_stop = threading.Event()
+
+def start_refresh_schedule(interval: float = settings.SNAPSHOT_REFRESH_SECONDS) -> threading.Thread:
+    """Làm mới mọi snapshot ở nền sau mỗi `interval` giây, kể cả khi không có request đọc"""
+    _schedule_stop.clear()
+
+    def run():
+        while not _schedule_stop.wait(interval):
+            refresh_all_in_background()
+
+    thread = threading.Thread(target=run, name="snapshot-schedule", daemon=True)
+    thread.start()
+    return thread
+
+def stop_refresh_schedule():
+    _schedule_stop.set()
+
+def mark_stale_after_commit(db: Session, *snapshots: Snapshot):
+    """Đánh dấu cũ sau khi commit, dùng khi ghi bằng SQL thuần (không qua ORM)"""
+    db.info.setdefault("stale_snapshots", set()).update(snapshots or SNAPSHOTS)
+
+# Ghi nhận thay đổi trong flush, chỉ đánh dấu cũ sau khi commit
+
+def _changed(*snapshots: Snapshot, ignored=()):
+    def listener(mapper, connection, target):
+        # Lượt xem tăng theo từng lần xem trang: thứ tự chỉ được cập nhật theo lịch làm mới
+        state = inspect(target)
+        if ignored and not any(
+            state.attrs[attr.key].history.has_changes() for attr in mapper.column_attrs if attr.key not in ignored
+        ):
+            return
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("stale_snapshots", set()).update(snapshots)
+    return listener
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Homestay, _event, _changed(*SNAPSHOTS))
+    event.listen(HomestayImage, _event, _changed(featured_homestays))
+    event.listen(Destination, _event, _changed(
+        featured_destinations, ignored=("view_count", "updated_at") if _event == "after_update" else ()
+    ))
+
+@event.listens_for(Session, "after_commit")
+def _mark_stale(session):
+    for snapshot in session.info.pop("stale_snapshots", ()):
+        snapshot.mark_stale()
+
+@event.listens_for(Session, "after_rollback")
+def _drop_stale(session):
+    session.info.pop("stale_snapshots", None)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark độ trễ khi có truy vấn chậm: handler `async def` gọi Session đồng bộ (cách cũ, chặn event loop)
+so với handler `def` chạy trong threadpool. Lưu lượng hỗn hợp: một phần nhỏ request chậm, còn lại nhanh.
+Mặc định dùng SQLite (file tạm) với hàm sleep_ms; truyền --url để chạy trên MySQL thật (dùng SLEEP()).
+Chạy từ thư mục backend: python benchmarks/bench_concurrency.py --requests 400 --concurrency 40
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+from anyio import to_thread
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker
+
+sys.path.append('.')
+from app.config import settings
+
+def make_engine(url: str):
+    if url:
+        return create_engine(url, pool_size=settings.THREADPOOL_SIZE, max_overflow=0), "SELECT SLEEP(:ms / 1000)"
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False},
+                           pool_size=settings.THREADPOOL_SIZE, max_overflow=0)
+
+    @event.listens_for(engine, "connect")
+    def _sleep_function(connection, record):
+        # Mô phỏng truy vấn chậm phía database (nhả GIL như khi chờ I/O)
+        connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+    return engine, "SELECT sleep_ms(:ms)"
+
+def make_app(engine, sleep_sql: str) -> FastAPI:
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    # Cách cũ: async def nhưng truy vấn đồng bộ, cả worker đứng chờ trong lúc truy vấn
+    @app.get("/async/query")
+    async def async_query(ms: int = 0, db: Session = Depends(get_db)):
+        return {"value": db.execute(text(sleep_sql), {"ms": ms}).scalar()}
+
+    # Cách mới: def, FastAPI chạy trong threadpool
+    @app.get("/sync/query")
+    def sync_query(ms: int = 0, db: Session = Depends(get_db)):
+        return {"value": db.execute(text(sleep_sql), {"ms": ms}).scalar()}
+
+    return app
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def run(app: FastAPI, path: str, requests: int, concurrency: int, slow_ratio: float, slow_ms: int, fast_ms: int):
+    rng = random.Random(7)
+    plan = [slow_ms if rng.random() < slow_ratio else fast_ms for _ in range(requests)]
+    latencies = {slow_ms: [], fast_ms: []}
+    queue = asyncio.Queue()
+    for ms in plan:
+        queue.put_nowait(ms)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                ms = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(path, params={"ms": ms})
+                response.raise_for_status()
+                latencies[ms].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return latencies[fast_ms], latencies[slow_ms], elapsed
+
+async def main_async(args):
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    engine, sleep_sql = make_engine(args.url)
+    app = make_app(engine, sleep_sql)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.slow_ratio:.0%} slow ({args.slow_ms} ms), others {args.fast_ms} ms, threadpool {settings.THREADPOOL_SIZE}")
+    print(f"{'handler':<12}{'fast p50':>10}{'fast p99':>10}{'slow p99':>10}{'req/s':>8}")
+    for label, path in (("async def", "/async/query"), ("def", "/sync/query")):
+        fast, slow, elapsed = await run(app, path, args.requests, args.concurrency, args.slow_ratio, args.slow_ms, args.fast_ms)
+        print(f"{label:<12}{percentile(fast, 0.5):>10.1f}{percentile(fast, 0.99):>10.1f}"
+              f"{percentile(slow, 0.99) if slow else 0:>10.1f}{args.requests / elapsed:>8.0f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--slow-ratio", type=float, default=0.1)
+    parser.add_argument("--slow-ms", type=int, default=200)
+    parser.add_argument("--fast-ms", type=int, default=2)
+    parser.add_argument("--url", default="")
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
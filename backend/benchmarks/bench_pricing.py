@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark tính giá kỳ lưu trú: duyệt từng đêm (cách cũ) so với vector giá theo khoảng (app.services.pricing).
+Không cần database. Chạy từ thư mục backend: python benchmarks/bench_pricing.py
+"""
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+sys.path.append('.')
+from app.services.availability_engine import OverrideIndex, room_base_price
+from app.services.pricing import quote_rooms
+
+ROOMS = 50
+NIGHTS = 30
+CHECK_IN = date(2026, 12, 1)
+CHECK_OUT = CHECK_IN + timedelta(days=NIGHTS)
+
+def make_data(seed: int = 42):
+    rng = random.Random(seed)
+    rooms = []
+    records = []
+    for room_id in range(1, ROOMS + 1):
+        category = SimpleNamespace(base_price=rng.choice([400000, 550000, 700000]))
+        rooms.append(SimpleNamespace(
+            id=room_id,
+            price_per_night=rng.choice([None, 500000]),
+            room_category=category
+        ))
+        # Vài khoảng giá đặc biệt không chồng nhau (cuối tuần, lễ)
+        day = CHECK_IN - timedelta(days=3)
+        while day < CHECK_OUT:
+            day += timedelta(days=rng.randint(1, 6))
+            length = rng.randint(1, 4)
+            records.append(SimpleNamespace(
+                room_id=room_id,
+                start_date=day,
+                end_date=day + timedelta(days=length),
+                price_override=rng.choice([None, 650000, 900000])
+            ))
+            day += timedelta(days=length)
+    return rooms, OverrideIndex(records)
+
+def day_by_day(rooms, overrides):
+    """Cách cũ: mỗi phòng duyệt từng đêm, tra giá đặc biệt rồi lùi về giá phòng / loại phòng"""
+    totals = {}
+    for room in rooms:
+        prices = []
+        day = CHECK_IN
+        while day < CHECK_OUT:
+            record = overrides.get(room.id, day)
+            if record and record.price_override:
+                prices.append(float(record.price_override))
+            else:
+                prices.append(float(room_base_price(room)))
+            day += timedelta(days=1)
+        totals[room.id] = (sum(prices), prices)
+    return totals
+
+def vectorized(rooms, overrides):
+    return quote_rooms(rooms, overrides, CHECK_IN, CHECK_OUT)
+
+def main():
+    rooms, overrides = make_data()
+
+    expected = day_by_day(rooms, overrides)
+    quotes = vectorized(rooms, overrides)
+    for room in rooms:
+        assert quotes[room.id].nightly == expected[room.id][1], f"Lệch giá phòng {room.id}"
+
+    number = 200
+    for name, func in [("day_by_day", day_by_day), ("vectorized", vectorized)]:
+        best = min(timeit.repeat(lambda: func(rooms, overrides), number=number, repeat=5))
+        print(f"{name:>12}: {best / number * 1000:.3f} ms / {ROOMS} phòng × {NIGHTS} đêm")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark tìm kiếm homestay: ilike('%từ%') trên name/description/address (cách cũ) so với chỉ mục search_terms.
+Mô tả dài vài câu như dữ liệu thật, có cả từ rất phổ biến (nhà, hỗ trợ) lẫn từ hiếm.
+Mặc định dùng SQLite trong bộ nhớ; truyền --url để chạy trên MySQL thật (sẽ tạo/ghi đè dữ liệu bảng).
+Chạy từ thư mục backend: python benchmarks/bench_search.py --rows 100000
+"""
+import argparse
+import random
+import sys
+import time
+
+from sqlalchemy import BigInteger, create_engine, desc, or_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append('.')
+from app.db import Base
+from app.models import Homestay, SearchTerm
+from app.services.search import match_scores, rebuild_search_index, term_frequencies
+
+@compiles(BigInteger, 'sqlite')
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite chỉ tự tăng khóa chính kiểu INTEGER
+    return 'INTEGER'
+
+PLACES = ['Đà Lạt', 'Nha Trang', 'Sa Pa', 'Hội An', 'Phú Quốc', 'Hạ Long', 'Huế', 'Vũng Tàu', 'Mộc Châu', 'Quy Nhơn',
+          'Cần Thơ', 'Tam Đảo', 'Ninh Bình', 'Côn Đảo', 'Mũi Né', 'Hà Giang']
+KINDS = ['Homestay', 'Villa', 'Bungalow', 'Nhà gỗ', 'Căn hộ', 'Resort', 'Nhà vườn', 'Cabin']
+ADJECTIVES = ['yên tĩnh', 'view biển', 'gần chợ', 'có hồ bơi', 'ấm cúng', 'rộng rãi', 'giá rẻ', 'sang trọng', 'view núi', 'cổ kính']
+SENTENCES = [
+    'Phòng ngủ rộng rãi với cửa sổ lớn nhìn ra vườn.', 'Bếp đầy đủ dụng cụ, khách có thể tự nấu ăn.',
+    'Chủ nhà thân thiện, hỗ trợ thuê xe máy và đặt tour.', 'Wifi tốc độ cao phủ sóng toàn bộ khuôn viên.',
+    'Chỉ mất năm phút đi bộ đến chợ đêm và các quán cà phê.', 'Sân vườn có khu nướng BBQ ngoài trời cho nhóm bạn.',
+    'Phòng tắm riêng có nước nóng và đồ dùng cá nhân.', 'Ban công rộng đón bình minh mỗi sáng.',
+    'Bãi đỗ xe ô tô miễn phí ngay trong khuôn viên.', 'Bữa sáng với đặc sản địa phương được phục vụ tận phòng.',
+    'Không gian yên tĩnh phù hợp cho gia đình có trẻ nhỏ.', 'Có máy giặt, bàn là và tủ lạnh dùng chung.',
+    'Nhận phòng tự động bằng mã khóa, linh hoạt giờ giấc.', 'Lò sưởi ấm áp vào những đêm se lạnh.',
+]
+QUERIES = ['Đà Lạt', 'da lat', 'villa biển', 'nhà gỗ mộc châu', 'hồ bơi', 'Quy Nh', 'phòng gần chợ huế', 'bungalow co ho boi']
+
+def seed(db, rows: int):
+    rng = random.Random(1)
+    batch = []
+    for i in range(1, rows + 1):
+        place = rng.choice(PLACES)
+        batch.append({
+            "id": i,
+            "name": f"{rng.choice(KINDS)} {place} {rng.choice(ADJECTIVES)} {i}",
+            "description": f"{rng.choice(KINDS)} {rng.choice(ADJECTIVES)} tại {place}. "
+                           + " ".join(rng.choice(SENTENCES) for _ in range(6)),
+            "address": f"{rng.randint(1, 500)} đường {rng.choice(PLACES)}, {place}",
+            "price_per_night": rng.choice([300000, 500000, 800000]),
+            "status": "active",
+            "is_active": True,
+            "featured": i % 10 == 0,
+        })
+        if len(batch) == 5000:
+            db.execute(Homestay.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.execute(Homestay.__table__.insert(), batch)
+    db.commit()
+
+def base_query(db):
+    return db.query(Homestay).filter(Homestay.status == 'active', Homestay.is_active == True)
+
+def ilike_search(db, text: str):
+    query = base_query(db).filter(
+        or_(
+            Homestay.name.ilike(f"%{text}%"),
+            Homestay.description.ilike(f"%{text}%"),
+            Homestay.address.ilike(f"%{text}%")
+        )
+    )
+    total = query.count()
+    page = query.order_by(desc(Homestay.featured), desc(Homestay.created_at)).limit(12).all()
+    return total, page
+
+def index_search(db, text: str):
+    matches = match_scores(db, "homestay", text)
+    query = base_query(db).join(matches, matches.c.entity_id == Homestay.id)
+    total = query.count()
+    page = query.order_by(desc(matches.c.score), desc(Homestay.featured), desc(Homestay.created_at)).limit(12).all()
+    return total, page
+
+def timed(func, db, text: str, repeat: int):
+    best = None
+    for _ in range(repeat):
+        db.expunge_all()
+        # Tính cả truy vấn đếm độ hiếm của từ, như lần đầu gặp từ đó
+        term_frequencies.clear()
+        start = time.perf_counter()
+        total, _ = func(db, text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, total
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--url", default="sqlite://")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    tables = [Homestay.__table__, SearchTerm.__table__]
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    db = sessionmaker(bind=engine)()
+
+    start = time.perf_counter()
+    seed(db, args.rows)
+    print(f"Seeded {args.rows} homestays in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    rebuild_search_index(db, "homestay")
+    print(f"Built index ({db.query(SearchTerm).count()} terms) in {time.perf_counter() - start:.1f}s")
+    # Thống kê index như database đang chạy thật (InnoDB tự cập nhật); thiếu nó SQLite có thể quét cả chỉ mục
+    db.connection().exec_driver_sql("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE TABLE homestays, search_terms")
+    db.commit()
+
+    print(f"{'query':<20}{'ilike ms':>10}{'hits':>8}{'index ms':>10}{'hits':>8}")
+    for text in QUERIES:
+        ilike_ms, ilike_hits = timed(ilike_search, db, text, args.repeat)
+        index_ms, index_hits = timed(index_search, db, text, args.repeat)
+        print(f"{text:<20}{ilike_ms:>10.1f}{ilike_hits:>8}{index_ms:>10.1f}{index_hits:>8}")
+
+if __name__ == "__main__":
+    main()
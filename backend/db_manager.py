@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Quản lý schema database (thay cho việc tạo bảng khi import main.py).
+Chạy một lần trước khi khởi động/triển khai các worker:
+    python db_manager.py --create-all
+Các file trong migrations/ vẫn chạy thủ công theo thứ tự ghi trong từng file.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import inspect, text
+
+sys.path.append('.')
+from app.db import engine, Base
+import app.models  # noqa: F401 - đăng ký toàn bộ model vào Base.metadata
+
+def status() -> int:
+    """Kiểm tra kết nối và liệt kê bảng của models chưa có trong database"""
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            existing = set(inspect(connection).get_table_names())
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return 1
+    print(f"✅ Database connection successful ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    missing = [table for table in Base.metadata.sorted_tables if table.name not in existing]
+    print(f"{len(Base.metadata.tables) - len(missing)}/{len(Base.metadata.tables)} tables present")
+    for table in missing:
+        print(f"  missing: {table.name}")
+    return 0
+
+def create_all() -> int:
+    """Tạo các bảng còn thiếu; không sửa bảng đã có"""
+    start = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    print(f"✅ Tables created ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    return 0
+
+def drop_all() -> int:
+    Base.metadata.drop_all(bind=engine)
+    print("✅ Tables dropped")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--status", action="store_true")
+    group.add_argument("--create-all", action="store_true")
+    group.add_argument("--drop-all", action="store_true")
+    group.add_argument("--recreate-all", action="store_true")
+    args = parser.parse_args()
+
+    if args.status:
+        sys.exit(status())
+    if args.drop_all or args.recreate_all:
+        drop_all()
+    if args.create_all or args.recreate_all:
+        create_all()
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,33 @@
-from fastapi import FastAPI, HTTPException, Request
+import time
+# Mốc đo thời gian khởi động của worker, đặt trước mọi import nặng
+_import_started = time.perf_counter()
+
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import text
+from sqlalchemy import exc, text
+from anyio import to_thread
 import logging
 import traceback
 import os
-from app.db import engine, Base, SessionLocal
-from app.routes import auth, dashboard, homestays, destinations, admin, admin_auth, bookings, homestay_management, payments, room_categories, availability, seo, admin_room_categories, promotions, banners, admin_banners
-from app.middleware import rate_limit_middleware, security_headers_middleware
+from app.config import settings
+from app.auth import require_admin
+from app.db import engine, pool_metrics, replica_engine, replica_pool_metrics, replica_router
+from app.models import User
+from app.routes import auth, dashboard, homestays, destinations, admin, admin_auth, bookings, homestay_management, payments, room_categories, availability, seo, admin_room_categories, promotions, banners, admin_banners, search
+from app.services.autocomplete import autocomplete_index
+from app.services.snapshots import refresh_all_in_background, start_refresh_schedule, stop_refresh_schedule
+from app.middleware import rate_limit_middleware, security_headers_middleware, read_your_writes_middleware
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Test database connection
-try:
-    with engine.connect() as connection:
-        connection.execute(text("SELECT 1"))
-    logger.info("✅ Database connection successful")
-except Exception as e:
-    logger.error(f"❌ Database connection failed: {e}")
-    raise
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Không kết nối database khi import: engine chỉ mở kết nối ở request đầu tiên,
+# schema được tạo bằng lệnh riêng (python db_manager.py --create-all) trước khi chạy worker.
+# Database chưa sẵn sàng thì worker vẫn khởi động, /health/ready trả 503 cho tới khi kết nối được.
+startup_timing = {"pid": os.getpid(), "import_ms": None, "startup_ms": None, "ready_at": None}
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -45,6 +48,17 @@ def create_app() -> FastAPI:
             content={"detail": "Đã xảy ra lỗi hệ thống. Vui lòng thử lại sau."}
         )
     
+    # Mất kết nối database hoặc hết kết nối trong pool: lỗi tạm thời, client nên thử lại
+    @app.exception_handler(exc.OperationalError)
+    @app.exception_handler(exc.TimeoutError)
+    async def database_unavailable_handler(request: Request, error: Exception):
+        logger.error(f"Database unavailable: {error}")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Dịch vụ tạm thời không khả dụng. Vui lòng thử lại sau."},
+            headers={"Retry-After": "5"}
+        )
+    
     # Validation exception handler
     @app.exception_handler(422)
     async def validation_exception_handler(request: Request, exc):
@@ -73,6 +87,7 @@ def create_app() -> FastAPI:
     # Security middleware - added after CORS
     app.middleware("http")(rate_limit_middleware)
     app.middleware("http")(security_headers_middleware)
+    app.middleware("http")(read_your_writes_middleware)
     
     # Include routers
     app.include_router(auth.router)
@@ -90,6 +105,7 @@ def create_app() -> FastAPI:
     app.include_router(admin_room_categories.router)
 
     app.include_router(seo.router)
+    app.include_router(search.router)
     app.include_router(banners.router)
     app.include_router(admin_banners.router)
     
@@ -108,6 +124,37 @@ def create_app() -> FastAPI:
     return app
 
 app = create_app()
+startup_timing["import_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+
+@app.on_event("startup")
+async def configure_threadpool():
+    # Handler đồng bộ (def) dùng Session chạy trong threadpool, không chặn event loop
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def build_autocomplete_index():
+    # Dựng chỉ mục gợi ý trong thread riêng để không chặn khởi động
+    autocomplete_index.rebuild_in_background()
+
+@app.on_event("startup")
+async def build_listing_snapshots():
+    # Dựng sẵn danh sách nổi bật của trang chủ ở nền, sau đó làm mới theo lịch SNAPSHOT_REFRESH_SECONDS
+    refresh_all_in_background()
+    start_refresh_schedule()
+
+@app.on_event("shutdown")
+async def stop_listing_snapshots():
+    stop_refresh_schedule()
+
+@app.on_event("startup")
+async def report_startup_time():
+    # Đăng ký sau cùng: tính từ lúc import main.py tới khi worker sẵn sàng nhận request
+    startup_timing["startup_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+    startup_timing["ready_at"] = time.time()
+    logger.info(
+        f"Worker {startup_timing['pid']} started in {startup_timing['startup_ms']} ms "
+        f"(import {startup_timing['import_ms']} ms)"
+    )
 
 @app.get("/", tags=["root"])
 async def root():
@@ -118,23 +165,46 @@ async def root():
         "docs": "/docs"
     }
 
+@app.get("/health/live", tags=["health"])
+async def liveness():
+    """Tiến trình còn phục vụ được request; không chạm database để lỗi database không làm restart worker"""
+    return {"status": "alive", **startup_timing}
+
+@app.get("/health/ready", tags=["health"])
 @app.get("/health", tags=["health"])
-async def health_check():
+def readiness():
+    """Worker nhận traffic được: đã khởi động xong và kết nối được database chính"""
+    if startup_timing["startup_ms"] is None:
+        raise HTTPException(status_code=503, detail="Đang khởi động")
+    start = time.perf_counter()
     try:
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
-        return {
-            "status": "healthy", 
-            "database": "connected",
-            "timestamp": "2024-01-01T00:00:00Z"
-        }
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
+        logger.error(f"Readiness check failed: {str(e)}")
         raise HTTPException(
             status_code=503, 
             detail=f"Dịch vụ tạm thời không khả dụng: {str(e)}"
         )
+    return {
+        "status": "ready",
+        "database": "connected",
+        "database_ms": round((time.perf_counter() - start) * 1000, 1),
+        "replica": replica_router.status(),
+        **startup_timing
+    }
+
+@app.get("/metrics/db-pool", tags=["health"])
+def db_pool_metrics(current_user: User = Depends(require_admin)):
+    """Số liệu connection pool của worker này, để chọn DB_POOL_SIZE/DB_MAX_OVERFLOW theo số worker (chỉ admin)"""
+    return {
+        **pool_metrics.snapshot(engine.pool),
+        "threadpool_size": to_thread.current_default_thread_limiter().total_tokens,
+        "replica": {
+            **replica_router.status(include_error=True),
+            "pool": replica_pool_metrics.snapshot(replica_engine.pool) if replica_engine is not None else None
+        }
+    }
 
 @app.options("/{path:path}")
 async def options_handler(path: str):
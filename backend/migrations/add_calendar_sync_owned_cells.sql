@@ -0,0 +1,9 @@
+-- Migration: Track cells blocked by calendar sync
+-- Date: 2026-10-18
+-- blocked_cells: ngày -> các phòng mà chính lần đồng bộ đã chặn; khi event bị xóa chỉ các ô này được bỏ chặn,
+-- ngày chủ nhà tự chặn không bị mất. Đồng bộ cũ chưa có blocked_cells không sở hữu ô nào (không tự bỏ chặn).
+-- started_at: lúc bắt đầu chạy, trạng thái "running" quá CALENDAR_SYNC_STALE_SECONDS được coi là đã dừng.
+
+ALTER TABLE calendar_syncs
+    ADD COLUMN blocked_cells JSON NULL AFTER blocked_dates,
+    ADD COLUMN started_at DATETIME NULL AFTER status;
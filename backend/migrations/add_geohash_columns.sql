@@ -0,0 +1,22 @@
+-- Migration: Add geohash columns to homestays and destinations
+-- Date: 2026-10-18
+-- Geohash (12 ký tự) của tọa độ, có index B-tree: tìm theo bán kính/khung bản đồ (GET /search/nearby)
+-- chuyển vùng tìm kiếm thành vài khoảng tiền tố trên index rồi mới lọc chính xác theo latitude/longitude.
+-- Được tính lại tự động khi ghi Homestay/Destination qua ORM (app/services/geo.py).
+
+ALTER TABLE homestays
+    ADD COLUMN geohash VARCHAR(12) CHARACTER SET ascii COLLATE ascii_bin NULL,
+    ADD INDEX idx_homestays_geohash (geohash);
+
+ALTER TABLE destinations
+    ADD COLUMN geohash VARCHAR(12) CHARACTER SET ascii COLLATE ascii_bin NULL,
+    ADD INDEX idx_destinations_geohash (geohash);
+
+-- Điền dữ liệu ban đầu; ST_GeoHash cho cùng kết quả với encode_geohash trong app/services/geo.py
+UPDATE homestays
+SET geohash = ST_GeoHash(longitude, latitude, 12)
+WHERE latitude BETWEEN -90 AND 90 AND longitude BETWEEN -180 AND 180;
+
+UPDATE destinations
+SET geohash = ST_GeoHash(longitude, latitude, 12)
+WHERE latitude BETWEEN -90 AND 90 AND longitude BETWEEN -180 AND 180;
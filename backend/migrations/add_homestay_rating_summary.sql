@@ -0,0 +1,38 @@
+-- Migration: Add rating summary columns to homestays
+-- Date: 2026-10-18
+-- Điểm trung bình, số review và histogram số sao của các review đã duyệt, lưu sẵn trên homestays
+-- để danh sách, chi tiết và sắp xếp/lọc theo rating không phải tính avg(reviews.rating) mỗi request.
+-- Được cập nhật khi tạo/duyệt/xóa review; POST /admin/ratings/reconcile dựng lại toàn bộ khi cần.
+
+ALTER TABLE homestays
+    ADD COLUMN avg_rating FLOAT NOT NULL DEFAULT 0,
+    ADD COLUMN review_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN rating_histogram JSON NULL,
+    ADD INDEX idx_homestays_avg_rating (avg_rating, review_count);
+
+-- Điền dữ liệu ban đầu từ reviews
+UPDATE homestays h
+LEFT JOIN (
+    SELECT
+        homestay_id,
+        AVG(rating) AS avg_rating,
+        COUNT(*) AS review_count,
+        SUM(rating = 1) AS r1,
+        SUM(rating = 2) AS r2,
+        SUM(rating = 3) AS r3,
+        SUM(rating = 4) AS r4,
+        SUM(rating = 5) AS r5
+    FROM reviews
+    WHERE is_approved = 1
+    GROUP BY homestay_id
+) s ON s.homestay_id = h.id
+SET
+    h.avg_rating = COALESCE(s.avg_rating, 0),
+    h.review_count = COALESCE(s.review_count, 0),
+    h.rating_histogram = JSON_OBJECT(
+        '1', COALESCE(s.r1, 0),
+        '2', COALESCE(s.r2, 0),
+        '3', COALESCE(s.r3, 0),
+        '4', COALESCE(s.r4, 0),
+        '5', COALESCE(s.r5, 0)
+    );
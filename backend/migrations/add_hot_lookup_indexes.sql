@@ -0,0 +1,24 @@
+-- Migration: Composite indexes for hot lookup filters
+-- Date: 2026-10-18
+-- Index ghép theo đúng thứ tự cột các truy vấn nóng lọc: cột so sánh bằng trước, cột khoảng/sắp xếp sau.
+-- Cột cuối của payments/reviews giúp SUM(amount) và tóm tắt rating đọc hoàn toàn từ index.
+-- room_availability_ranges đã có idx_room_availability_range (room_id, start_date, end_date).
+-- Kiểm tra sau khi chạy: TEST_MYSQL_URL=<DATABASE_URL> python -m pytest tests/test_indexes.py
+
+ALTER TABLE bookings
+    ADD INDEX idx_bookings_homestay_status_dates (homestay_id, status, check_in, check_out);
+
+ALTER TABLE reviews
+    ADD INDEX idx_reviews_homestay_approved_rating (homestay_id, is_approved, rating);
+
+ALTER TABLE homestay_rooms
+    ADD INDEX idx_homestay_rooms_homestay_available (homestay_id, is_available);
+
+ALTER TABLE payments
+    ADD INDEX idx_payments_status_created_amount (status, created_at, amount);
+
+ALTER TABLE seo_metadata
+    ADD INDEX idx_seo_metadata_entity (entity_type, entity_id);
+
+ALTER TABLE homestays
+    ADD INDEX idx_homestays_active_status_featured_created (is_active, status, featured, created_at);
@@ -0,0 +1,13 @@
+-- Migration: Unique (room_id, date) on room_availability
+-- Date: 2026-10-18
+-- Cho phép chặn/bỏ chặn hàng loạt bằng INSERT ... ON DUPLICATE KEY UPDATE.
+-- Các bản ghi trùng (room_id, date) được gộp về bản ghi cũ nhất, giống cách API đọc bằng .first().
+
+DELETE ra FROM room_availability ra
+INNER JOIN room_availability older
+    ON older.room_id = ra.room_id
+   AND older.date = ra.date
+   AND older.id < ra.id;
+
+ALTER TABLE room_availability
+    ADD CONSTRAINT uq_room_availability_room_date UNIQUE (room_id, date);
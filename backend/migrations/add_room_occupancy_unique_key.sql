@@ -0,0 +1,11 @@
+-- Migration: Unique (homestay_id, room, kind) on room_occupancy
+-- Date: 2026-10-18
+-- Mỗi (homestay, phòng, loại) chỉ còn một dòng bitmap để dựng lại/cập nhật bằng INSERT ... ON DUPLICATE KEY UPDATE.
+-- room_key = COALESCE(room_id, 0) vì UNIQUE cho phép nhiều dòng NULL (dòng cấp homestay có room_id NULL).
+-- Bitmap là dữ liệu dẫn xuất: xóa hết, các homestay được dựng lại ở lần đọc/ghi tiếp theo.
+
+DELETE FROM room_occupancy;
+
+ALTER TABLE room_occupancy
+    ADD COLUMN room_key BIGINT AS (COALESCE(room_id, 0)) STORED NOT NULL AFTER room_id,
+    ADD CONSTRAINT uq_room_occupancy_homestay_room_kind UNIQUE (homestay_id, room_key, kind);
@@ -0,0 +1,8 @@
+-- Migration: Add weight to idx_search_terms_entity
+-- Date: 2026-10-18
+-- Khớp tiền tố theo entity_id đọc weight ngay từ index, không phải tra lại khóa chính.
+-- Database tạo search_terms từ bản create_search_terms_table.sql mới đã có sẵn index này.
+
+ALTER TABLE search_terms
+    DROP INDEX idx_search_terms_entity,
+    ADD INDEX idx_search_terms_entity (entity_type, entity_id, term, weight);
@@ -0,0 +1,21 @@
+-- Migration: Create calendar_syncs table
+-- Date: 2026-10-18
+-- Trạng thái đồng bộ Google Calendar theo homestay: sync token, event đã đồng bộ và các ngày đang bị chặn do lịch ngoài.
+
+CREATE TABLE IF NOT EXISTS calendar_syncs (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    homestay_id BIGINT NOT NULL,
+    provider VARCHAR(20) NOT NULL DEFAULT 'google',
+    calendar_id VARCHAR(255) NOT NULL,
+    sync_token VARCHAR(512),
+    events JSON,
+    blocked_dates JSON,
+    status VARCHAR(20) DEFAULT 'idle',
+    last_error TEXT,
+    last_synced_at DATETIME,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (homestay_id) REFERENCES homestays(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_calendar_sync_homestay_calendar (homestay_id, provider, calendar_id),
+    INDEX idx_homestay (homestay_id)
+);
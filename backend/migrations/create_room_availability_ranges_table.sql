@@ -0,0 +1,46 @@
+-- Migration: Range-encoded room availability
+-- Date: 2026-10-18
+-- Thay bảng room_availability (mỗi phòng mỗi ngày một dòng) bằng room_availability_ranges:
+-- mỗi dòng là khoảng [start_date, end_date) có cùng is_available, price_override, min_nights.
+-- Chạy sau add_room_availability_unique_room_date.sql. Cần MySQL 8 (window function).
+
+CREATE TABLE IF NOT EXISTS room_availability_ranges (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    room_id BIGINT NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    is_available BOOLEAN DEFAULT TRUE,
+    price_override DECIMAL(10, 2),
+    min_nights INT DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (room_id) REFERENCES homestay_rooms(id),
+    INDEX idx_room_availability_range (room_id, start_date, end_date)
+);
+
+-- Gộp các ngày liên tiếp cùng trạng thái thành một khoảng (gaps and islands):
+-- trong mỗi nhóm cùng thuộc tính, date - ROW_NUMBER() không đổi trên một dãy ngày liên tiếp.
+INSERT INTO room_availability_ranges (room_id, start_date, end_date, is_available, price_override, min_nights, created_at)
+SELECT
+    room_id,
+    MIN(date),
+    DATE_ADD(MAX(date), INTERVAL 1 DAY),
+    is_available,
+    price_override,
+    min_nights,
+    MIN(created_at)
+FROM (
+    SELECT
+        ra.*,
+        DATE_SUB(ra.date, INTERVAL ROW_NUMBER() OVER (
+            PARTITION BY ra.room_id, ra.is_available, ra.price_override, ra.min_nights
+            ORDER BY ra.date
+        ) DAY) AS island
+    FROM room_availability ra
+) days
+GROUP BY room_id, is_available, price_override, min_nights, island;
+
+-- Giữ bảng cũ để đối chiếu, có thể xóa sau khi kiểm tra
+RENAME TABLE room_availability TO room_availability_legacy;
+
+-- Bitmap occupancy sẽ tự dựng lại từ bảng mới
+DELETE FROM room_occupancy;
@@ -0,0 +1,17 @@
+-- Migration: Create room_occupancy table
+-- Date: 2026-10-18
+-- Bitmap chiếm chỗ theo ngày (1 bit/ngày, cửa sổ 730 ngày từ đầu tháng hiện tại).
+-- Dòng theo phòng: kind = blocked | open; dòng theo homestay (room_id NULL): kind = confirmed | pending | held.
+-- Bảng được dựng lại tự động khi đọc nếu chưa có dữ liệu hoặc cửa sổ đã trượt sang tháng mới.
+
+CREATE TABLE IF NOT EXISTS room_occupancy (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    homestay_id BIGINT NOT NULL,
+    room_id BIGINT NULL,
+    kind VARCHAR(20) NOT NULL,
+    window_start DATE NOT NULL,
+    bits BLOB NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (homestay_id) REFERENCES homestays(id) ON DELETE CASCADE,
+    INDEX idx_homestay (homestay_id)
+);
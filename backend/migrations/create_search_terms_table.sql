@@ -0,0 +1,15 @@
+-- Migration: Create search_terms table
+-- Date: 2026-10-18
+-- Chỉ mục đảo cho tìm kiếm homestay/điểm đến: mỗi dòng là một từ đã bỏ dấu tiếng Việt kèm trọng số trường.
+-- Được cập nhật tự động khi ghi Homestay/Destination qua ORM (app/services/search.py).
+-- Sau khi chạy migration, gọi POST /admin/search/reindex để dựng chỉ mục cho dữ liệu hiện có
+-- (việc bỏ dấu dùng cùng logic Python với seo.generate_slug nên không làm bằng SQL).
+
+CREATE TABLE IF NOT EXISTS search_terms (
+    entity_type VARCHAR(20) NOT NULL,
+    term VARCHAR(64) NOT NULL,
+    entity_id BIGINT NOT NULL,
+    weight INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (entity_type, term, entity_id),
+    INDEX idx_search_terms_entity (entity_type, entity_id, term, weight)
+) ENGINE=InnoDB DEFAULT CHARSET=ascii COLLATE=ascii_bin;
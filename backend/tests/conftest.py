@@ -0,0 +1,101 @@
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import BigInteger, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db as app_db
+import app.models  # noqa: F401 - đăng ký toàn bộ model vào Base.metadata
+from app.db import Base, get_db, get_read_db
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite chỉ tự tăng khóa chính kiểu INTEGER
+    return "INTEGER"
+
+@pytest.fixture
+def engine():
+    """SQLite trong bộ nhớ, dùng chung một kết nối cho mọi session và thread của test"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    # Job nền (đồng bộ lịch, snapshot...) tự mở SessionLocal
+    app_db.SessionLocal.configure(bind=engine)
+    yield engine
+    app_db.SessionLocal.configure(bind=app_db.engine)
+    engine.dispose()
+
+@pytest.fixture
+def Session(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+@pytest.fixture
+def db(Session):
+    session = Session()
+    yield session
+    session.close()
+
+@pytest.fixture
+def queries(engine):
+    """Danh sách câu SQL đã chạy; gọi queries.clear() ngay trước đoạn cần đếm"""
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    yield statements
+    event.remove(engine, "before_cursor_execute", _count)
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Cache và snapshot trong tiến trình không được mang dữ liệu từ test này sang test khác"""
+    from app.services.availability_engine import quick_availability_cache
+    from app.services.facets import facet_cache
+    from app.services.ical import feed_cache
+    from app.services.homestay_page import page_cache
+    from app.services.pagination import count_cache
+    from app.services.search import term_frequencies
+    from app.services.snapshots import featured_destinations, featured_homestays
+
+    for cache in (quick_availability_cache, facet_cache, page_cache, count_cache, term_frequencies, feed_cache):
+        cache.clear()
+    for snapshot in (featured_homestays, featured_destinations):
+        snapshot.items = None
+    yield
+
+@pytest.fixture(autouse=True)
+def background_rebuilds(monkeypatch):
+    """Homestay được hẹn dựng lại bitmap occupancy ở nền; test gọi rebuild_if_stale khi cần"""
+    from app.services import occupancy
+
+    scheduled = []
+    monkeypatch.setattr(occupancy, "rebuild_in_background", scheduled.append)
+    return scheduled
+
+@pytest.fixture
+def make_client(Session):
+    """TestClient cho một app chỉ gồm các router cần test, dùng database của test"""
+    def make(*routers):
+        app = FastAPI()
+        for router, prefix in routers:
+            app.include_router(router, prefix=prefix)
+
+        def override_db():
+            session = Session()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app.dependency_overrides[get_db] = override_db
+        app.dependency_overrides[get_read_db] = override_db
+        return TestClient(app)
+
+    return make
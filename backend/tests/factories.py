@@ -0,0 +1,44 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List, Tuple
+
+from app.models import Booking, Homestay, HomestayRoom, RoomAvailability, RoomCategory, User
+
+def make_host(db, email: str = "host@example.com") -> User:
+    host = User(name="Host", email=email, password="x", role="host", created_at=datetime.now())
+    db.add(host)
+    db.flush()
+    return host
+
+def make_homestay(db, rooms: int = 3, host: User = None, **fields) -> Tuple[Homestay, List[HomestayRoom]]:
+    """Homestay đang hoạt động kèm `rooms` phòng cùng một loại phòng"""
+    host = host or make_host(db, email=f"host{db.query(User).count()}@example.com")
+    category = RoomCategory(name="Double", slug=f"double-{host.id}", base_price=Decimal("500000"), max_guests=2)
+    db.add(category)
+    db.flush()
+    values = dict(name="Nhà Đà Lạt", price_per_night=Decimal("400000"), max_guests=4, host_id=host.id,
+                  status="active", is_active=True)
+    values.update(fields)
+    homestay = Homestay(**values)
+    db.add(homestay)
+    db.flush()
+    homestay_rooms = [
+        HomestayRoom(homestay_id=homestay.id, room_category_id=category.id, room_number=str(number + 1), is_available=True)
+        for number in range(rooms)
+    ]
+    db.add_all(homestay_rooms)
+    db.flush()
+    return homestay, homestay_rooms
+
+def block_range(db, room: HomestayRoom, start: date, nights: int, price=None, is_available: bool = False):
+    db.add(RoomAvailability(room_id=room.id, start_date=start, end_date=start + timedelta(days=nights),
+                            is_available=is_available, price_override=price))
+    db.flush()
+
+def book(db, homestay: Homestay, check_in: date, nights: int, status: str = "confirmed") -> Booking:
+    booking = Booking(booking_code=f"B{db.query(Booking).count() + 1}", homestay_id=homestay.id, check_in=check_in,
+                      check_out=check_in + timedelta(days=nights), guests=2, total_price=Decimal("1000000"),
+                      status=status, guest_details={"name": "Khách"})
+    db.add(booking)
+    db.flush()
+    return booking
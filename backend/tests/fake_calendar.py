@@ -0,0 +1,60 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class FakeCalendar:
+    """Google Calendar API giả lập: event và nhật ký thay đổi; sync token là vị trí trong nhật ký"""
+
+    def __init__(self, access_token: str = "token"):
+        self.access_token = access_token
+        self.events = {}
+        self.log = []
+        self.requests = []
+
+    def put(self, event_id: str, start: str, end: str, status: str = "confirmed"):
+        self.events[event_id] = {"id": event_id, "status": status, "start": {"date": start}, "end": {"date": end}}
+        self.log.append(event_id)
+
+    def cancel(self, event_id: str):
+        self.events[event_id]["status"] = "cancelled"
+        self.log.append(event_id)
+
+    def list_events(self, params):
+        token = params.get("syncToken")
+        if token:
+            ids = list(dict.fromkeys(self.log[int(token):]))
+        else:
+            ids = [event_id for event_id, event in self.events.items() if event["status"] != "cancelled"]
+        size = int(params.get("maxResults", 250))
+        offset = int(params.get("pageToken", 0))
+        body = {"items": [self.events[event_id] for event_id in ids[offset:offset + size]]}
+        if offset + size < len(ids):
+            body["nextPageToken"] = str(offset + size)
+        else:
+            body["nextSyncToken"] = str(len(self.log))
+        return body
+
+def serve(calendar: FakeCalendar):
+    """Chạy server trên cổng ngẫu nhiên; trả về (base_url, server)"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+            calendar.requests.append(params)
+            if self.headers.get("Authorization") != f"Bearer {calendar.access_token}":
+                self.send_response(401)
+                self.end_headers()
+                return
+            data = json.dumps(calendar.list_events(params)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server
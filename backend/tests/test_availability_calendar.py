@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+from app.routes import availability
+from tests.factories import block_range, book, make_homestay
+
+YEAR, MONTH = 2030, 5
+
+def calendar(client, homestay_id, **params):
+    response = client.get(f"/api/availability/calendar/{homestay_id}", params={"year": YEAR, "month": MONTH, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def test_calendar_query_count_does_not_grow_with_rooms_or_days(db, make_client, queries):
+    client = make_client((availability.router, "/api"))
+    small, _ = make_homestay(db, rooms=1)
+    large, rooms = make_homestay(db, rooms=8)
+    first = date(YEAR, MONTH, 1)
+    for offset, room in enumerate(rooms):
+        block_range(db, room, first + timedelta(days=offset), 2)
+        block_range(db, room, first + timedelta(days=10 + offset), 3, price=650000, is_available=True)
+    for week in range(4):
+        book(db, large, first + timedelta(days=7 * week + 3), 2)
+    small_id, large_id, room_id = small.id, large.id, rooms[0].id
+    db.commit()
+
+    queries.clear()
+    calendar(client, small_id)
+    baseline = len(queries)
+
+    queries.clear()
+    data = calendar(client, large_id)
+    # Homestay, phòng, khoảng RoomAvailability, booking
+    assert len(queries) == baseline == 4
+    assert len(data["days"]) == 31
+    assert data["days"][3]["status"] == "booked"
+
+    queries.clear()
+    calendar(client, large_id, room_id=room_id)
+    assert len(queries) == 4
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from app.models import RoomAvailability
+from app.services.bulk_availability import block_room_days, unblock_room_days
+from tests.factories import make_homestay
+
+def days(start: date, count: int):
+    return [start + timedelta(days=offset) for offset in range(count)]
+
+def test_paint_locks_rooms_before_reading_ranges(db):
+    homestay, rooms = make_homestay(db, rooms=2)
+    homestay_id, room_ids = homestay.id, [room.id for room in reversed(rooms)]
+    db.commit()
+    executed = []
+
+    @event.listens_for(db, "do_orm_execute")
+    def _record(state):
+        if state.is_select:
+            tables = [table.name for table in state.statement.get_final_froms()]
+            executed.append((tables, state.statement._for_update_arg is not None))
+
+    block_room_days(db, homestay_id, room_ids, days(date(2030, 3, 1), 3))
+
+    assert executed[:2] == [(["homestay_rooms"], True), (["room_availability_ranges"], True)]
+
+def test_ranges_stay_disjoint_after_overlapping_paints(db):
+    homestay, rooms = make_homestay(db, rooms=1)
+    room_id = rooms[0].id
+    first = date(2030, 3, 1)
+
+    block_room_days(db, homestay.id, [room_id], days(first, 5))
+    unblock_room_days(db, homestay.id, [room_id], [first + timedelta(days=2)])
+    block_room_days(db, homestay.id, [room_id], days(first + timedelta(days=4), 3))
+    db.commit()
+
+    ranges = db.query(RoomAvailability).filter(RoomAvailability.room_id == room_id).order_by(RoomAvailability.start_date).all()
+    for previous, current in zip(ranges, ranges[1:]):
+        assert previous.end_date <= current.start_date
+    assert [(r.start_date.day, r.end_date.day, r.is_available) for r in ranges] == [
+        (1, 3, False), (3, 4, True), (4, 8, False)
+    ]
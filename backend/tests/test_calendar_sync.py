@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.models import Booking, CalendarSync
+from app.services.availability_engine import load_overrides
+from app.services.bulk_availability import block_homestay_days, block_room_days
+from app.services.calendar_sync import is_running, run_calendar_sync
+from tests.factories import make_homestay
+from tests.fake_calendar import FakeCalendar, serve
+
+@pytest.fixture
+def calendar(monkeypatch):
+    fake = FakeCalendar()
+    base_url, server = serve(fake)
+    monkeypatch.setattr(settings, "GOOGLE_CALENDAR_API_URL", base_url)
+    monkeypatch.setattr(settings, "CALENDAR_SYNC_PAGE_SIZE", 2)
+    yield fake
+    server.shutdown()
+
+def day(offset: int) -> date:
+    return date.today() + timedelta(days=offset)
+
+def add_sync(db, homestay_id: int) -> int:
+    state = CalendarSync(homestay_id=homestay_id, calendar_id="host@example.com", status="idle")
+    db.add(state)
+    db.commit()
+    return state.id
+
+def sync(Session, sync_id: int, token: str = "token") -> CalendarSync:
+    run_calendar_sync(sync_id, token)
+    session = Session()
+    state = session.get(CalendarSync, sync_id)
+    session.close()
+    return state
+
+def blocked_cells(Session, room_ids, days):
+    session = Session()
+    overrides = load_overrides(session, room_ids, min(days), max(days) + timedelta(days=1))
+    session.close()
+    return {
+        (room_id, d) for room_id in room_ids for d in days
+        if (record := overrides.get(room_id, d)) is not None and not record.is_available
+    }
+
+def test_sync_only_unblocks_cells_it_blocked(db, Session, calendar):
+    homestay, rooms = make_homestay(db, rooms=2)
+    homestay_id, room_ids = homestay.id, [room.id for room in rooms]
+    # Chủ nhà tự chặn phòng đầu tiên ngày 10
+    block_room_days(db, homestay_id, room_ids[:1], [day(10)])
+    db.commit()
+    sync_id = add_sync(db, homestay_id)
+
+    for index in range(3):
+        calendar.put(f"other-{index}", day(30 + 3 * index).isoformat(), day(31 + 3 * index).isoformat())
+    calendar.put("stay", day(10).isoformat(), day(12).isoformat())
+    state = sync(Session, sync_id)
+    assert state.status == "success"
+    # Bốn event, hai trang kết quả với maxResults=2
+    assert len(calendar.requests) == 2
+    assert blocked_cells(Session, room_ids, [day(10), day(11)]) == {
+        (room_id, d) for room_id in room_ids for d in (day(10), day(11))
+    }
+
+    calendar.cancel("stay")
+    calendar.requests.clear()
+    state = sync(Session, sync_id)
+    assert state.status == "success"
+    assert calendar.requests[0]["syncToken"]
+    assert blocked_cells(Session, room_ids, [day(10), day(11)]) == {(room_ids[0], day(10))}
+    assert blocked_cells(Session, room_ids, [day(30)]) == {(room_id, day(30)) for room_id in room_ids}
+
+def test_sync_keeps_manual_blocks_of_homestay_without_rooms(db, Session, calendar):
+    homestay, _ = make_homestay(db, rooms=0)
+    homestay_id = homestay.id
+    block_homestay_days(db, homestay_id, [day(5)])
+    db.commit()
+    sync_id = add_sync(db, homestay_id)
+
+    calendar.put("stay", day(5).isoformat(), day(7).isoformat())
+    sync(Session, sync_id)
+    calendar.cancel("stay")
+    sync(Session, sync_id)
+
+    session = Session()
+    blocked = sorted(check_in for (check_in,) in session.query(Booking.check_in).filter(
+        Booking.homestay_id == homestay_id, Booking.status == "blocked"
+    ))
+    session.close()
+    assert blocked == [day(5)]
+
+def test_failed_sync_does_not_stay_running(db, Session, calendar):
+    homestay, _ = make_homestay(db, rooms=1)
+    sync_id = add_sync(db, homestay.id)
+
+    state = sync(Session, sync_id, token="wrong")
+
+    assert state.status == "failed"
+    assert "401" in state.last_error
+    assert not is_running(state)
+
+def test_stale_running_state_expires():
+    now = datetime(2030, 1, 1, 12, 0)
+    state = CalendarSync(status="running", started_at=now - timedelta(seconds=60))
+    assert is_running(state, now)
+    state.started_at = now - timedelta(seconds=settings.CALENDAR_SYNC_STALE_SECONDS + 1)
+    assert not is_running(state, now)
@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.pool_metrics import PoolMetrics, instrument, metered_pool
+from app.replica import ReplicaRouter
+
+def metered_engine(path, metrics):
+    engine = create_engine(f"sqlite:///{path}", poolclass=metered_pool(metrics), pool_size=1, max_overflow=2)
+    instrument(engine, metrics, "idle", 30)
+    return engine
+
+def use(engine, times):
+    for _ in range(times):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+def test_each_engine_reports_its_own_pool(tmp_path):
+    primary_metrics, replica_metrics = PoolMetrics(max_overflow=2), PoolMetrics(max_overflow=2)
+    primary = metered_engine(tmp_path / "primary.db", primary_metrics)
+    replica = metered_engine(tmp_path / "replica.db", replica_metrics)
+
+    use(primary, 3)
+    use(replica, 1)
+    assert primary_metrics.snapshot(primary.pool)["checkout_wait_ms"]["count"] == 3
+    assert replica_metrics.snapshot(replica.pool)["checkout_wait_ms"]["count"] == 1
+    assert replica_metrics.snapshot(replica.pool)["pool"]["max_overflow"] == 2
+
+    # dispose() tạo pool mới cùng lớp, số liệu vẫn ghi vào metrics cũ
+    primary.dispose()
+    use(primary, 1)
+    assert primary_metrics.checkouts == 4
+    assert primary_metrics.connects == 2
+
+def test_replica_status_does_not_probe(tmp_path):
+    probes = []
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    router = ReplicaRouter(None, replica, max_lag=5, check_interval=60, lag_probe=lambda connection: probes.append(1) or 1.0)
+
+    status = router.status()
+    assert probes == [] and status["usable"] is False and status["checked_seconds_ago"] is None
+    assert "error" not in status
+
+    assert router.replica_usable()
+    status = router.status(include_error=True)
+    assert len(probes) == 1 and status["usable"] is True and status["error"] is None
+
+def test_pool_metrics_endpoint_requires_admin():
+    import main
+
+    response = TestClient(main.app).get("/metrics/db-pool")
+    assert response.status_code in (401, 403)
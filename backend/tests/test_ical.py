@@ -0,0 +1,118 @@
+import socket
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from app.config import settings
+from app.models import RoomOccupancy
+from app.routes import availability
+from app.services import ical
+from app.services.ical import UnsafeFeedURL, fetch_feed, validate_feed_url
+from app.services.occupancy import rebuild_if_stale
+from tests.factories import book, make_homestay
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/feed.ics",
+    "http://127.0.0.1/feed.ics",
+    "http://localhost:8000/feed.ics",
+    "http://10.1.2.3/feed.ics",
+    "http://192.168.1.10/feed.ics",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/feed.ics",
+    "http://[::ffff:127.0.0.1]/feed.ics",
+    "http://0.0.0.0/feed.ics",
+])
+def test_feed_url_to_internal_address_is_rejected(url):
+    with pytest.raises(UnsafeFeedURL):
+        validate_feed_url(url)
+
+def test_public_feed_url_is_allowed():
+    validate_feed_url("https://93.184.216.34/calendar.ics")
+
+def make_response(status_code, headers=None, text=""):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = text.encode()
+    return response
+
+class SentRequests(list):
+    responses: list
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Request đã gửi qua adapter (URL, header Host, SNI); phản hồi lấy lần lượt từ sent.responses"""
+    sent = SentRequests()
+    sent.responses = []
+
+    def send(adapter, request, **kwargs):
+        sent.append((request.url, request.headers["Host"], adapter.hostname))
+        return sent.responses.pop(0)
+
+    monkeypatch.setattr(ical._PinnedAdapter, "send", send)
+    return sent
+
+@pytest.fixture
+def rebinding_dns(monkeypatch):
+    """feed.example phân giải ra địa chỉ công khai lần đầu, các lần sau ra 127.0.0.1"""
+    answers = ["93.184.216.34"]
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        address = answers.pop(0) if answers else "127.0.0.1"
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))]
+
+    monkeypatch.setattr(ical.socket, "getaddrinfo", getaddrinfo)
+
+def test_feed_is_fetched_from_the_validated_address(sent, rebinding_dns):
+    sent.responses.append(make_response(200, text="BEGIN:VCALENDAR"))
+    assert fetch_feed("https://feed.example/calendar.ics", {}).status_code == 200
+    # Kết nối tới IP đã kiểm tra, không phân giải lại hostname; Host và SNI vẫn là hostname gốc
+    assert sent == [("https://93.184.216.34/calendar.ics", "feed.example", "feed.example")]
+
+def test_redirect_to_internal_address_is_not_followed(sent):
+    sent.responses.append(make_response(302, {"Location": "http://169.254.169.254/latest/meta-data/"}))
+    with pytest.raises(UnsafeFeedURL):
+        fetch_feed("https://93.184.216.34/calendar.ics", {})
+    assert [url for url, _, _ in sent] == ["https://93.184.216.34/calendar.ics"]
+
+def test_last_modified_is_converted_from_database_timezone(db, make_client, monkeypatch):
+    monkeypatch.setattr(settings, "DB_TIMEZONE", "Asia/Ho_Chi_Minh")
+    homestay, _ = make_homestay(db, rooms=1)
+    book(db, homestay, date.today() + timedelta(days=2), 2)
+    db.commit()
+    homestay_id = homestay.id
+    rebuild_if_stale(homestay_id)
+    # NOW() của MySQL theo giờ Việt Nam (UTC+7)
+    written = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=23)
+    db.query(RoomOccupancy).update({"updated_at": written})
+    db.commit()
+
+    client = make_client((availability.router, "/api"))
+    response = client.get(f"/api/availability/ical/{homestay_id}.ics")
+
+    expected = (written - timedelta(hours=7)).replace(tzinfo=timezone.utc)
+    start_of_day = datetime.combine(date.today(), datetime.min.time()).astimezone(timezone.utc)
+    assert response.status_code == 200
+    assert response.headers["Last-Modified"] == format_datetime(max(expected, start_of_day), usegmt=True)
+
+    not_modified = client.get(
+        f"/api/availability/ical/{homestay_id}.ics",
+        headers={"If-Modified-Since": response.headers["Last-Modified"]}
+    )
+    assert not_modified.status_code == 304
+
+def test_transient_bitmap_has_no_last_modified(db, make_client):
+    homestay, _ = make_homestay(db, rooms=1)
+    book(db, homestay, date.today() + timedelta(days=2), 2)
+    db.commit()
+    homestay_id = homestay.id
+
+    client = make_client((availability.router, "/api"))
+    # Chưa dựng RoomOccupancy: feed dựng từ bitmap tạm, không có thời điểm sửa đổi đáng tin
+    tomorrow = format_datetime(datetime.now(timezone.utc) + timedelta(days=1), usegmt=True)
+    response = client.get(f"/api/availability/ical/{homestay_id}.ics", headers={"If-Modified-Since": tomorrow})
+    assert response.status_code == 200
+    assert "Last-Modified" not in response.headers
+    assert "BEGIN:VEVENT" in response.text
@@ -0,0 +1,69 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, desc, func
+from sqlalchemy.orm import Session
+
+from app.models import Booking, Homestay, HomestayRoom, Payment, Review, RoomAvailability, SEOMetadata
+from app.services.availability_engine import BLOCKING_BOOKING_STATUSES
+
+# Database MySQL đã chạy migration, ví dụ mysql+pymysql://root:@127.0.0.1:3306/homestay_booking
+MYSQL_URL = os.getenv("TEST_MYSQL_URL", "")
+
+pytestmark = pytest.mark.skipif(not MYSQL_URL, reason="TEST_MYSQL_URL chưa được cấu hình")
+
+START = date.today()
+END = START + timedelta(days=30)
+
+# Các truy vấn lọc nóng, cùng dạng với code trong app/
+HOT_QUERIES = {
+    "bookings trùng lịch": lambda db: db.query(Booking.id).filter(
+        Booking.homestay_id == 1,
+        Booking.status.in_(BLOCKING_BOOKING_STATUSES),
+        Booking.check_in < END,
+        Booking.check_out > START
+    ),
+    "khoảng trống phòng": lambda db: db.query(RoomAvailability).filter(
+        RoomAvailability.room_id.in_([1, 2, 3]),
+        RoomAvailability.start_date < END,
+        RoomAvailability.end_date > START
+    ),
+    "review đã duyệt": lambda db: db.query(Review.rating).filter(
+        Review.homestay_id == 1,
+        Review.is_approved == True
+    ),
+    "phòng còn trống của homestay": lambda db: db.query(HomestayRoom.id).filter(
+        HomestayRoom.homestay_id == 1,
+        HomestayRoom.is_available == True
+    ),
+    "doanh thu tháng": lambda db: db.query(func.sum(Payment.amount)).filter(
+        Payment.status == 'paid',
+        Payment.created_at >= datetime.now().replace(day=1)
+    ),
+    "SEO metadata": lambda db: db.query(SEOMetadata).filter(
+        SEOMetadata.entity_type == 'homestay',
+        SEOMetadata.entity_id == 1
+    ),
+    "homestay featured": lambda db: db.query(Homestay.id).filter(
+        Homestay.is_active == True,
+        Homestay.status == 'active',
+        Homestay.featured == True
+    ).order_by(desc(Homestay.created_at)).limit(20),
+}
+
+@pytest.fixture(scope="module")
+def mysql_db():
+    engine = create_engine(MYSQL_URL)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_an_index(mysql_db, name):
+    query = HOT_QUERIES[name](mysql_db)
+    statement = query.statement.compile(dialect=mysql_db.bind.dialect, compile_kwargs={"literal_binds": True})
+    rows = mysql_db.connection().exec_driver_sql(f"EXPLAIN {statement}").mappings().all()
+    # type = ALL: MySQL quét toàn bảng
+    scans = [f"{row['table']}: type={row['type']} key={row['key']}" for row in rows if row["type"] == "ALL"]
+    assert not scans, f"{name} quét toàn bảng: {scans}"
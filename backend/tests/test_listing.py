@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from app.models import Amenity, Category, Destination, HomestayImage, Review, User
+from app.routes import destinations, homestays
+from app.services.pagination import count_cache
+from tests.factories import make_homestay
+
+def seed(db, count, destination=None):
+    """`count` homestay khác chủ, mỗi cái có danh mục, ảnh, tiện ích và review"""
+    category = Category(name="Villa", slug="villa")
+    amenities = [Amenity(name="Wifi", icon="wifi"), Amenity(name="Hồ bơi", icon="pool")]
+    guest = User(name="Khách", email=f"guest{db.query(User).count()}@example.com", password="x", role="user",
+                 created_at=datetime.now())
+    db.add_all([category, guest, *amenities])
+    db.flush()
+    for number in range(count):
+        homestay, _ = make_homestay(db, rooms=1, name=f"Nhà {number}", category_id=category.id,
+                                    destination_id=destination.id if destination else None)
+        homestay.amenities = amenities
+        db.add_all([HomestayImage(homestay_id=homestay.id, image_path=f"/img/{homestay.id}-{index}.jpg")
+                    for index in range(3)])
+        db.add(Review(user_id=guest.id, homestay_id=homestay.id, rating=5, comment="Tốt"))
+    db.flush()
+
+def make_destination(db, slug):
+    destination = Destination(name=slug.title(), slug=slug, province="Lâm Đồng", is_active=True)
+    db.add(destination)
+    db.flush()
+    return destination
+
+def count_queries(client, queries, url, **params):
+    """Số câu SQL của một request khi cache COUNT còn trống"""
+    count_cache.clear()
+    queries.clear()
+    response = client.get(url, params=params)
+    assert response.status_code == 200
+    return len(queries), response.json()
+
+def test_homestay_list_query_count_does_not_grow_with_page_size(db, make_client, queries):
+    client = make_client((homestays.router, ""))
+    seed(db, 30)
+    db.commit()
+
+    small, data = count_queries(client, queries, "/homestays/", limit=2)
+    assert len(data["homestays"]) == 2
+    large, data = count_queries(client, queries, "/homestays/", limit=30)
+    assert len(data["homestays"]) == 30
+    assert data["homestays"][0]["images"] and data["homestays"][0]["amenities"]
+    # Trang homestay, category, ảnh, tiện ích, chủ nhà, COUNT
+    assert small == large == 6
+
+def test_featured_homestays_built_once_then_served_from_snapshot(db, make_client, queries):
+    client = make_client((homestays.router, ""))
+    seed(db, 3)
+    db.commit()
+
+    first, data = count_queries(client, queries, "/homestays/featured/list")
+    assert len(data["homestays"]) == 3
+    # Homestay featured, homestay bổ sung, category, ảnh, tiện ích
+    assert first == 5
+    again, _ = count_queries(client, queries, "/homestays/featured/list")
+    assert again == 0
+
+def test_destination_homestays_query_count_does_not_grow_with_page_size(db, make_client, queries):
+    client = make_client((destinations.router, ""))
+    destination = make_destination(db, "da-lat")
+    seed(db, 30, destination)
+    destination_id = destination.id
+    db.commit()
+
+    small, _ = count_queries(client, queries, f"/destinations/{destination_id}/homestays", limit=2)
+    large, data = count_queries(client, queries, f"/destinations/{destination_id}/homestays", limit=30)
+    assert len(data["homestays"]) == 30
+    # Điểm đến, trang homestay, category, ảnh, tiện ích, COUNT
+    assert small == large == 6
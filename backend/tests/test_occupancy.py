@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models import RoomOccupancy
+from app.services.occupancy import current_window_start, load_occupancy, mark_room_days, rebuild_if_stale
+from tests.factories import book, make_homestay
+
+def writes(statements):
+    return [sql for sql in statements if sql.lstrip().split()[0].upper() in ("INSERT", "UPDATE", "DELETE")]
+
+def test_read_without_bitmap_does_not_write(db, queries, background_rebuilds):
+    homestay, rooms = make_homestay(db, rooms=2)
+    check_in = date.today() + timedelta(days=5)
+    book(db, homestay, check_in, 2)
+    db.commit()
+    homestay_id = homestay.id
+
+    queries.clear()
+    occupancy = load_occupancy(db, homestay_id, check_in, check_in + timedelta(days=3))
+
+    assert writes(queries) == []
+    assert db.query(RoomOccupancy).count() == 0
+    assert background_rebuilds == [homestay_id]
+    assert occupancy.booking_status(check_in) == "confirmed"
+    assert occupancy.booking_status(check_in + timedelta(days=2)) is None
+
+def test_rebuild_is_idempotent_and_keeps_one_row_per_key(db, Session):
+    homestay, rooms = make_homestay(db, rooms=2)
+    db.commit()
+    homestay_id = homestay.id
+
+    rebuild_if_stale(homestay_id)
+    first = {(row.room_id, row.kind): row.id for row in db.query(RoomOccupancy)}
+    # 2 phòng × (blocked, open) + 3 dòng booking
+    assert len(first) == 7
+
+    # Cửa sổ trượt sang tháng mới: ghi đè đúng các dòng cũ
+    db.query(RoomOccupancy).update({"window_start": current_window_start() - timedelta(days=31)})
+    db.commit()
+    rebuild_if_stale(homestay_id)
+    rebuild_if_stale(homestay_id)
+
+    db.expire_all()
+    rows = db.query(RoomOccupancy).all()
+    assert {(row.room_id, row.kind): row.id for row in rows} == first
+    assert {row.window_start for row in rows} == {current_window_start()}
+
+def test_homestay_level_rows_are_unique(db):
+    homestay, _ = make_homestay(db, rooms=0)
+    row = dict(homestay_id=homestay.id, room_id=None, kind="confirmed", window_start=current_window_start(), bits=b"\0")
+    db.add(RoomOccupancy(**row))
+    db.flush()
+    db.add(RoomOccupancy(**row))
+    with pytest.raises(IntegrityError):
+        db.flush()
+
+def test_room_marks_update_the_row_reads_use(db):
+    homestay, rooms = make_homestay(db, rooms=1)
+    db.commit()
+    homestay_id, room_id = homestay.id, rooms[0].id
+    rebuild_if_stale(homestay_id)
+
+    day = date.today() + timedelta(days=3)
+    mark_room_days(db, homestay_id, [(room_id, day)], False)
+    db.commit()
+
+    assert db.query(RoomOccupancy).count() == 5
+    assert load_occupancy(db, homestay_id, day, day + timedelta(days=1)).room_state(room_id, day) is False
@@ -0,0 +1,63 @@
+from app.models import Destination
+from app.routes import destinations, homestays
+from app.services.pagination import count_cache
+from tests.factories import make_homestay
+
+def names(client, url, search):
+    response = client.get(url, params={"search": search})
+    assert response.status_code == 200
+    return [item["name"] for item in response.json()[url.strip("/")]]
+
+def test_search_folds_diacritics_and_ranks_name_matches_first(db, make_client):
+    client = make_client((homestays.router, ""))
+    make_homestay(db, name="Villa Sa Pa", description="Gần thác, cách Đà Lạt xa")
+    make_homestay(db, name="Nhà gỗ Đà Lạt", address="Phường 3, Lâm Đồng")
+    make_homestay(db, name="Căn hộ Huế", description="Yên tĩnh")
+    db.commit()
+
+    assert names(client, "/homestays/", "da lat") == ["Nhà gỗ Đà Lạt", "Villa Sa Pa"]
+    assert names(client, "/homestays/", "ĐÀ LẠT") == ["Nhà gỗ Đà Lạt", "Villa Sa Pa"]
+    # Từ cuối khớp theo tiền tố, mọi từ đều phải có
+    assert names(client, "/homestays/", "lam d") == ["Nhà gỗ Đà Lạt"]
+    assert names(client, "/homestays/", "hue lat") == []
+
+def test_search_index_follows_updates_and_deletes(db, make_client):
+    client = make_client((homestays.router, ""))
+    homestay, _ = make_homestay(db, name="Nhà Mộc Châu")
+    db.commit()
+    assert names(client, "/homestays/", "moc chau") == ["Nhà Mộc Châu"]
+
+    homestay.name = "Nhà Tam Đảo"
+    db.commit()
+    count_cache.clear()
+    assert names(client, "/homestays/", "moc chau") == []
+    assert names(client, "/homestays/", "tam dao") == ["Nhà Tam Đảo"]
+
+    db.delete(homestay)
+    db.commit()
+    count_cache.clear()
+    assert names(client, "/homestays/", "tam dao") == []
+
+def test_term_frequencies_are_counted_once(db, make_client, queries):
+    client = make_client((homestays.router, ""))
+    make_homestay(db, name="Nhà Đà Lạt")
+    db.commit()
+
+    queries.clear()
+    names(client, "/homestays/", "da lat")
+    first = len(queries)
+    count_cache.clear()
+    queries.clear()
+    names(client, "/homestays/", "da lat")
+    assert len(queries) == first - 1
+
+def test_destination_search_uses_index(db, make_client):
+    client = make_client((destinations.router, ""))
+    db.add_all([
+        Destination(name="Đà Lạt", slug="da-lat", province="Lâm Đồng", is_active=True),
+        Destination(name="Hội An", slug="hoi-an", province="Quảng Nam", is_active=True),
+    ])
+    db.commit()
+
+    assert names(client, "/destinations/", "lam dong") == ["Đà Lạt"]
+    assert names(client, "/destinations/", "hoi") == ["Hội An"]
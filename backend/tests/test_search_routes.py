@@ -0,0 +1,17 @@
+from app.routes import search
+from app.services.autocomplete import autocomplete_index
+from tests.factories import make_homestay
+
+def test_search_routes_live_under_api_prefix(db, make_client):
+    # main.py mount router tìm kiếm không kèm prefix, đường dẫn /api/search nằm trong router
+    client = make_client((search.router, ""))
+    make_homestay(db, name="Nhà Đà Lạt")
+    db.commit()
+    autocomplete_index.rebuild(db)
+
+    response = client.get("/api/search/autocomplete", params={"q": "lat"})
+    assert response.status_code == 200
+    assert [suggestion["label"] for suggestion in response.json()["suggestions"]] == ["Nhà Đà Lạt"]
+
+    assert client.get("/api/search/nearby", params={"lat": 11.94, "lng": 108.44}).status_code == 200
+    assert client.get("/search/autocomplete", params={"q": "lat"}).status_code == 404
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+from app.services import snapshots
+from app.services.snapshots import Snapshot
+
+def test_failed_refresh_keeps_items_and_stays_stale(db):
+    builds = iter([[{"id": 1}], RuntimeError("database down")])
+
+    def build(session):
+        result = next(builds)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    snapshot = Snapshot("test", build, max_age=300)
+    assert snapshot.get(db) == [{"id": 1}]
+    snapshot.mark_stale()
+
+    with pytest.raises(RuntimeError):
+        snapshot.refresh(db)
+    # Bản cũ vẫn được phục vụ, và vẫn bị coi là cũ để lần sau dựng lại
+    assert snapshot.items == [{"id": 1}]
+    assert snapshot._stale
+
+def test_schedule_refreshes_without_reads(db, monkeypatch):
+    built = threading.Event()
+    snapshot = Snapshot("test", lambda session: built.set() or [], max_age=300)
+    monkeypatch.setattr(snapshots, "SNAPSHOTS", (snapshot,))
+
+    thread = snapshots.start_refresh_schedule(interval=0.01)
+    try:
+        assert built.wait(2)
+    finally:
+        snapshots.stop_refresh_schedule()
+        thread.join(2)
+    assert not thread.is_alive()
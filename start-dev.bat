@@ -4,6 +4,8 @@ echo.
 
 echo Starting Backend Server...
 cd backend
+echo Creating missing database tables...
+python db_manager.py --create-all
 start cmd /k "python -m uvicorn main:app --reload --host 0.0.0.0 --port 8000"
 
 echo Waiting for backend to start...